@@ -0,0 +1,80 @@
+# app/batching.py
+
+import asyncio
+import logging
+from typing import Callable, List, Optional, Tuple
+from app.executor import run_in_pool
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Collects texts submitted by concurrent requests and summarizes them together.
+
+    A batch is dispatched as soon as `max_batch_size` texts are pending, or
+    `max_wait_ms` after the first text of the batch arrived, whichever comes first.
+    `batch_fn` takes a list of texts and returns one summary per text; it runs in
+    the summarization worker pool, so it must be a picklable module-level function.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[str]], List[str]], max_batch_size: int, max_wait_ms: float):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.batches_run = 0
+        self.texts_run = 0
+
+    async def submit(self, text: str) -> str:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._dispatch()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._dispatch)
+
+        return await future
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending[:self.max_batch_size], self._pending[self.max_batch_size:]
+        asyncio.ensure_future(self._run(batch))
+
+        # Anything left over starts the wait for the next batch.
+        if self._pending:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._dispatch)
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]):
+        texts = [text for text, _ in batch]
+        logger.debug(f"Running a batch of {len(texts)} chunks.")
+        try:
+            results = await run_in_pool(self.batch_fn, texts)
+            if len(results) != len(batch):
+                raise RuntimeError(f"Batch function returned {len(results)} results for {len(batch)} texts.")
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches_run += 1
+        self.texts_run += len(texts)
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches_run,
+            "texts": self.texts_run,
+            "average_batch_size": self.texts_run / self.batches_run if self.batches_run else 0.0,
+        }
@@ -0,0 +1,197 @@
+# app/cold_storage.py
+
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+from sqlalchemy import delete, func, insert
+from sqlmodel import select
+from sqlalchemy.engine import Engine
+from app.config import COLD_STORAGE_DIR, COLD_STORAGE_AFTER_DAYS, COLD_SEGMENT_MAX_ROWS, COLD_COMPRESSION_LEVEL
+from app.database import ChatSenderStats, ColdSegment, Message
+from app.engine_registry import timed_import
+from app.metrics import stage_seconds
+
+logger = logging.getLogger(__name__)
+
+# --- Tiered Retention ---
+# Summaries almost always read the last few days of a chat, so old messages are
+# moved out of the row store into the cold tier: per-chat, zstd-compressed Parquet
+# segments under COLD_STORAGE_DIR/chat=<id>/, indexed by the `coldsegment` table.
+# Segments are sorted by message id and written in small row groups, so reading a
+# message-id range only decompresses the row groups it overlaps.
+
+_COLUMNS = ("message_id", "sender_name", "text", "timestamp", "unit_count", "unit_kind")
+_ROW_GROUP_SIZE = 2_000
+
+
+def _utcnow() -> datetime:
+    # Stored as naive UTC so it compares the same way on SQLite and PostgreSQL.
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _schema(pa):
+    return pa.schema([
+        ("message_id", pa.int64()),
+        ("sender_name", pa.string()),
+        ("text", pa.string()),
+        ("timestamp", pa.timestamp("us")),
+        ("unit_count", pa.int32()),
+        ("unit_kind", pa.string()),
+    ])
+
+
+def _write_segment(chat_id: int, rows: List[Any], storage_dir: str) -> tuple[str, int]:
+    """
+    Writes rows (sorted by message id) as one segment. Returns its path relative to
+    `storage_dir` and its size. The file is written under a temporary name first, so
+    a crash never leaves a half-written segment behind under a real name.
+    """
+    pa = timed_import("pyarrow")
+    pq = timed_import("pyarrow.parquet")
+    table = pa.Table.from_pydict({column: [getattr(row, column) for row in rows] for column in _COLUMNS}, schema=_schema(pa))
+
+    relative = os.path.join(f"chat={chat_id}", f"{rows[0].message_id}-{rows[-1].message_id}-{uuid.uuid4().hex[:8]}.parquet")
+    path = os.path.join(storage_dir, relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    pq.write_table(table, path + ".tmp", compression="zstd", compression_level=COLD_COMPRESSION_LEVEL, row_group_size=_ROW_GROUP_SIZE)
+    os.replace(path + ".tmp", path)
+    return relative, os.path.getsize(path)
+
+
+def compact(engine: Engine, older_than_days: int = COLD_STORAGE_AFTER_DAYS, chat_id: Optional[int] = None,
+            storage_dir: Optional[str] = None, max_rows: int = COLD_SEGMENT_MAX_ROWS) -> Dict[str, int]:
+    """
+    Moves messages older than `older_than_days` (of one chat, or all of them) into
+    cold segments. Each segment is recorded in the manifest and its rows deleted from
+    `message` in the same transaction. The per-sender counters are left alone: they
+    count the whole archive, hot and cold.
+    """
+    storage_dir = storage_dir or COLD_STORAGE_DIR
+    cutoff = _utcnow() - timedelta(days=older_than_days)
+    messages = Message.__table__
+    totals = {"segments": 0, "messages": 0, "bytes": 0}
+
+    with engine.connect() as connection:
+        chats = select(messages.c.chat_id).where(messages.c.timestamp < cutoff).distinct()
+        if chat_id is not None:
+            chats = chats.where(messages.c.chat_id == chat_id)
+        chat_ids = list(connection.execute(chats).scalars())
+
+    for current_chat in chat_ids:
+        while True:
+            with engine.begin() as connection:
+                rows = connection.execute(
+                    select(*(messages.c[column] for column in _COLUMNS))
+                    .where(messages.c.chat_id == current_chat, messages.c.timestamp < cutoff)
+                    .order_by(messages.c.message_id)
+                    .limit(max_rows)
+                ).all()
+                if not rows:
+                    break
+                relative, size = _write_segment(current_chat, rows, storage_dir)
+                connection.execute(insert(ColdSegment.__table__).values(
+                    chat_id=current_chat,
+                    path=relative,
+                    first_message_id=rows[0].message_id,
+                    last_message_id=rows[-1].message_id,
+                    first_timestamp=min(row.timestamp for row in rows),
+                    last_timestamp=max(row.timestamp for row in rows),
+                    row_count=len(rows),
+                    size_bytes=size,
+                    created_at=_utcnow(),
+                ))
+                # Exactly the rows just written: the oldest ones by id, up to the last one.
+                connection.execute(delete(messages).where(
+                    messages.c.chat_id == current_chat,
+                    messages.c.timestamp < cutoff,
+                    messages.c.message_id <= rows[-1].message_id,
+                ))
+            totals["segments"] += 1
+            totals["messages"] += len(rows)
+            totals["bytes"] += size
+            logger.info(f"Moved {len(rows)} messages of chat {current_chat} to cold segment {relative} ({size} bytes).")
+    return totals
+
+
+# --- Reading ---
+
+def segments_for_range_statement(chat_id: int, start_message_id: int, end_message_id: int):
+    return (
+        select(ColdSegment)
+        .where(ColdSegment.chat_id == chat_id)
+        .where(ColdSegment.first_message_id <= end_message_id)
+        .where(ColdSegment.last_message_id >= start_message_id)
+        .order_by(ColdSegment.first_message_id)
+    )
+
+
+def segments_before_statement(chat_id: int, before_message_id: Optional[int]):
+    statement = select(ColdSegment).where(ColdSegment.chat_id == chat_id).order_by(ColdSegment.last_message_id.desc())
+    if before_message_id is not None:
+        statement = statement.where(ColdSegment.first_message_id < before_message_id)
+    return statement
+
+
+def read_segments(chat_id: int, segments: Iterable[ColdSegment], start_message_id: int, end_message_id: int,
+                  storage_dir: Optional[str] = None) -> List[Message]:
+    """
+    Reads the messages with ids in the range from the given segments, as (unsaved) `Message` objects.
+    """
+    storage_dir = storage_dir or COLD_STORAGE_DIR
+    segments = list(segments)
+    if not segments:
+        return []
+    pq = timed_import("pyarrow.parquet")
+    results = []
+    with stage_seconds.time(stage="cold_read"):
+        for segment in segments:
+            table = pq.read_table(
+                os.path.join(storage_dir, segment.path),
+                filters=[("message_id", ">=", start_message_id), ("message_id", "<=", end_message_id)],
+            )
+            for row in table.to_pylist():
+                results.append(Message(chat_id=chat_id, **row))
+    results.sort(key=lambda message: message.message_id)
+    logger.info(f"Read {len(results)} messages of chat {chat_id} from {len(segments)} cold segments.")
+    return results
+
+
+def read_last(chat_id: int, segments: Iterable[ColdSegment], limit: int, before_message_id: Optional[int],
+              storage_dir: Optional[str] = None) -> List[Message]:
+    """
+    Reads up to `limit` of the newest cold messages with ids below `before_message_id`,
+    from segments ordered newest first. Returned oldest first.
+    """
+    upper = before_message_id - 1 if before_message_id is not None else 2**63 - 1
+    found: List[Message] = []
+    for segment in segments:
+        if len(found) >= limit:
+            break
+        found = read_segments(chat_id, [segment], segment.first_message_id, upper, storage_dir) + found
+    return found[-limit:] if limit else []
+
+
+def merge_tiers(hot: List[Message], cold: List[Message]) -> List[Message]:
+    """
+    Combines hot and cold messages in message-id order. A message in both tiers (e.g.
+    an old update redelivered after compaction) is taken from the hot tier.
+    """
+    if not cold:
+        return hot
+    hot_ids = {message.message_id for message in hot}
+    return sorted([*hot, *(message for message in cold if message.message_id not in hot_ids)], key=lambda message: message.message_id)
+
+
+def get_tier_sizes(engine: Engine) -> Dict[str, int]:
+    """
+    Messages in each tier, from the per-sender counters (which count the whole archive)
+    and the manifest, so it never has to count the message table.
+    """
+    with engine.connect() as connection:
+        total = connection.execute(select(func.coalesce(func.sum(ChatSenderStats.message_count), 0))).scalar_one()
+        cold, cold_bytes = connection.execute(
+            select(func.coalesce(func.sum(ColdSegment.row_count), 0), func.coalesce(func.sum(ColdSegment.size_bytes), 0))
+        ).one()
+    return {"hot": max(total - cold, 0), "cold": cold, "cold_bytes": cold_bytes}
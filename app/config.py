@@ -12,9 +12,210 @@ if not BOT_TOKEN:
 # Read the log level from the .env file, defaulting to "INFO" if not set.
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 # Read the summarizer mode, defaulting to "traditional" if not set.
-# It can be "traditional" or "transformer"
+# It can be "traditional", "fastlsa" (vectorized LSA) or "transformer"
 SUMMARIZER_MODE = os.getenv("SUMMARIZER_MODE", "traditional")
 DATABASE_URL = os.getenv("DATABASE_URL") 
 
 if not DATABASE_URL:
-    raise ValueError("DATABASE_URL not found! Please set it in your environment.")
\ No newline at end of file
+    raise ValueError("DATABASE_URL not found! Please set it in your environment.")
+
+# --- Summarization Worker Pool ---
+# Which executor runs `summarize_chunk` off the event loop.
+# It can be "thread", "process" or "auto" (thread for traditional, process for transformer).
+SUMMARY_EXECUTOR = os.getenv("SUMMARY_EXECUTOR", "auto")
+# Number of workers in the pool. Each process worker holds its own copy of the model.
+SUMMARY_WORKERS = int(os.getenv("SUMMARY_WORKERS", "2"))
+
+# --- Hierarchical Summarization ---
+# Maximum number of intermediate summaries merged by one node of the reduce tree.
+REDUCE_FAN_IN = int(os.getenv("REDUCE_FAN_IN", "4"))
+# Safety limit on reduce tree levels; a tree that still does not fit fails loudly.
+REDUCE_MAX_DEPTH = int(os.getenv("REDUCE_MAX_DEPTH", "4"))
+
+if REDUCE_FAN_IN < 2:
+    raise ValueError("REDUCE_FAN_IN must be at least 2, otherwise the reduce tree never shrinks.")
+if REDUCE_MAX_DEPTH < 1:
+    raise ValueError("REDUCE_MAX_DEPTH must be at least 1.")
+
+# --- Chunk Summary Cache ---
+# Cache per-chunk summaries in the database so overlapping requests reuse them.
+SUMMARY_CACHE_ENABLED = os.getenv("SUMMARY_CACHE_ENABLED", "true").lower() == "true"
+# Leaf chunks are aligned to blocks of this many message ids, so their boundaries
+# do not move when a request starts or ends at a different message.
+CHUNK_ID_SPAN = int(os.getenv("CHUNK_ID_SPAN", "50"))
+# Entries not used for this long are evicted.
+SUMMARY_CACHE_TTL_HOURS = int(os.getenv("SUMMARY_CACHE_TTL_HOURS", "72"))
+# Upper bound on cached entries; the least recently used ones are evicted first.
+SUMMARY_CACHE_MAX_ENTRIES = int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", "50000"))
+# Minimum number of seconds between two eviction sweeps.
+SUMMARY_CACHE_EVICT_INTERVAL = int(os.getenv("SUMMARY_CACHE_EVICT_INTERVAL", "300"))
+
+# --- Transformer Micro-Batching ---
+# Maximum number of chunks (from any chats) summarized in one forward pass. 1 disables batching.
+TRANSFORMER_BATCH_SIZE = int(os.getenv("TRANSFORMER_BATCH_SIZE", "8"))
+# How long the first pending chunk waits for others to join its batch.
+TRANSFORMER_BATCH_WAIT_MS = float(os.getenv("TRANSFORMER_BATCH_WAIT_MS", "20"))
+
+# --- Transformer CPU Backend ---
+# "pytorch" (full precision), "quantized" (PyTorch with dynamic int8 Linear layers) or
+# "onnx" (ONNX Runtime; needs `pip install optimum[onnxruntime]`).
+TRANSFORMER_BACKEND = os.getenv("TRANSFORMER_BACKEND", "pytorch")
+# Directory of a model exported with `python -m app.maintenance export-onnx`. If empty,
+# the onnx backend exports the model when it loads, which takes a while.
+TRANSFORMER_ONNX_MODEL_DIR = os.getenv("TRANSFORMER_ONNX_MODEL_DIR", "")
+# Threads used inside one operator and across independent operators. 0 keeps the library default.
+TRANSFORMER_INTRA_OP_THREADS = int(os.getenv("TRANSFORMER_INTRA_OP_THREADS", "0"))
+TRANSFORMER_INTER_OP_THREADS = int(os.getenv("TRANSFORMER_INTER_OP_THREADS", "0"))
+
+# --- Database Connection Pool ---
+# Use an async engine (asyncpg for PostgreSQL, aiosqlite for SQLite) so queries never block the event loop.
+DATABASE_ASYNC = os.getenv("DATABASE_ASYNC", "false").lower() == "true"
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+# Check connections before use, so restarts of the database server don't surface as errors.
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# Recycle connections after this many seconds, before managed databases drop them.
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# Size of SQLAlchemy's compiled statement cache and asyncpg's prepared statement cache.
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "500"))
+
+# --- Write-Behind Message Archiving ---
+# Buffer incoming messages and archive them with one multi-row INSERT per batch.
+ARCHIVE_BUFFER_ENABLED = os.getenv("ARCHIVE_BUFFER_ENABLED", "true").lower() == "true"
+# Flush as soon as this many messages are pending...
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "100"))
+# ...or this long after the first pending message arrived.
+ARCHIVE_FLUSH_INTERVAL_MS = float(os.getenv("ARCHIVE_FLUSH_INTERVAL_MS", "1000"))
+
+# --- Webhook Job Queue ---
+# The webhook acknowledges Telegram immediately and processes updates in the background.
+# Maximum number of updates processed at the same time (updates of one chat always run in order).
+UPDATE_WORKERS = int(os.getenv("UPDATE_WORKERS", "8"))
+# Maximum number of queued or running updates before the webhook pushes back.
+UPDATE_QUEUE_MAX_DEPTH = int(os.getenv("UPDATE_QUEUE_MAX_DEPTH", "1000"))
+# How long the webhook waits for room in a full queue before answering 503.
+UPDATE_QUEUE_ENQUEUE_TIMEOUT = float(os.getenv("UPDATE_QUEUE_ENQUEUE_TIMEOUT", "2"))
+
+# --- Archive Queries ---
+# Rows fetched per keyset page when reading a message range.
+RANGE_PAGE_SIZE = int(os.getenv("RANGE_PAGE_SIZE", "1000"))
+
+# --- Search ---
+# Matches listed by /search, newest first.
+SEARCH_RESULTS_LIMIT = int(os.getenv("SEARCH_RESULTS_LIMIT", "10"))
+# Messages before and after each match that /summarize_about includes, for context.
+SEARCH_CONTEXT_MESSAGES = int(os.getenv("SEARCH_CONTEXT_MESSAGES", "2"))
+
+# --- Chat Statistics ---
+# Number of senders listed by /stats.
+STATS_TOP_SENDERS = int(os.getenv("STATS_TOP_SENDERS", "3"))
+
+# --- Startup ---
+# Load the summarization engine in the background right after startup, so the
+# first summary doesn't pay for it. `/ready` answers 503 until it has finished.
+ENGINE_WARMUP_ENABLED = os.getenv("ENGINE_WARMUP_ENABLED", "true").lower() == "true"
+# Seconds the app may take before it answers requests. Going over it is logged as a warning.
+STARTUP_TIME_BUDGET_S = float(os.getenv("STARTUP_TIME_BUDGET_S", "5"))
+
+# --- Extractive Engines (traditional, fastlsa) ---
+# Number of distinct Arabic tokens whose ISRI stems are kept in memory.
+TRADITIONAL_STEM_CACHE_SIZE = int(os.getenv("TRADITIONAL_STEM_CACHE_SIZE", "100000"))
+# Number of latent topics (singular vectors) the fastlsa engine ranks sentences by.
+FAST_LSA_COMPONENTS = int(os.getenv("FAST_LSA_COMPONENTS", "5"))
+
+# --- Progressive Summary Delivery ---
+# Edit the "Summarizing..." message with progress and partial summaries, then with the final summary.
+PROGRESSIVE_SUMMARY_ENABLED = os.getenv("PROGRESSIVE_SUMMARY_ENABLED", "true").lower() == "true"
+# Minimum seconds between two progress edits of the same message (Telegram throttles edits).
+PROGRESS_EDIT_INTERVAL_S = float(os.getenv("PROGRESS_EDIT_INTERVAL_S", "1.5"))
+
+# --- Outbound Telegram Delivery ---
+# Size of the shared HTTP connection pool and timeouts (seconds) for Bot API calls.
+TELEGRAM_POOL_SIZE = int(os.getenv("TELEGRAM_POOL_SIZE", "16"))
+TELEGRAM_CONNECT_TIMEOUT = float(os.getenv("TELEGRAM_CONNECT_TIMEOUT", "5"))
+TELEGRAM_READ_TIMEOUT = float(os.getenv("TELEGRAM_READ_TIMEOUT", "10"))
+TELEGRAM_POOL_TIMEOUT = float(os.getenv("TELEGRAM_POOL_TIMEOUT", "5"))
+# Rate limits, kept under Telegram's: ~30 messages/s overall, ~1/s per private chat,
+# 20/min per group. A chat may burst up to TELEGRAM_CHAT_BURST messages.
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "25"))
+TELEGRAM_CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", "1"))
+TELEGRAM_GROUP_RATE_PER_MIN = float(os.getenv("TELEGRAM_GROUP_RATE_PER_MIN", "20"))
+TELEGRAM_CHAT_BURST = float(os.getenv("TELEGRAM_CHAT_BURST", "3"))
+# Retries after a 429 (waiting its retry_after) or a network error.
+TELEGRAM_MAX_RETRIES = int(os.getenv("TELEGRAM_MAX_RETRIES", "3"))
+
+# --- Cold Storage ---
+# Messages older than COLD_STORAGE_AFTER_DAYS can be moved out of the `message` table
+# into compressed Parquet segments (`python -m app.maintenance compact-cold`).
+# Range queries read both tiers while this is on. Needs pyarrow.
+COLD_STORAGE_ENABLED = os.getenv("COLD_STORAGE_ENABLED", "false").lower() == "true"
+COLD_STORAGE_DIR = os.getenv("COLD_STORAGE_DIR", "cold_storage")
+COLD_STORAGE_AFTER_DAYS = int(os.getenv("COLD_STORAGE_AFTER_DAYS", "30"))
+# Messages per segment file, and the zstd level they are compressed with.
+COLD_SEGMENT_MAX_ROWS = int(os.getenv("COLD_SEGMENT_MAX_ROWS", "20000"))
+COLD_COMPRESSION_LEVEL = int(os.getenv("COLD_COMPRESSION_LEVEL", "9"))
+
+# --- Distributed Job Queue ---
+# "local" runs summaries and /stats in the process that received the webhook.
+# "database" stores them as jobs in the database for `python worker.py` processes,
+# so summarizer nodes scale separately from the webhook nodes.
+JOB_QUEUE_BACKEND = os.getenv("JOB_QUEUE_BACKEND", "local")
+# A claimed job is handed to another worker if its lease runs out (e.g. the worker died).
+# Running jobs renew it every third of this.
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "120"))
+# Attempts before a job is dead-lettered, and the delay before retry n (times n).
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BACKOFF_S = float(os.getenv("JOB_RETRY_BACKOFF_S", "10"))
+# How often an idle worker looks for new jobs, and how many jobs one worker runs at a time.
+JOB_POLL_INTERVAL_S = float(os.getenv("JOB_POLL_INTERVAL_S", "1"))
+JOB_WORKER_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY", "2"))
+
+# --- Preprocessing ---
+# Clean up archived messages before they are summarized (see app/preprocessing.py).
+# PREPROCESS_STEPS run in the order given; drop a step from the list to skip it.
+PREPROCESS_ENABLED = os.getenv("PREPROCESS_ENABLED", "false").lower() == "true"
+PREPROCESS_STEPS = [
+    step.strip() for step in os.getenv(
+        "PREPROCESS_STEPS", "normalize_arabic,collapse_urls,drop_low_content,drop_duplicates,merge_senders"
+    ).split(",") if step.strip()
+]
+# Messages with fewer words than this (links not counted) are dropped as noise.
+PREPROCESS_MIN_WORDS = int(os.getenv("PREPROCESS_MIN_WORDS", "2"))
+# A message is a near-duplicate when its word set overlaps one of the last
+# PREPROCESS_DUPLICATE_WINDOW messages by at least this Jaccard similarity.
+PREPROCESS_DUPLICATE_WINDOW = int(os.getenv("PREPROCESS_DUPLICATE_WINDOW", "20"))
+PREPROCESS_DUPLICATE_SIMILARITY = float(os.getenv("PREPROCESS_DUPLICATE_SIMILARITY", "0.9"))
+
+# --- Engine Routing ---
+# Keep a second, fast engine loaded next to SUMMARIZER_MODE. Each summary goes to
+# SUMMARIZER_MODE if it is expected to finish within ROUTING_DEADLINE_S given the work
+# already running, else to ROUTING_FALLBACK_MODE, else it is declined ("try again later").
+ROUTING_ENABLED = os.getenv("ROUTING_ENABLED", "false").lower() == "true"
+ROUTING_FALLBACK_MODE = os.getenv("ROUTING_FALLBACK_MODE", "fastlsa")
+ROUTING_DEADLINE_S = float(os.getenv("ROUTING_DEADLINE_S", "30"))
+# How quickly the per-engine speed estimates follow the timings of recent summaries.
+ROUTING_EWMA_ALPHA = float(os.getenv("ROUTING_EWMA_ALPHA", "0.2"))
+
+# --- Request Coalescing ---
+# Identical concurrent summary requests (same chat, message range and engine) share one computation.
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+
+# --- Metrics ---
+# Record per-stage latency histograms and counters and serve them at /metrics.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# --- Rolling Summaries ---
+# Keep a precomputed summary of the last ROLLING_SUMMARY_WINDOW messages of active
+# chats, so `/summarize_last` with that size answers without summarizing from scratch.
+ROLLING_SUMMARY_ENABLED = os.getenv("ROLLING_SUMMARY_ENABLED", "false").lower() == "true"
+# Comma-separated chat ids to maintain, or "*" for every chat.
+ROLLING_SUMMARY_CHATS = os.getenv("ROLLING_SUMMARY_CHATS", "*")
+ROLLING_SUMMARY_WINDOW = int(os.getenv("ROLLING_SUMMARY_WINDOW", "50"))
+# Refresh after this many new messages...
+ROLLING_SUMMARY_EVERY_N = int(os.getenv("ROLLING_SUMMARY_EVERY_N", "25"))
+# ...or, for chats with any new messages, every this many seconds while the update queue is idle.
+ROLLING_SUMMARY_IDLE_SECONDS = float(os.getenv("ROLLING_SUMMARY_IDLE_SECONDS", "300"))
+# Answer from the rolling summary only if at most this many messages arrived since its refresh.
+ROLLING_SUMMARY_MAX_DELTA = int(os.getenv("ROLLING_SUMMARY_MAX_DELTA", "10"))
+# Refreshes running at the same time, to bound the CPU they take from user requests.
+ROLLING_SUMMARY_CONCURRENCY = int(os.getenv("ROLLING_SUMMARY_CONCURRENCY", "1"))
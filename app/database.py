@@ -1,31 +1,190 @@
 # app/database.py
 
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable, TypeVar, TYPE_CHECKING
 from sqlmodel import Field, SQLModel, create_engine, Session, select, func, desc
-from app.config import DATABASE_URL
-from sqlalchemy import BIGINT, Column
+from app.config import (
+    DATABASE_URL, DATABASE_ASYNC, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE, DB_STATEMENT_CACHE_SIZE, RANGE_PAGE_SIZE, STATS_TOP_SENDERS, COLD_STORAGE_ENABLED,
+)
+from sqlalchemy import BIGINT, Column, Index, case, column, delete, insert, not_, or_, table, text
+from sqlalchemy.engine import make_url
+
+if TYPE_CHECKING:
+    from sqlmodel.ext.asyncio.session import AsyncSession
 
 logger = logging.getLogger(__name__)
 
-engine = create_engine(DATABASE_URL, echo=False)
+T = TypeVar("T")
+
+def _engine_options(url: str) -> Dict[str, Any]:
+    """
+    Pool and statement-cache settings shared by the sync and async engines.
+    SQLite uses its own single-connection pools, so only pre-ping applies there.
+    """
+    options = {
+        "echo": False,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "query_cache_size": DB_STATEMENT_CACHE_SIZE,
+    }
+    if make_url(url).get_backend_name() != "sqlite":
+        options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_recycle=DB_POOL_RECYCLE)
+    return options
+
+def _async_url(url: str) -> str:
+    """
+    Maps DATABASE_URL onto its async driver: asyncpg for PostgreSQL, aiosqlite for SQLite.
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "postgresql":
+        # asyncpg keeps its own per-connection cache of prepared statements.
+        return parsed.set(drivername="postgresql+asyncpg").update_query_dict(
+            {"prepared_statement_cache_size": str(DB_STATEMENT_CACHE_SIZE)}
+        ).render_as_string(hide_password=False)
+    if backend == "sqlite":
+        return parsed.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    raise ValueError(f"DATABASE_ASYNC is not supported for the '{backend}' backend.")
+
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
+
+# The async engine is only built when DATABASE_ASYNC is on, so the async
+# drivers stay optional for the default (sync) deployment.
+async_engine = None
+if DATABASE_ASYNC:
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlalchemy.pool import NullPool
+    async_options = _engine_options(DATABASE_URL)
+    if make_url(DATABASE_URL).get_backend_name() == "sqlite":
+        # Each aiosqlite connection owns a worker thread; don't keep them alive in a pool.
+        async_options["poolclass"] = NullPool
+    async_engine = create_async_engine(_async_url(DATABASE_URL), **async_options)
 
 class Message(SQLModel, table=True):
+    # Every archive query filters on one chat first, so both indexes lead with chat_id.
+    # The unique index also rejects a message archived twice (e.g. a redelivered update).
+    __table_args__ = (
+        Index("uq_message_chat_message", "chat_id", "message_id", unique=True),
+        Index("ix_message_chat_timestamp", "chat_id", "timestamp"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     
     # We use sa_column to specify the exact database type as BIGINT
     # This is crucial for storing large Telegram IDs.
-    message_id: int = Field(sa_column=Column(BIGINT, index=True))
-    chat_id: int = Field(sa_column=Column(BIGINT, index=True))
+    message_id: int = Field(sa_column=Column(BIGINT, nullable=False))
+    chat_id: int = Field(sa_column=Column(BIGINT, nullable=False))
     
     sender_name: str
     text: str
-    timestamp: datetime = Field(index=True) # Removed default factory to use Telegram's timestamp
+    timestamp: datetime # Removed default factory to use Telegram's timestamp
+
+    # Size of the formatted message in the summarization engine's units, counted once
+    # when it is archived. `unit_kind` says which units ("words", or the tokenizer);
+    # rows counted for another engine, or not at all, are counted again when summarized.
+    unit_count: Optional[int] = None
+    unit_kind: Optional[str] = None
+
+class ChunkSummary(SQLModel, table=True):
+    """
+    A cached summary of one leaf chunk: the messages of a chat whose ids fall
+    between `first_message_id` and `last_message_id`, summarized by one engine version.
+    `content_hash` covers the chunk text, so a message archived late inside the span
+    produces a new key instead of serving the stale summary.
+    """
+    __table_args__ = (
+        Index("ix_chunksummary_lookup", "chat_id", "engine", "engine_version", "first_message_id", "last_message_id", "content_hash", unique=True),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    chat_id: int = Field(sa_column=Column(BIGINT, nullable=False))
+    first_message_id: int = Field(sa_column=Column(BIGINT, nullable=False))
+    last_message_id: int = Field(sa_column=Column(BIGINT, nullable=False))
+    content_hash: str
+    engine: str
+    engine_version: str
+    summary: str
+    created_at: datetime
+    last_used_at: datetime = Field(index=True) # Drives both TTL and size-based eviction
+
+class ChatSenderStats(SQLModel, table=True):
+    """
+    Running per-chat, per-sender message counters. They are updated in the same
+    transaction that archives the messages, so `/stats` never has to scan the archive.
+    Rebuild them from the archive with `python -m app.maintenance rebuild-stats`.
+    """
+    __table_args__ = (
+        Index("uq_chatsenderstats_chat_sender", "chat_id", "sender_name", unique=True),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    chat_id: int = Field(sa_column=Column(BIGINT, nullable=False))
+    sender_name: str
+    message_count: int
+    first_message_at: datetime
+    last_message_at: datetime
+
+class ColdSegment(SQLModel, table=True):
+    """
+    Manifest entry of one cold-tier segment: a zstd-compressed Parquet file holding
+    the archived messages of one chat with ids from `first_message_id` to
+    `last_message_id`, moved out of the `message` table by `app.cold_storage.compact`.
+    `path` is relative to COLD_STORAGE_DIR.
+    """
+    __table_args__ = (
+        Index("ix_coldsegment_chat_range", "chat_id", "first_message_id", "last_message_id"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    chat_id: int = Field(sa_column=Column(BIGINT, nullable=False))
+    path: str
+    first_message_id: int = Field(sa_column=Column(BIGINT, nullable=False))
+    last_message_id: int = Field(sa_column=Column(BIGINT, nullable=False))
+    first_timestamp: datetime
+    last_timestamp: datetime
+    row_count: int
+    size_bytes: int
+    created_at: datetime
+
+class Job(SQLModel, table=True):
+    """
+    A durable summarize/stats job (JOB_QUEUE_BACKEND=database). Webhook nodes insert
+    jobs; worker processes (`python worker.py`) claim them with a lease, see
+    app/job_store.py. Jobs that failed `max_attempts` times stay behind as "dead".
+    """
+    __table_args__ = (
+        Index("ix_job_claim", "status", "run_after"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    kind: str
+    chat_id: int = Field(sa_column=Column(BIGINT, nullable=False))
+    payload: str # JSON
+    status: str = "queued" # queued, running or dead; finished jobs are deleted
+    attempts: int = 0
+    max_attempts: int
+    run_after: datetime
+    lease_expires_at: Optional[datetime] = None
+    locked_by: Optional[str] = None
+    last_error: Optional[str] = None
+    created_at: datetime
+
+class SchemaMigration(SQLModel, table=True):
+    """
+    Records which schema migrations (see app/migrations.py) have been applied.
+    """
+    version: str = Field(primary_key=True)
+    applied_at: datetime
 
 def create_db_and_tables():
     logger.info("Initializing the database and creating tables...")
     SQLModel.metadata.create_all(engine)
+    # Existing archives were created with an older schema; bring them up to date.
+    from app.migrations import run_migrations
+    run_migrations(engine)
     logger.info("Database and tables created successfully.")
 
 def get_session():
@@ -35,73 +194,398 @@ def get_session():
     with Session(engine) as session:
         yield session
 
-def get_messages_in_range(session: Session, chat_id: int, start_message_id: int, end_message_id: int) -> List[Message]:
+async def get_async_session():
     """
-    Queries the database to get all messages within a specific range in a specific chat.
+    Dependency function to get an async database session (DATABASE_ASYNC mode).
     """
-    logger.info(f"Querying database for messages in chat {chat_id} from {start_message_id} to {end_message_id}")
-    
-    statement = (
+    from sqlmodel.ext.asyncio.session import AsyncSession
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+@asynccontextmanager
+async def open_session():
+    """
+    Opens a session outside of a request (e.g. for a background job):
+    an AsyncSession in DATABASE_ASYNC mode, a Session otherwise.
+    """
+    if async_engine is not None:
+        from sqlmodel.ext.asyncio.session import AsyncSession
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
+    else:
+        with Session(engine) as session:
+            yield session
+
+def is_async_session(session: Any) -> bool:
+    return hasattr(session, "run_sync")
+
+async def run_with_session(session: Any, fn: Callable[..., T], *args, **kwargs) -> T:
+    """
+    The single entry point for running a database function with either kind of session.
+    With a sync `Session`, `fn` runs in a worker thread. With an `AsyncSession`, its native
+    async variant is awaited if it has one, otherwise `fn` runs on the session's sync
+    facade without blocking the loop.
+    """
+    if not is_async_session(session):
+        # A sync Session blocks, so its work runs in a thread instead of on the loop.
+        return await asyncio.to_thread(fn, session, *args, **kwargs)
+    async_variant = _ASYNC_VARIANTS.get(fn)
+    if async_variant is not None:
+        return await async_variant(session, *args, **kwargs)
+    return await session.run_sync(fn, *args, **kwargs)
+
+def _aggregate_sender_rows(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Folds archived rows into one counter delta per (chat, sender).
+    """
+    deltas: Dict[tuple, Dict[str, Any]] = {}
+    for row in rows:
+        key = (row["chat_id"], row["sender_name"])
+        delta = deltas.get(key)
+        if delta is None:
+            deltas[key] = {
+                "chat_id": row["chat_id"],
+                "sender_name": row["sender_name"],
+                "message_count": 1,
+                "first_message_at": row["timestamp"],
+                "last_message_at": row["timestamp"],
+            }
+        else:
+            delta["message_count"] += 1
+            delta["first_message_at"] = min(delta["first_message_at"], row["timestamp"])
+            delta["last_message_at"] = max(delta["last_message_at"], row["timestamp"])
+    return list(deltas.values())
+
+def sender_stats_upsert(dialect_name: str):
+    """
+    INSERT ... ON CONFLICT DO UPDATE that adds counter deltas to `chatsenderstats`.
+    """
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    table = ChatSenderStats.__table__
+    statement = dialect_insert(table)
+    excluded = statement.excluded
+    return statement.on_conflict_do_update(
+        index_elements=["chat_id", "sender_name"],
+        set_={
+            "message_count": table.c.message_count + excluded.message_count,
+            "first_message_at": case((excluded.first_message_at < table.c.first_message_at, excluded.first_message_at), else_=table.c.first_message_at),
+            "last_message_at": case((excluded.last_message_at > table.c.last_message_at, excluded.last_message_at), else_=table.c.last_message_at),
+        },
+    )
+
+def record_sender_stats(connection: Any, rows: List[Dict[str, Any]]):
+    """
+    Adds newly archived rows to the per-sender counters. `connection` may be a
+    Connection or a Session; call it inside the transaction that archived the rows.
+    """
+    deltas = _aggregate_sender_rows(rows)
+    if deltas:
+        dialect = connection.get_bind().dialect if isinstance(connection, Session) else connection.dialect
+        connection.execute(sender_stats_upsert(dialect.name), deltas)
+
+def save_message(session: Session, message: Message) -> Message:
+    """
+    Archives a single message, rolling the session back if the write fails.
+    """
+    try:
+        session.add(message)
+        session.flush()
+        record_sender_stats(session, [message.model_dump()])
+        session.commit()
+        session.refresh(message)
+    except Exception:
+        session.rollback()
+        raise
+    return message
+
+# --- Query Statements ---
+# Each query is built once here and executed by both the sync and the async variant.
+
+def _messages_in_range_statement(chat_id: int, after_message_id: int, end_message_id: int, limit: int):
+    # Keyset pagination over the (chat_id, message_id) index: each page resumes after
+    # the last id seen, so no page ever re-reads or sorts the rows before it.
+    # Message ids grow with time inside a chat, so id order is chronological order.
+    return (
         select(Message)
         .where(Message.chat_id == chat_id)
-        .where(Message.message_id >= start_message_id)
+        .where(Message.message_id > after_message_id)
         .where(Message.message_id <= end_message_id)
-        .order_by(Message.timestamp) # Ensure chronological order
+        .order_by(Message.message_id)
+        .limit(limit)
     )
-    
-    results = session.exec(statement).all()
-    logger.info(f"Found {len(results)} messages in the database for the given range.")
-    return results
 
-def get_chat_statistics(session: Session, chat_id: int) -> Dict[str, Any]:
+def _last_n_messages_statement(chat_id: int, limit: int):
+    # Walks the (chat_id, timestamp) index backwards and stops after `limit` rows.
+    return (
+        select(Message)
+        .where(Message.chat_id == chat_id)
+        .order_by(desc(Message.timestamp)) # Get the newest messages first
+        .limit(limit)
+    )
+
+# --- Full-Text Search ---
+# The tsvector expression of PostgreSQL's GIN index (migration 0004); queries must use
+# the same expression for the planner to pick the index. The 'simple' configuration
+# lowercases without stemming, so it suits any language. SQLite searches `message_fts`.
+SEARCH_VECTOR_SQL = "to_tsvector('simple'::regconfig, text)"
+_message_fts = table("message_fts", column("rowid"))
+
+def _fts5_query(terms: str) -> str:
+    # Every term quoted, so user input is never parsed as FTS5 syntax; terms are ANDed.
+    return " ".join('"' + term.replace('"', '""') + '"' for term in terms.split())
+
+def _search_statement(dialect_name: str, chat_id: int, terms: str, limit: int):
+    # Newest matches first. Bot commands (e.g. the /search itself) are not results.
+    statement = select(Message)
+    if dialect_name == "postgresql":
+        statement = statement.where(text(f"{SEARCH_VECTOR_SQL} @@ plainto_tsquery('simple'::regconfig, :terms)").bindparams(terms=terms))
+    else:
+        statement = statement.join(_message_fts, _message_fts.c.rowid == Message.id).where(
+            text("message_fts MATCH :query").bindparams(query=_fts5_query(terms)))
+    return (
+        statement
+        .where(Message.chat_id == chat_id)
+        .where(not_(Message.text.startswith("/")))
+        .order_by(desc(Message.message_id))
+        .limit(limit)
+    )
+
+def _context_windows(message_ids: List[int], context: int) -> List[tuple]:
     """
-    Queries the database to get statistics for a specific chat.
+    Merges `context` ids on either side of each message id into disjoint id ranges.
+    Message ids are sequential within a chat, so neighbouring ids are neighbouring messages.
     """
-    logger.info(f"Querying database for statistics in chat {chat_id}")
-    
-    # Query 1: Total message count
-    total_messages = session.exec(
-        select(func.count(Message.id))
-        .where(Message.chat_id == chat_id)
-    ).one()
-    
-    # Query 2: Most active user
-    most_active_user_result = session.exec(
-        select(Message.sender_name, func.count(Message.id).label("message_count"))
+    windows = []
+    for message_id in sorted(message_ids):
+        start, end = message_id - context, message_id + context
+        if windows and start <= windows[-1][1] + 1:
+            windows[-1] = (windows[-1][0], max(windows[-1][1], end))
+        else:
+            windows.append((start, end))
+    return windows
+
+def _messages_around_statement(chat_id: int, message_ids: List[int], context: int):
+    # One probe of the (chat_id, message_id) index per merged window.
+    return (
+        select(Message)
         .where(Message.chat_id == chat_id)
-        .group_by(Message.sender_name)
-        .order_by(desc("message_count"))
-        .limit(1)
-    ).first()
-    
-    most_active_user = most_active_user_result[0] if most_active_user_result else "N/A"
+        .where(or_(*(Message.message_id.between(start, end) for start, end in _context_windows(message_ids, context))))
+        .order_by(Message.message_id)
+    )
+
+def _sender_stats_statement(chat_id: int):
+    # One row per sender of the chat, read through the (chat_id, sender_name) index.
+    return select(ChatSenderStats).where(ChatSenderStats.chat_id == chat_id)
+
+def _build_stats(chat_id: int, sender_rows: List[ChatSenderStats]) -> Dict[str, Any]:
+    ranked = sorted(sender_rows, key=lambda row: row.message_count, reverse=True)
+    total_messages = sum(row.message_count for row in ranked)
+    first_message_at = min((row.first_message_at for row in ranked), default=None)
+    last_message_at = max((row.last_message_at for row in ranked), default=None)
+
+    messages_per_day = 0.0
+    if first_message_at and last_message_at:
+        days = max((last_message_at - first_message_at).total_seconds() / 86400, 1.0)
+        messages_per_day = total_messages / days
     
     stats = {
         "total_messages": total_messages,
-        "most_active_user": most_active_user
+        "most_active_user": ranked[0].sender_name if ranked else "N/A",
+        "top_senders": [(row.sender_name, row.message_count) for row in ranked[:STATS_TOP_SENDERS]],
+        "first_message_at": first_message_at,
+        "last_message_at": last_message_at,
+        "messages_per_day": messages_per_day,
     }
     
     logger.info(f"Found stats for chat {chat_id}: {stats}")
     return stats
 
+def get_messages_in_range(session: Session, chat_id: int, start_message_id: int, end_message_id: int) -> List[Message]:
+    """
+    Queries the database to get all messages within a specific range in a specific chat.
+    """
+    logger.info(f"Querying database for messages in chat {chat_id} from {start_message_id} to {end_message_id}")
+    
+    results = []
+    after_message_id = start_message_id - 1
+    while True:
+        page = session.exec(_messages_in_range_statement(chat_id, after_message_id, end_message_id, RANGE_PAGE_SIZE)).all()
+        results.extend(page)
+        if len(page) < RANGE_PAGE_SIZE:
+            break
+        after_message_id = page[-1].message_id
+    logger.info(f"Found {len(results)} messages in the database for the given range.")
+
+    if COLD_STORAGE_ENABLED:
+        # Imported here: the cold tier needs pyarrow, and imports this module.
+        from app import cold_storage
+        segments = session.exec(cold_storage.segments_for_range_statement(chat_id, start_message_id, end_message_id)).all()
+        results = cold_storage.merge_tiers(results, cold_storage.read_segments(chat_id, segments, start_message_id, end_message_id))
+    return results
+
+def get_chat_statistics(session: Session, chat_id: int) -> Dict[str, Any]:
+    """
+    Reads the statistics for a specific chat from the per-sender counters.
+    """
+    logger.info(f"Querying database for statistics in chat {chat_id}")
+    
+    return _build_stats(chat_id, session.exec(_sender_stats_statement(chat_id)).all())
+
 def get_last_n_messages(session: Session, chat_id: int, limit: int = 50) -> List[Message]:
     """
     Queries the database to get the last N messages from a specific chat.
     """
     logger.info(f"Querying database for the last {limit} messages in chat {chat_id}")
     
-    statement = (
-        select(Message)
-        .where(Message.chat_id == chat_id)
-        .order_by(desc(Message.timestamp)) # Get the newest messages first
-        .limit(limit)
-    )
-    
-    results = session.exec(statement).all()
+    results = list(session.exec(_last_n_messages_statement(chat_id, limit)).all())
     
     # The results are in reverse chronological order (newest to oldest),
     # so we reverse them back to the correct order (oldest to newest).
     results.reverse()
     
     logger.info(f"Found {len(results)} messages in the database.")
-    return results
\ No newline at end of file
+
+    if COLD_STORAGE_ENABLED and len(results) < limit:
+        # The rest of the window is older than the hot tier keeps.
+        from app import cold_storage
+        before = results[0].message_id if results else None
+        segments = session.exec(cold_storage.segments_before_statement(chat_id, before)).all()
+        results = cold_storage.read_last(chat_id, segments, limit - len(results), before) + results
+    return results
+
+def search_messages(session: Session, chat_id: int, terms: str, limit: int) -> List[Message]:
+    """
+    Finds up to `limit` messages of a chat containing all of `terms`, newest first,
+    through the full-text index. Only the hot tier is indexed.
+    """
+    logger.info(f"Searching chat {chat_id} for {terms!r}")
+    if not terms.split():
+        return []
+    results = list(session.exec(_search_statement(session.get_bind().dialect.name, chat_id, terms, limit)).all())
+    logger.info(f"Found {len(results)} matching messages.")
+    return results
+
+def get_messages_around(session: Session, chat_id: int, message_ids: List[int], context: int) -> List[Message]:
+    """
+    Returns the given messages and up to `context` messages on either side of each, oldest first.
+    """
+    if not message_ids:
+        return []
+    return list(session.exec(_messages_around_statement(chat_id, message_ids, context)).all())
+
+# --- Async Variants (DATABASE_ASYNC mode) ---
+
+async def get_messages_in_range_async(session: "AsyncSession", chat_id: int, start_message_id: int, end_message_id: int) -> List[Message]:
+    """
+    Async version of `get_messages_in_range`.
+    """
+    logger.info(f"Querying database for messages in chat {chat_id} from {start_message_id} to {end_message_id}")
+    
+    results = []
+    after_message_id = start_message_id - 1
+    while True:
+        page = (await session.exec(_messages_in_range_statement(chat_id, after_message_id, end_message_id, RANGE_PAGE_SIZE))).all()
+        results.extend(page)
+        if len(page) < RANGE_PAGE_SIZE:
+            break
+        after_message_id = page[-1].message_id
+    logger.info(f"Found {len(results)} messages in the database for the given range.")
+
+    if COLD_STORAGE_ENABLED:
+        from app import cold_storage
+        segments = (await session.exec(cold_storage.segments_for_range_statement(chat_id, start_message_id, end_message_id))).all()
+        if segments:
+            cold = await asyncio.to_thread(cold_storage.read_segments, chat_id, segments, start_message_id, end_message_id)
+            results = cold_storage.merge_tiers(results, cold)
+    return results
+
+async def get_chat_statistics_async(session: "AsyncSession", chat_id: int) -> Dict[str, Any]:
+    """
+    Async version of `get_chat_statistics`.
+    """
+    logger.info(f"Querying database for statistics in chat {chat_id}")
+    
+    return _build_stats(chat_id, (await session.exec(_sender_stats_statement(chat_id))).all())
+
+async def get_last_n_messages_async(session: "AsyncSession", chat_id: int, limit: int = 50) -> List[Message]:
+    """
+    Async version of `get_last_n_messages`.
+    """
+    logger.info(f"Querying database for the last {limit} messages in chat {chat_id}")
+    
+    results = list((await session.exec(_last_n_messages_statement(chat_id, limit))).all())
+    results.reverse()
+    
+    logger.info(f"Found {len(results)} messages in the database.")
+
+    if COLD_STORAGE_ENABLED and len(results) < limit:
+        from app import cold_storage
+        before = results[0].message_id if results else None
+        segments = (await session.exec(cold_storage.segments_before_statement(chat_id, before))).all()
+        if segments:
+            results = await asyncio.to_thread(cold_storage.read_last, chat_id, segments, limit - len(results), before) + results
+    return results
+
+async def search_messages_async(session: "AsyncSession", chat_id: int, terms: str, limit: int) -> List[Message]:
+    """
+    Async version of `search_messages`.
+    """
+    logger.info(f"Searching chat {chat_id} for {terms!r}")
+    if not terms.split():
+        return []
+    results = list((await session.exec(_search_statement(session.get_bind().dialect.name, chat_id, terms, limit))).all())
+    logger.info(f"Found {len(results)} matching messages.")
+    return results
+
+async def get_messages_around_async(session: "AsyncSession", chat_id: int, message_ids: List[int], context: int) -> List[Message]:
+    """
+    Async version of `get_messages_around`.
+    """
+    if not message_ids:
+        return []
+    return list((await session.exec(_messages_around_statement(chat_id, message_ids, context))).all())
+
+# Native async twins used by `run_with_session` for async sessions.
+_ASYNC_VARIANTS = {
+    get_messages_in_range: get_messages_in_range_async,
+    get_chat_statistics: get_chat_statistics_async,
+    get_last_n_messages: get_last_n_messages_async,
+    search_messages: search_messages_async,
+    get_messages_around: get_messages_around_async,
+}
+
+def rebuild_sender_stats(connection: Any, chat_id: Optional[int] = None) -> int:
+    """
+    Recomputes the per-sender counters from the archive (one chat, or all of them).
+    Used to backfill existing archives. Returns the number of counter rows written.
+    """
+    stats_table = ChatSenderStats.__table__
+    message_table = Message.__table__
+
+    clear = delete(stats_table)
+    aggregate = (
+        select(
+            message_table.c.chat_id,
+            message_table.c.sender_name,
+            func.count().label("message_count"),
+            func.min(message_table.c.timestamp).label("first_message_at"),
+            func.max(message_table.c.timestamp).label("last_message_at"),
+        )
+        .group_by(message_table.c.chat_id, message_table.c.sender_name)
+    )
+    if chat_id is not None:
+        clear = clear.where(stats_table.c.chat_id == chat_id)
+        aggregate = aggregate.where(message_table.c.chat_id == chat_id)
+
+    connection.execute(clear)
+    result = connection.execute(
+        insert(stats_table).from_select(
+            ["chat_id", "sender_name", "message_count", "first_message_at", "last_message_at"],
+            aggregate,
+        )
+    )
+    logger.info(f"Rebuilt {result.rowcount} sender counter rows" + (f" for chat {chat_id}." if chat_id is not None else "."))
+    return result.rowcount
@@ -0,0 +1,133 @@
+# app/engine_registry.py
+
+import asyncio
+import importlib
+import logging
+import sys
+import time
+from types import ModuleType
+from typing import Any, Dict, Optional
+from app.config import SUMMARIZER_MODE, STARTUP_TIME_BUDGET_S, ROUTING_ENABLED, ROUTING_FALLBACK_MODE
+from app.executor import run_in_pool
+
+logger = logging.getLogger(__name__)
+
+# Engine modules are cheap to import: their heavy dependencies (torch, transformers,
+# numpy/scipy, sumy, NLTK) and models are only loaded by `load_model` / `load_tokenizer`.
+ENGINE_MODULES = {
+    "transformer": "app.engine_transformer",
+    "traditional": "app.engine_traditional",
+    "fastlsa": "app.engine_fastlsa",
+}
+
+# Readiness of the engine and the startup profile, reported by `/ready`.
+_state: Dict[str, Any] = {"status": "cold", "error": None}
+_timings: Dict[str, float] = {}
+_import_times: Dict[str, float] = {}
+
+
+def timed_import(module_name: str) -> ModuleType:
+    """
+    Imports a module and records how long the first import took.
+    """
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    started = time.perf_counter()
+    module = importlib.import_module(module_name)
+    _import_times[module_name] = time.perf_counter() - started
+    return module
+
+
+def get_engine(mode: Optional[str] = None) -> ModuleType:
+    """
+    Returns the engine module for `mode` (defaults to SUMMARIZER_MODE; unknown modes fall back to traditional).
+    """
+    return timed_import(ENGINE_MODULES.get(mode or SUMMARIZER_MODE, ENGINE_MODULES["traditional"]))
+
+
+def _load_in_worker(module_name: str) -> Dict[str, Any]:
+    """
+    Runs in the summarization pool: loads the engine's model where it will be used.
+    Returns the worker's load timings, since a process worker cannot update ours.
+    """
+    started = time.perf_counter()
+    timed_import(module_name).load_model()
+    return {"model_load_s": time.perf_counter() - started, "import_times_s": dict(_import_times)}
+
+
+def record_timing(name: str, seconds: float):
+    _timings[name] = seconds
+
+
+async def warm_up():
+    """
+    Loads the engine in the background so the first summary doesn't pay for it.
+    Started from the FastAPI lifespan; `/ready` answers 200 once it has finished.
+    """
+    _state.update(status="warming", error=None)
+    started = time.perf_counter()
+    try:
+        engine = get_engine()
+        if hasattr(engine, "load_tokenizer"):
+            # The web process only needs the tokenizer to count units.
+            tokenizer_started = time.perf_counter()
+            await asyncio.to_thread(engine.load_tokenizer)
+            record_timing("tokenizer_load_s", time.perf_counter() - tokenizer_started)
+        worker = await run_in_pool(_load_in_worker, engine.__name__)
+        record_timing("model_load_s", worker["model_load_s"])
+        _state["worker_import_times_s"] = worker["import_times_s"]
+        if ROUTING_ENABLED and ROUTING_FALLBACK_MODE != SUMMARIZER_MODE:
+            # Summaries are routed to it under load, so it has to be ready too.
+            fallback = await run_in_pool(_load_in_worker, get_engine(ROUTING_FALLBACK_MODE).__name__)
+            record_timing("fallback_model_load_s", fallback["model_load_s"])
+    except Exception as e:
+        _state.update(status="failed", error=str(e))
+        logger.error(f"Engine warm-up failed: {e}", exc_info=True)
+        return
+    finally:
+        record_timing("warmup_s", time.perf_counter() - started)
+
+    _state["status"] = "ready"
+    logger.info(f"Engine warm-up finished. Startup profile: {startup_report()}")
+
+
+def check_startup_budget(startup_seconds: float):
+    """
+    Records how long the app took to start answering requests and warns when it
+    went over STARTUP_TIME_BUDGET_S. Engine warm-up runs after that and is not counted.
+    """
+    record_timing("startup_s", startup_seconds)
+    if startup_seconds > STARTUP_TIME_BUDGET_S:
+        logger.warning(f"Startup took {startup_seconds:.2f}s, over the budget of {STARTUP_TIME_BUDGET_S}s.")
+
+
+def skip_warm_up():
+    """
+    With ENGINE_WARMUP_ENABLED off the engine loads on the first summary; report ready right away.
+    """
+    _state.update(status="lazy", error=None)
+
+
+def is_ready() -> bool:
+    return _state["status"] in ("ready", "lazy")
+
+
+def startup_report() -> Dict[str, Any]:
+    """
+    Returns the readiness status, phase timings and per-module import times.
+    """
+    engine = sys.modules.get(ENGINE_MODULES.get(SUMMARIZER_MODE, ENGINE_MODULES["traditional"]))
+    return {
+        **_state,
+        "mode": SUMMARIZER_MODE,
+        # Counters of the engine loaded in this process, if any (e.g. the stem cache).
+        "engine_stats": engine.get_stats() if hasattr(engine, "get_stats") else {},
+        "timings_s": dict(_timings),
+        "import_times_s": dict(_import_times),
+    }
+
+
+def reset():
+    _state.clear()
+    _state.update(status="cold", error=None)
+    _timings.clear()
@@ -1,42 +1,96 @@
 # app/engine_traditional.py (Corrected Stemmer Version)
 
 import logging
-from sumy.parsers.plaintext import PlaintextParser
-from sumy.nlp.tokenizers import Tokenizer
-from sumy.summarizers.lsa import LsaSummarizer
-from nltk.corpus import stopwords
-from nltk.stem.isri import ISRIStemmer
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, Optional
+from app.config import TRADITIONAL_STEM_CACHE_SIZE
+from app.engine_registry import timed_import
 
 logger = logging.getLogger(__name__)
 
 LANGUAGE = "arabic"
 SENTENCES_COUNT = 5
 
-logger.info("Initializing Traditional (Sumy) engine with NLTK Arabic enhancements.")
+# Used to key cached chunk summaries. Bump the version whenever the output changes.
+ENGINE_NAME = "traditional"
+ENGINE_VERSION = f"sumy-lsa-isri-{SENTENCES_COUNT}"
+
+def make_cached_stemmer(cache_size: int) -> Callable[[str], str]:
+    """
+    Wraps NLTK's Arabic (ISRI) stemmer in a bounded LRU cache. Chats reuse the same
+    words all the time, so most tokens are stemmed once instead of on every chunk.
+    The wrapper exposes `cache_info()`.
+    """
+    stemmer = timed_import("nltk.stem.isri").ISRIStemmer()
+    return lru_cache(maxsize=cache_size)(stemmer.stem)
+
+def stem_cache_stats(stem: Callable[[str], str]) -> Dict[str, float]:
+    """
+    Returns the counters and hit rate of a stemmer built by `make_cached_stemmer`.
+    """
+    info = stem.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "stem_cache_hits": info.hits,
+        "stem_cache_misses": info.misses,
+        "stem_cache_size": info.currsize,
+        "stem_cache_hit_rate": info.hits / lookups if lookups else 0.0,
+    }
+
+class TraditionalEngine:
+    """
+    Extractive (LSA) summarizer, enhanced with NLTK's Arabic stemmer and stopwords.
+
+    Everything that does not depend on the text (stemmer, stopwords, sentence tokenizer,
+    LSA summarizer) is built once and reused for every chunk. None of it is modified
+    while summarizing, so one instance is shared by all the pool's threads.
+    """
+
+    def __init__(self, stem_cache_size: int = TRADITIONAL_STEM_CACHE_SIZE, stop_words: Optional[Iterable[str]] = None):
+        logger.info("Initializing Traditional (Sumy) engine with NLTK Arabic enhancements.")
+        self._parser_class = timed_import("sumy.parsers.plaintext").PlaintextParser
+        self._tokenizer = timed_import("sumy.nlp.tokenizers").Tokenizer(LANGUAGE)
+        self.stem = make_cached_stemmer(stem_cache_size)
+
+        # We pass the cached .stem function, not the whole stemmer object.
+        self._summarizer = timed_import("sumy.summarizers.lsa").LsaSummarizer(self.stem)
+        if stop_words is None:
+            # Use the comprehensive list of Arabic stopwords from NLTK. NLTK re-reads
+            # the corpus file on every `words()` call, so we only ask once.
+            stop_words = timed_import("nltk.corpus").stopwords.words(LANGUAGE)
+        # sumy keeps them as a frozenset, so membership tests stay O(1).
+        self._summarizer.stop_words = frozenset(stop_words)
+
+    def summarize(self, text: str) -> str:
+        logger.debug(f"Starting extractive summarization for an Arabic chunk with length: {len(text)}")
+
+        parser = self._parser_class.from_string(text, self._tokenizer)
+        summary_sentences = [str(sentence) for sentence in self._summarizer(parser.document, SENTENCES_COUNT)]
+        summary = " ".join(summary_sentences)
+
+        logger.debug("Extractive summarization chunk completed successfully.")
+        return summary
+
+    def stats(self) -> Dict[str, float]:
+        return stem_cache_stats(self.stem)
+
+# sumy and NLTK are imported when the engine is first used, not when the app starts.
+_engine: Optional[TraditionalEngine] = None
+
+def load_model() -> TraditionalEngine:
+    """Builds the shared engine instance on first use and returns it."""
+    global _engine
+    if _engine is None:
+        _engine = TraditionalEngine()
+    return _engine
 
 def summarize_chunk(text: str) -> str:
     """
     Summarizes a single piece of text using an extractive (LSA) method,
     enhanced with NLTK's Arabic stemmer and stopwords.
     """
-    logger.debug(f"Starting extractive summarization for an Arabic chunk with length: {len(text)}")
-    
-    parser = PlaintextParser.from_string(text, Tokenizer(LANGUAGE))
-    
-    # --- THE IMPORTANT CHANGE IS HERE ---
-    # 1. Initialize the Arabic stemmer object from NLTK.
-    stemmer_instance = ISRIStemmer()
-    
-    # 2. Initialize the LSA summarizer. We pass the .stem METHOD, not the whole object.
-    summarizer = LsaSummarizer(stemmer_instance.stem)
-    
-    # Use the comprehensive list of Arabic stopwords from NLTK.
-    summarizer.stop_words = stopwords.words(LANGUAGE)
-    
-    # Generate the summary
-    summary_sentences = [str(sentence) for sentence in summarizer(parser.document, SENTENCES_COUNT)]
-    
-    summary = " ".join(summary_sentences)
-    
-    logger.debug("Extractive summarization chunk completed successfully.")
-    return summary
\ No newline at end of file
+    return load_model().summarize(text)
+
+def get_stats() -> Dict[str, float]:
+    """Stem cache counters of the shared engine (empty until it has been loaded)."""
+    return _engine.stats() if _engine is not None else {}
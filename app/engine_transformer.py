@@ -1,39 +1,130 @@
 # app/ai_model.py
 
 import logging
-from transformers import pipeline, AutoTokenizer # Import AutoTokenizer
-import torch
+from typing import Optional
+from app.config import (
+    TRANSFORMER_BACKEND, TRANSFORMER_ONNX_MODEL_DIR, TRANSFORMER_INTRA_OP_THREADS, TRANSFORMER_INTER_OP_THREADS,
+)
+from app.engine_registry import timed_import
 
 logger = logging.getLogger(__name__)
 
 # --- Configuration ---
 # Use the new Arabic model
 MODEL_NAME = "marefa-nlp/summarization-arabic-english-news"
+SUMMARY_MAX_LENGTH = 256
+SUMMARY_MIN_LENGTH = 30
+
+BACKENDS = ("pytorch", "quantized", "onnx")
+
+def engine_version(backend: str) -> str:
+    # Quantized and ONNX models word some summaries differently, so they get their own cache entries.
+    version = f"{MODEL_NAME}:{SUMMARY_MIN_LENGTH}-{SUMMARY_MAX_LENGTH}"
+    return version if backend == "pytorch" else f"{version}:{backend}"
+
+# Used to key cached chunk summaries. Bump the version whenever the output changes.
+ENGINE_NAME = "transformer"
+ENGINE_VERSION = engine_version(TRANSFORMER_BACKEND)
 
 # --- Model and Tokenizer Loading ---
-logger.info(f"Loading summarization model and tokenizer for: {MODEL_NAME}")
-device = 0 if torch.cuda.is_available() else -1
-
-# Load the summarization pipeline (no change here)
-summarizer = pipeline(
-    "summarization",
-    model=MODEL_NAME,
-    device=device
-)
+# Nothing is loaded at import time: torch and transformers take seconds to import
+# and the model much longer, which would hold up the server's startup.
+
+# We use the tokenizer in other parts of the app to count tokens.
+tokenizer = None
 
-# Load the tokenizer associated with our model
-# We will use this in other parts of the app to count tokens
-tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+# The pipeline holds the full seq2seq model. It is only loaded by the processes
+# that actually summarize (the worker pool), not by the web process that only
+# needs the tokenizer to count units.
+summarizer = None
 
-logger.info("Model and tokenizer loaded successfully.")
+def load_tokenizer():
+    """Loads the tokenizer associated with our model on first use and returns it."""
+    global tokenizer
+    if tokenizer is None:
+        logger.info(f"Loading tokenizer for: {MODEL_NAME}")
+        tokenizer = timed_import("transformers").AutoTokenizer.from_pretrained(MODEL_NAME)
+    return tokenizer
+
+def _configure_torch_threads(torch):
+    if TRANSFORMER_INTRA_OP_THREADS > 0:
+        torch.set_num_threads(TRANSFORMER_INTRA_OP_THREADS)
+    if TRANSFORMER_INTER_OP_THREADS > 0:
+        try:
+            torch.set_num_interop_threads(TRANSFORMER_INTER_OP_THREADS)
+        except RuntimeError as e:
+            # Only possible before torch ran any parallel work in this process.
+            logger.warning(f"Could not set torch inter-op threads: {e}")
+
+def _load_quantized_model(transformers, torch):
+    """The seq2seq model with its Linear layers dynamically quantized to int8 (CPU only)."""
+    model = transformers.AutoModelForSeq2SeqLM.from_pretrained(MODEL_NAME)
+    model.eval()
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+def _load_onnx_model(model_dir: str = TRANSFORMER_ONNX_MODEL_DIR):
+    """The model running on ONNX Runtime, from an exported directory or exported now."""
+    try:
+        ort_models = timed_import("optimum.onnxruntime")
+        onnxruntime = timed_import("onnxruntime")
+    except ImportError as e:
+        raise RuntimeError("TRANSFORMER_BACKEND=onnx needs `pip install optimum[onnxruntime]`.") from e
+    options = onnxruntime.SessionOptions()
+    if TRANSFORMER_INTRA_OP_THREADS > 0:
+        options.intra_op_num_threads = TRANSFORMER_INTRA_OP_THREADS
+    if TRANSFORMER_INTER_OP_THREADS > 0:
+        options.inter_op_num_threads = TRANSFORMER_INTER_OP_THREADS
+    if model_dir:
+        return ort_models.ORTModelForSeq2SeqLM.from_pretrained(model_dir, session_options=options)
+    logger.info(f"No TRANSFORMER_ONNX_MODEL_DIR set; exporting {MODEL_NAME} to ONNX now.")
+    return ort_models.ORTModelForSeq2SeqLM.from_pretrained(MODEL_NAME, export=True, session_options=options)
+
+def export_onnx(output_dir: str):
+    """Exports the model and tokenizer to ONNX, for TRANSFORMER_ONNX_MODEL_DIR."""
+    model = _load_onnx_model(model_dir="")
+    model.save_pretrained(output_dir)
+    load_tokenizer().save_pretrained(output_dir)
+
+def load_model(backend: Optional[str] = None):
+    """Loads the summarization pipeline with the configured CPU backend on first use and returns it."""
+    global summarizer
+    if summarizer is None:
+        backend = backend or TRANSFORMER_BACKEND
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown TRANSFORMER_BACKEND {backend!r}; expected one of {BACKENDS}.")
+        logger.info(f"Loading summarization model for: {MODEL_NAME} ({backend} backend)")
+        torch = timed_import("torch")
+        transformers = timed_import("transformers")
+        _configure_torch_threads(torch)
+        if backend == "pytorch":
+            device = 0 if torch.cuda.is_available() else -1
+            summarizer = transformers.pipeline("summarization", model=MODEL_NAME, device=device)
+        else:
+            model = _load_quantized_model(transformers, torch) if backend == "quantized" else _load_onnx_model()
+            summarizer = transformers.pipeline("summarization", model=model, tokenizer=load_tokenizer(), device=-1)
+        logger.info("Model loaded successfully.")
+    return summarizer
 
 def summarize_chunk(text: str) -> str:
     """Summarizes a single piece of text (a chunk of a conversation)."""
     logger.debug(f"Starting summarization for a chunk of text with length: {len(text)}")
-    summary_result = summarizer(text, max_length=256, min_length=30, do_sample=False)
+    summary_result = load_model()(text, max_length=SUMMARY_MAX_LENGTH, min_length=SUMMARY_MIN_LENGTH, do_sample=False)
     summary_text = summary_result[0]['summary_text']
     logger.debug("Summarization chunk completed successfully.")
     return summary_text
+
+def summarize_batch(texts: list[str]) -> list[str]:
+    """Summarizes several chunks in one batched forward pass of the pipeline."""
+    logger.debug(f"Starting batched summarization for {len(texts)} chunks.")
+    summary_results = load_model()(
+        texts,
+        max_length=SUMMARY_MAX_LENGTH,
+        min_length=SUMMARY_MIN_LENGTH,
+        do_sample=False,
+        batch_size=len(texts),
+    )
+    logger.debug("Batched summarization completed successfully.")
+    return [result['summary_text'] for result in summary_results]
 if __name__ == '__main__':
     print("--- Testing the AI Model Standalone ---")
     
@@ -0,0 +1,88 @@
+# app/executor.py
+
+import asyncio
+import importlib
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Callable, Optional, TypeVar
+from app.config import SUMMARIZER_MODE, SUMMARY_EXECUTOR, SUMMARY_WORKERS
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_executor: Optional[Executor] = None
+
+
+def _preload_engine(module_name: str):
+    """
+    Initializer for process workers. Loads the engine's model once per worker
+    instead of once per task.
+    """
+    module = importlib.import_module(module_name)
+    if hasattr(module, "load_model"):
+        module.load_model()
+    logger.info(f"Worker process pre-loaded engine module: {module_name}")
+
+
+def _create_executor() -> Executor:
+    kind = SUMMARY_EXECUTOR
+    if kind == "auto":
+        kind = "process" if SUMMARIZER_MODE == "transformer" else "thread"
+
+    if kind == "process":
+        # Imported here: the registry itself runs its warm-up through this module.
+        from app.engine_registry import ENGINE_MODULES
+        engine_module = ENGINE_MODULES.get(SUMMARIZER_MODE, ENGINE_MODULES["traditional"])
+        logger.info(f"Starting a process pool with {SUMMARY_WORKERS} workers for {engine_module}.")
+        # "spawn" keeps torch's internal threads out of forked children.
+        return ProcessPoolExecutor(
+            max_workers=SUMMARY_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_preload_engine,
+            initargs=(engine_module,),
+        )
+
+    logger.info(f"Starting a thread pool with {SUMMARY_WORKERS} workers.")
+    return ThreadPoolExecutor(max_workers=SUMMARY_WORKERS, thread_name_prefix="summarizer")
+
+
+def get_executor() -> Executor:
+    """
+    Returns the shared summarization executor, creating it on first use.
+    """
+    global _executor
+    if _executor is None:
+        _executor = _create_executor()
+    return _executor
+
+
+def set_executor(executor: Optional[Executor]):
+    """
+    Replaces the shared executor (e.g. with a custom pool). The previous one is shut down.
+    """
+    global _executor
+    if _executor is not None and _executor is not executor:
+        _executor.shutdown(wait=False)
+    _executor = executor
+
+
+async def run_in_pool(func: Callable[..., T], *args) -> T:
+    """
+    Runs a blocking function in the summarization pool without blocking the event loop.
+    For process pools, `func` must be a picklable module-level function.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), func, *args)
+
+
+def shutdown_executor():
+    """
+    Stops the pool's workers. Called from the FastAPI lifespan on shutdown.
+    """
+    global _executor
+    if _executor is not None:
+        logger.info("Shutting down the summarization executor...")
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
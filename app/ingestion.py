@@ -0,0 +1,160 @@
+# app/ingestion.py
+
+import asyncio
+import logging
+from typing import Dict, List, Optional, Set
+from sqlalchemy import insert
+from app import database
+from app.config import ARCHIVE_BATCH_SIZE, ARCHIVE_FLUSH_INTERVAL_MS
+from app.database import Message
+from app.metrics import stage_seconds
+
+logger = logging.getLogger(__name__)
+
+
+def _insert_statement(dialect_name: str):
+    """
+    A redelivered update carries a message that is already archived. The unique
+    (chat_id, message_id) index rejects it; skip it instead of failing the batch.
+    """
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return insert(Message.__table__)
+    return dialect_insert(Message.__table__).on_conflict_do_nothing(index_elements=["chat_id", "message_id"])
+
+
+def _archive(connection, rows: List[Dict]):
+    """
+    Inserts the rows and adds the ones that were actually new (not skipped as
+    duplicates) to the per-sender statistics, in the caller's transaction.
+    """
+    statement = _insert_statement(connection.dialect.name)
+    if connection.dialect.name in ("postgresql", "sqlite"):
+        returned = statement.returning(Message.chat_id, Message.sender_name, Message.timestamp)
+        inserted = [dict(row._mapping) for row in connection.execute(returned, rows)]
+    else:
+        connection.execute(statement, rows)
+        inserted = rows
+    database.record_sender_stats(connection, inserted)
+
+
+def _insert_rows(rows: List[Dict]):
+    """
+    Writes rows with one multi-row INSERT in one transaction. If the batch is
+    rejected (e.g. one bad row), falls back to row-by-row inserts so only the
+    offending rows are lost.
+    """
+    try:
+        with database.engine.begin() as connection:
+            _archive(connection, rows)
+        return
+    except Exception as e:
+        logger.warning(f"Batched insert of {len(rows)} messages failed, retrying row by row: {e}")
+
+    for row in rows:
+        try:
+            with database.engine.begin() as connection:
+                _archive(connection, [row])
+        except Exception as e:
+            logger.error(f"Failed to archive message {row['message_id']} in chat {row['chat_id']}: {e}")
+
+
+async def _insert_rows_async(rows: List[Dict]):
+    try:
+        async with database.async_engine.begin() as connection:
+            await connection.run_sync(_archive, rows)
+        return
+    except Exception as e:
+        logger.warning(f"Batched insert of {len(rows)} messages failed, retrying row by row: {e}")
+
+    for row in rows:
+        try:
+            async with database.async_engine.begin() as connection:
+                await connection.run_sync(_archive, [row])
+        except Exception as e:
+            logger.error(f"Failed to archive message {row['message_id']} in chat {row['chat_id']}: {e}")
+
+
+class MessageBuffer:
+    """
+    Write-behind buffer for archived messages.
+
+    Messages are collected in memory and written with one multi-row INSERT when
+    `max_batch_size` rows are pending or `flush_interval_ms` after the first
+    pending row, whichever comes first. Commands that read the archive call
+    `flush(chat_id)` first, so they always see their chat's latest messages.
+    """
+
+    def __init__(self, max_batch_size: int, flush_interval_ms: float):
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self._pending: List[Dict] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._inflight: Set[asyncio.Task] = set()
+        self.rows_written = 0
+        self.flushes = 0
+
+    def add(self, message: Message):
+        self._pending.append(message.model_dump(exclude={"id"}))
+
+        loop = asyncio.get_running_loop()
+        if len(self._pending) >= self.max_batch_size:
+            self._start_flush()
+        elif self._timer is None or self._timer_loop is not loop:
+            self._timer = loop.call_later(self.flush_interval, self._start_flush)
+            self._timer_loop = loop
+
+    def pending_count(self, chat_id: Optional[int] = None) -> int:
+        return sum(1 for row in self._pending if chat_id is None or row["chat_id"] == chat_id)
+
+    def _start_flush(self, chat_id: Optional[int] = None) -> Optional[asyncio.Task]:
+        if chat_id is None:
+            rows, self._pending = self._pending, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        else:
+            rows = [row for row in self._pending if row["chat_id"] == chat_id]
+            self._pending = [row for row in self._pending if row["chat_id"] != chat_id]
+        if not rows:
+            return None
+
+        task = asyncio.ensure_future(self._write(rows))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+        return task
+
+    async def _write(self, rows: List[Dict]):
+        with stage_seconds.time(stage="archive_write"):
+            if database.async_engine is not None:
+                await _insert_rows_async(rows)
+            else:
+                await asyncio.to_thread(_insert_rows, rows)
+        self.rows_written += len(rows)
+        self.flushes += 1
+        logger.info(f"Archived {len(rows)} buffered messages in one batch.")
+
+    async def flush(self, chat_id: Optional[int] = None):
+        """
+        Writes the pending rows (of one chat, or all of them) and waits until every
+        write already in flight has finished as well.
+        """
+        self._start_flush(chat_id)
+        loop = asyncio.get_running_loop()
+        inflight = [task for task in self._inflight if task.get_loop() is loop]
+        if inflight:
+            await asyncio.gather(*inflight, return_exceptions=True)
+
+    async def drain(self):
+        """
+        Flushes everything. Called from the FastAPI lifespan on shutdown.
+        """
+        logger.info(f"Draining the message buffer ({len(self._pending)} pending rows)...")
+        await self.flush()
+
+
+message_buffer = MessageBuffer(ARCHIVE_BATCH_SIZE, ARCHIVE_FLUSH_INTERVAL_MS)
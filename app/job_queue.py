@@ -0,0 +1,135 @@
+# app/job_queue.py
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Set, Tuple
+from app.config import UPDATE_WORKERS, UPDATE_QUEUE_MAX_DEPTH, UPDATE_QUEUE_ENQUEUE_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+Job = Tuple[Callable[..., Awaitable[Any]], tuple, float] # (coroutine function, args, enqueued_at)
+
+
+class QueueFullError(Exception):
+    """Raised when a job cannot be queued because the queue stayed full."""
+
+
+class ChatJobQueue:
+    """
+    In-process job queue for webhook updates.
+
+    Jobs with the same key (the chat id) run strictly one after another, in the
+    order they were queued. Jobs of different chats run concurrently, but never
+    more than `max_workers` at a time. When `max_depth` jobs are waiting or
+    running, `enqueue` waits up to `enqueue_timeout` seconds for room and then
+    raises QueueFullError, so callers can push back instead of piling up work.
+    """
+
+    def __init__(self, max_workers: int, max_depth: int, enqueue_timeout: float):
+        self.max_workers = max_workers
+        self.max_depth = max_depth
+        self.enqueue_timeout = enqueue_timeout
+        self._chats: Dict[Any, Deque[Job]] = {}
+        self._runners: Set[asyncio.Task] = set()
+        self._depth = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._room: Optional[asyncio.Condition] = None
+        self._idle: Optional[asyncio.Event] = None
+        # Rolling window of recent jobs, for the latency figures in `stats`.
+        self._latencies: Deque[float] = deque(maxlen=1000)
+        self._run_times: Deque[float] = deque(maxlen=1000)
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def _bind_loop(self):
+        # The asyncio primitives belong to one event loop; rebuild them if the loop changed.
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+            self._room = asyncio.Condition()
+            self._idle = asyncio.Event()
+            self._idle.set()
+            self._chats.clear()
+            self._runners.clear()
+            self._depth = 0
+
+    @property
+    def depth(self) -> int:
+        return self._depth
+
+    async def enqueue(self, key: Any, job: Callable[..., Awaitable[Any]], *args):
+        self._bind_loop()
+        if self._depth >= self.max_depth:
+            async with self._room:
+                try:
+                    await asyncio.wait_for(self._room.wait_for(lambda: self._depth < self.max_depth), self.enqueue_timeout)
+                except asyncio.TimeoutError:
+                    self.rejected += 1
+                    raise QueueFullError(f"Update queue is full ({self._depth} jobs).")
+
+        self._depth += 1
+        self._idle.clear()
+        queue = self._chats.get(key)
+        if queue is None:
+            queue = self._chats[key] = deque()
+            runner = asyncio.ensure_future(self._run_chat(key, queue))
+            self._runners.add(runner)
+            runner.add_done_callback(self._runners.discard)
+        queue.append((job, args, time.perf_counter()))
+
+    async def _run_chat(self, key: Any, queue: Deque[Job]):
+        while queue:
+            job, args, enqueued_at = queue[0]
+            async with self._semaphore:
+                started = time.perf_counter()
+                try:
+                    await job(*args)
+                    self.completed += 1
+                except Exception as e:
+                    self.failed += 1
+                    logger.error(f"Job for chat {key} failed: {e}", exc_info=True)
+                finished = time.perf_counter()
+            self._run_times.append(finished - started)
+            self._latencies.append(finished - enqueued_at)
+            queue.popleft()
+            await self._job_done()
+        del self._chats[key]
+        if self._depth == 0:
+            self._idle.set()
+
+    async def _job_done(self):
+        self._depth -= 1
+        async with self._room:
+            self._room.notify_all()
+
+    async def join(self, timeout: Optional[float] = None):
+        """
+        Waits until every queued job has finished.
+        """
+        if self._idle is None or self._loop is not asyncio.get_running_loop():
+            return
+        await asyncio.wait_for(self._idle.wait(), timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        def percentile(values, fraction):
+            ordered = sorted(values)
+            return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+        return {
+            "depth": self._depth,
+            "active_chats": len(self._chats),
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "latency_p50_s": percentile(self._latencies, 0.5),
+            "latency_p95_s": percentile(self._latencies, 0.95),
+            "run_time_p50_s": percentile(self._run_times, 0.5),
+        }
+
+
+update_queue = ChatJobQueue(UPDATE_WORKERS, UPDATE_QUEUE_MAX_DEPTH, UPDATE_QUEUE_ENQUEUE_TIMEOUT)
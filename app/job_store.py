@@ -0,0 +1,132 @@
+# app/job_store.py
+
+import json
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+from app.config import JOB_MAX_ATTEMPTS, JOB_RETRY_BACKOFF_S
+from app.database import Job
+
+logger = logging.getLogger(__name__)
+
+# --- Durable Job Queue ---
+# Jobs live in the `job` table. A worker claims jobs by setting them to "running"
+# with its id and a lease deadline, in one UPDATE ... RETURNING. On PostgreSQL the
+# rows to claim are picked with FOR UPDATE SKIP LOCKED, so concurrent workers never
+# wait for or claim the same row. SQLite has no row locks, but it runs one write
+# statement at a time, so the single UPDATE is just as exclusive for local runs.
+# A running job whose lease ran out is claimable again: its worker is assumed dead.
+
+
+@dataclass
+class ClaimedJob:
+    id: int
+    kind: str
+    chat_id: int
+    payload: Dict[str, Any]
+    attempts: int
+    max_attempts: int
+
+
+def _utcnow() -> datetime:
+    # Stored as naive UTC so it compares the same way on SQLite and PostgreSQL.
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def enqueue_job(session: Session, kind: str, chat_id: int, payload: Dict[str, Any], max_attempts: int = JOB_MAX_ATTEMPTS) -> int:
+    """
+    Stores a job for the workers and returns its id.
+    """
+    now = _utcnow()
+    job = Job(kind=kind, chat_id=chat_id, payload=json.dumps(payload), max_attempts=max_attempts, run_after=now, created_at=now)
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+    logger.info(f"Queued {kind} job {job.id} for chat {chat_id}.")
+    return job.id
+
+
+def claim_jobs(engine: Engine, worker_id: str, limit: int, lease_seconds: float) -> List[ClaimedJob]:
+    """
+    Claims up to `limit` due jobs for `worker_id`, oldest first, and counts the attempt.
+    """
+    now = _utcnow()
+    claimable = (
+        select(Job.id)
+        .where(or_(
+            and_(Job.status == "queued", Job.run_after <= now),
+            and_(Job.status == "running", Job.lease_expires_at < now),
+        ))
+        .order_by(Job.id)
+        .limit(limit)
+    )
+    if engine.dialect.name == "postgresql":
+        claimable = claimable.with_for_update(skip_locked=True)
+    statement = (
+        update(Job)
+        .where(Job.id.in_(claimable))
+        .values(status="running", locked_by=worker_id, lease_expires_at=now + timedelta(seconds=lease_seconds), attempts=Job.attempts + 1)
+        .returning(Job.id, Job.kind, Job.chat_id, Job.payload, Job.attempts, Job.max_attempts)
+    )
+    with engine.begin() as connection:
+        rows = connection.execute(statement).all()
+    return sorted(
+        (ClaimedJob(row.id, row.kind, row.chat_id, json.loads(row.payload), row.attempts, row.max_attempts) for row in rows),
+        key=lambda job: job.id,
+    )
+
+
+def extend_lease(engine: Engine, job_id: int, worker_id: str, lease_seconds: float) -> bool:
+    """
+    Pushes the lease of a running job further out. Returns False if the worker no
+    longer holds the job (its lease ran out and another worker claimed it).
+    """
+    with engine.begin() as connection:
+        updated = connection.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.locked_by == worker_id, Job.status == "running")
+            .values(lease_expires_at=_utcnow() + timedelta(seconds=lease_seconds))
+        ).rowcount
+    return bool(updated)
+
+
+def complete_job(engine: Engine, job_id: int, worker_id: str):
+    """
+    Deletes a finished job (only if this worker still holds it).
+    """
+    with engine.begin() as connection:
+        connection.execute(delete(Job).where(Job.id == job_id, Job.locked_by == worker_id))
+
+
+def fail_job(engine: Engine, job: ClaimedJob, worker_id: str, error: str, backoff_seconds: float = JOB_RETRY_BACKOFF_S) -> str:
+    """
+    Puts a failed job back in the queue after a backoff, or dead-letters it once it
+    has used up its attempts. Returns the new status.
+    """
+    status = "dead" if job.attempts >= job.max_attempts else "queued"
+    with engine.begin() as connection:
+        connection.execute(
+            update(Job)
+            .where(Job.id == job.id, Job.locked_by == worker_id)
+            .values(
+                status=status,
+                locked_by=None,
+                lease_expires_at=None,
+                last_error=error[:2000],
+                run_after=_utcnow() + timedelta(seconds=backoff_seconds * job.attempts),
+            )
+        )
+    return status
+
+
+def get_queue_stats(engine: Engine) -> Dict[str, int]:
+    """
+    Number of jobs per status.
+    """
+    with engine.connect() as connection:
+        rows = connection.execute(select(Job.status, func.count(Job.id)).group_by(Job.status)).all()
+    return {"queued": 0, "running": 0, "dead": 0, **{status: count for status, count in rows}}
@@ -1,14 +1,75 @@
 # app/logic_controller.py
 
 import logging
+from typing import Any, Dict, Optional
 from telegram import Update
 from sqlmodel import Session
 from app import summarization_service, telegram_service
-from app.database import Message, get_messages_in_range, get_chat_statistics, get_last_n_messages
+from app.config import ARCHIVE_BUFFER_ENABLED, PROGRESSIVE_SUMMARY_ENABLED, JOB_QUEUE_BACKEND, SEARCH_RESULTS_LIMIT, SEARCH_CONTEXT_MESSAGES
+from app.job_store import enqueue_job
+from app.metrics import stage_seconds, errors_total
+from app.progress import SummaryProgress
+from app.routing import OverloadedError
+from app.ingestion import message_buffer
+from app.rolling_summary import rolling_summaries
+from app.database import (
+    Message, get_messages_in_range, get_chat_statistics, get_last_n_messages, get_messages_around,
+    run_with_session, save_message, search_messages,
+)
 from telegram.helpers import escape_markdown
 
 logger = logging.getLogger(__name__)
 
+COMMANDS = ("/summarize_last", "/summarize_about", "/summarize", "/search", "/stats", "/start", "/help")
+
+def command_of(update: Update) -> str:
+    """
+    The command an update carries ("summarize_last", "stats", ...), "message" for
+    plain messages, or "other" for updates without text. Used as a metrics label.
+    """
+    if not update.message or not update.message.text:
+        return "other"
+    text = update.message.text.lower()
+    for command in COMMANDS:
+        if text.startswith(command):
+            return command[1:]
+    return "message"
+
+async def send_summary_status(chat_id: int, text: str, title: str) -> Optional[SummaryProgress]:
+    """
+    Sends the "working on it" message. With progressive delivery it becomes the
+    message that shows the progress and, at the end, the summary itself.
+    """
+    if PROGRESSIVE_SUMMARY_ENABLED:
+        message_id = await telegram_service.send_status_message(chat_id, text)
+        if message_id is not None:
+            return SummaryProgress(chat_id, message_id, title)
+        return None
+    await telegram_service.send_message(chat_id, text)
+    return None
+
+async def deliver_summary(chat_id: int, progress: Optional[SummaryProgress], text: str):
+    """
+    Puts the final summary into the status message, or sends it as a new message.
+    """
+    if progress is not None and await progress.finish(text):
+        return
+    await telegram_service.send_message(chat_id, text)
+
+BUSY_MESSAGE = "I'm summarizing a lot of conversations right now. Please try again in a minute."
+
+async def summarize_or_decline(session: Session, chat_id: int, message_objects: list, progress: Optional[SummaryProgress]) -> Optional[str]:
+    """
+    Summarizes the messages, or tells the user to come back later when the bot is
+    too busy to do it in time (see `app.routing`) and returns None.
+    """
+    try:
+        return await summarization_service.summarize_messages(session, chat_id, message_objects, progress=progress)
+    except OverloadedError as e:
+        logger.warning(f"Declined a summary for chat {chat_id}: {e}")
+        await deliver_summary(chat_id, progress, BUSY_MESSAGE)
+        return None
+
 async def handle_update(update: Update, session: Session):
     """
     Handles incoming updates, saves the message, and processes commands.
@@ -26,18 +87,31 @@ async def handle_update(update: Update, session: Session):
             text=update.message.text,
             timestamp=update.message.date
         )
-        session.add(new_message)
-        session.commit()
-        session.refresh(new_message)
-        logger.info(f"Saved message {new_message.message_id} from {new_message.sender_name} to the database.")
+        # Counted once here, so summaries can pack messages into chunks without re-tokenizing them.
+        with stage_seconds.time(stage="unit_count"):
+            new_message.unit_count = summarization_service.count_message_units(new_message)
+        if new_message.unit_count is not None:
+            new_message.unit_kind = summarization_service.UNIT_KIND
+        if ARCHIVE_BUFFER_ENABLED:
+            message_buffer.add(new_message)
+            logger.info(f"Buffered message {new_message.message_id} from {new_message.sender_name} for archiving.")
+        else:
+            with stage_seconds.time(stage="archive_write"):
+                await run_with_session(session, save_message, new_message)
+            logger.info(f"Saved message {new_message.message_id} from {new_message.sender_name} to the database.")
+        rolling_summaries.note_message(new_message.chat_id)
     except Exception as e:
+        errors_total.inc(stage="archive_write")
         logger.error(f"Failed to save message to database: {e}")
-        session.rollback()
 
     # --- Step 2: Handle Commands ---
     chat_id = update.message.chat_id
     text = update.message.text
 
+    # Commands that read the archive must see this chat's buffered messages too.
+    if ARCHIVE_BUFFER_ENABLED and text.lower().startswith(("/stats", "/summarize", "/search")):
+        await message_buffer.flush(chat_id)
+
     if text.lower().startswith("/start"):
         welcome_message = "Welcome! To summarize a conversation, reply to the **starting message** with the `/summarize` command."
         await telegram_service.send_message(chat_id, welcome_message)
@@ -50,24 +124,44 @@ async def handle_update(update: Update, session: Session):
             "1.  `/start` - Displays the welcome message.\n\n"
             "2.  `/summarize` - To use this, you must **reply** to the first message of the conversation you want to summarize.\n\n"
             "3.  `/summarize_last [N]` - Summarizes the last N messages (e.g., `/summarize_last 20`). The default is 50.\n\n"
-            "4.  `/stats` - Displays statistics about the archived messages in this chat.\n\n"
-            "5.  `/help` - Shows this help message."
+            "4.  `/summarize_about <words> [N]` - Summarizes the last N messages (default 20) that mention all the words, with a little context around each.\n\n"
+            "5.  `/search <words>` - Lists the latest messages that mention all the words.\n\n"
+            "6.  `/stats` - Displays statistics about the archived messages in this chat.\n\n"
+            "7.  `/help` - Shows this help message."
         )
         await telegram_service.send_message(chat_id, help_message)
         return
 
     if text.lower().startswith("/stats"):
         logger.info(f"Stats command received for chat_id: {chat_id}")
-        
-        stats = get_chat_statistics(session, chat_id)
-        
-        stats_message = (
-            f"**📊 Chat Statistics**\n\n"
-            f"▪️ **Total Archived Messages:** {stats['total_messages']}\n"
-            f"▪️ **Most Active User:** {stats['most_active_user']}"
+        await run_or_enqueue(session, "stats", chat_id, {})
+        return
+
+    if text.lower().startswith("/search"):
+        terms = text.split(maxsplit=1)[1] if len(text.split(maxsplit=1)) > 1 else ""
+        if not terms.strip():
+            await telegram_service.send_message(chat_id, "Tell me what to look for, e.g. `/search release date`.")
+            return
+        logger.info(f"Search command received for chat_id: {chat_id}")
+        await run_or_enqueue(session, "search", chat_id, {"terms": terms})
+        return
+
+    if text.lower().startswith("/summarize_about"):
+        parts = text.split()[1:]
+        # A trailing number is the match count, unless it is the only word.
+        limit = 20
+        if len(parts) > 1 and parts[-1].isdigit():
+            limit = min(int(parts.pop()), 100)
+        if not parts:
+            await telegram_service.send_message(chat_id, "Tell me the topic, e.g. `/summarize_about release date 30`.")
+            return
+        terms = " ".join(parts)
+        logger.info(f"Summarize about command received for chat_id: {chat_id}")
+
+        progress = await send_summary_status(
+            chat_id, f"Got it! Looking for messages about \"{terms}\"... ⏳", f"**Summary of the messages about {escape_markdown(terms, version=2)}:**"
         )
-        
-        await telegram_service.send_message(chat_id, stats_message)
+        await run_or_enqueue(session, "summarize_about", chat_id, {"terms": terms, "limit": limit}, progress)
         return
 
     if text.lower().startswith("/summarize_last"):
@@ -82,18 +176,10 @@ async def handle_update(update: Update, session: Session):
             if limit > 200:
                 limit = 200
 
-        await telegram_service.send_message(chat_id, f"Got it! Summarizing the last {limit} messages for you... ⏳")
-        
-        message_objects = get_last_n_messages(session, chat_id, limit=limit)
-
-        if not message_objects:
-            await telegram_service.send_message(chat_id, "I couldn't find any recent messages to summarize.")
-            return
-            
-        messages_to_summarize = [f"{msg.sender_name}: {msg.text}" for msg in message_objects]
-        summary = summarization_service.create_summary(messages_to_summarize)
-        sanitized_summary = escape_markdown(summary, version=2) 
-        await telegram_service.send_message(chat_id, f"**Summary of the last {len(message_objects)} messages:**\n\n{sanitized_summary}")
+        progress = await send_summary_status(
+            chat_id, f"Got it! Summarizing the last {limit} messages for you... ⏳", f"**Summary of the last {limit} messages:**"
+        )
+        await run_or_enqueue(session, "summarize_last", chat_id, {"limit": limit}, progress)
         return
 
     if text.lower().startswith("/summarize"):
@@ -102,22 +188,125 @@ async def handle_update(update: Update, session: Session):
             start_id = update.message.reply_to_message.message_id
             end_id = update.message.message_id
             
-            await telegram_service.send_message(chat_id, "Got it! Searching the archive for your conversation... ⏳")
-            
-            message_objects = get_messages_in_range(session, chat_id, start_id, end_id)
-            
-            if not message_objects:
-                await telegram_service.send_message(chat_id, "I couldn't find any messages in the archive for this range.")
-                return
-            
-            messages_to_summarize = [f"{msg.sender_name}: {msg.text}" for msg in message_objects]
-
-            summary = summarization_service.create_summary(messages_to_summarize)
-            
-            sanitized_summary = escape_markdown(summary, version=2) 
-            
-            await telegram_service.send_message(chat_id, f"**Summary of the conversation:**\n\n{sanitized_summary}")
+            progress = await send_summary_status(
+                chat_id, "Got it! Searching the archive for your conversation... ⏳", "**Summary of the conversation:**"
+            )
+            await run_or_enqueue(session, "summarize_range", chat_id, {"start_id": start_id, "end_id": end_id}, progress)
         else:
             error_message = "Please **reply** to the first message of the conversation you want to summarize."
             await telegram_service.send_message(chat_id, error_message)
-        return
\ No newline at end of file
+        return
+
+# --- Command Jobs ---
+# The work behind /stats and the summarize commands. It runs right here, or with
+# JOB_QUEUE_BACKEND=database, in a worker process (app/worker.py) that picked up the job.
+
+async def reply_with_stats(session: Session, chat_id: int, progress: Optional[SummaryProgress] = None):
+    with stage_seconds.time(stage="stats_query"):
+        stats = await run_with_session(session, get_chat_statistics, chat_id)
+    
+    stats_message = (
+        f"**📊 Chat Statistics**\n\n"
+        f"▪️ **Total Archived Messages:** {stats['total_messages']}\n"
+        f"▪️ **Most Active User:** {stats['most_active_user']}"
+    )
+    if stats.get("top_senders"):
+        top_senders = ", ".join(f"{name} ({count})" for name, count in stats["top_senders"])
+        stats_message += f"\n▪️ **Top Senders:** {top_senders}"
+    if stats.get("messages_per_day"):
+        stats_message += f"\n▪️ **Messages per Day:** {stats['messages_per_day']:.1f}"
+    
+    await telegram_service.send_message(chat_id, stats_message)
+
+async def reply_with_last_summary(session: Session, chat_id: int, limit: int, progress: Optional[SummaryProgress] = None):
+    rolling = await rolling_summaries.answer(session, chat_id, limit)
+    if rolling is not None:
+        summary, count = rolling
+        await deliver_summary(chat_id, progress, f"**Summary of the last {count} messages:**\n\n{escape_markdown(summary, version=2)}")
+        return
+
+    with stage_seconds.time(stage="range_query"):
+        message_objects = await run_with_session(session, get_last_n_messages, chat_id, limit=limit)
+
+    if not message_objects:
+        await telegram_service.send_message(chat_id, "I couldn't find any recent messages to summarize.")
+        return
+        
+    summary = await summarize_or_decline(session, chat_id, message_objects, progress)
+    if summary is None:
+        return
+    sanitized_summary = escape_markdown(summary, version=2) 
+    await deliver_summary(chat_id, progress, f"**Summary of the last {len(message_objects)} messages:**\n\n{sanitized_summary}")
+
+async def reply_with_range_summary(session: Session, chat_id: int, start_id: int, end_id: int, progress: Optional[SummaryProgress] = None):
+    with stage_seconds.time(stage="range_query"):
+        message_objects = await run_with_session(session, get_messages_in_range, chat_id, start_id, end_id)
+    
+    if not message_objects:
+        await telegram_service.send_message(chat_id, "I couldn't find any messages in the archive for this range.")
+        return
+    
+    summary = await summarize_or_decline(session, chat_id, message_objects, progress)
+    if summary is None:
+        return
+    
+    sanitized_summary = escape_markdown(summary, version=2) 
+    
+    await deliver_summary(chat_id, progress, f"**Summary of the conversation:**\n\n{sanitized_summary}")
+
+async def reply_with_search(session: Session, chat_id: int, terms: str, progress: Optional[SummaryProgress] = None):
+    with stage_seconds.time(stage="search_query"):
+        matches = await run_with_session(session, search_messages, chat_id, terms, SEARCH_RESULTS_LIMIT)
+
+    if not matches:
+        await telegram_service.send_message(chat_id, "I couldn't find any messages with those words.")
+        return
+
+    lines = [f"**🔎 Latest messages about {escape_markdown(terms, version=2)}:**\n"]
+    for message in matches:
+        snippet = message.text if len(message.text) <= 200 else message.text[:200] + "…"
+        lines.append(f"▪️ **{escape_markdown(message.sender_name, version=2)}** ({message.timestamp:%Y-%m-%d %H:%M}): {escape_markdown(snippet, version=2)}")
+    await telegram_service.send_message(chat_id, "\n".join(lines))
+
+async def reply_with_topic_summary(session: Session, chat_id: int, terms: str, limit: int, progress: Optional[SummaryProgress] = None):
+    # Only the matches and their neighbours are read and summarized, never the whole range.
+    with stage_seconds.time(stage="search_query"):
+        matches = await run_with_session(session, search_messages, chat_id, terms, limit)
+        message_objects = await run_with_session(
+            session, get_messages_around, chat_id, [message.message_id for message in matches], SEARCH_CONTEXT_MESSAGES
+        )
+
+    if not message_objects:
+        await deliver_summary(chat_id, progress, "I couldn't find any messages with those words.")
+        return
+
+    summary = await summarize_or_decline(session, chat_id, message_objects, progress)
+    if summary is None:
+        return
+    await deliver_summary(
+        chat_id, progress,
+        f"**Summary of {len(matches)} messages about {escape_markdown(terms, version=2)}:**\n\n{escape_markdown(summary, version=2)}",
+    )
+
+JOB_HANDLERS = {
+    "stats": lambda session, chat_id, payload, progress: reply_with_stats(session, chat_id, progress),
+    "summarize_last": lambda session, chat_id, payload, progress: reply_with_last_summary(session, chat_id, payload["limit"], progress),
+    "summarize_range": lambda session, chat_id, payload, progress: reply_with_range_summary(session, chat_id, payload["start_id"], payload["end_id"], progress),
+    "search": lambda session, chat_id, payload, progress: reply_with_search(session, chat_id, payload["terms"], progress),
+    "summarize_about": lambda session, chat_id, payload, progress: reply_with_topic_summary(session, chat_id, payload["terms"], payload["limit"], progress),
+}
+
+async def run_job(session: Session, kind: str, chat_id: int, payload: Dict[str, Any], progress: Optional[SummaryProgress] = None):
+    await JOB_HANDLERS[kind](session, chat_id, payload, progress)
+
+async def run_or_enqueue(session: Session, kind: str, chat_id: int, payload: Dict[str, Any], progress: Optional[SummaryProgress] = None):
+    """
+    Runs a command job now, or queues it for the workers. The status message goes
+    along with a queued job, so the worker can edit the summary into it.
+    """
+    if JOB_QUEUE_BACKEND != "database":
+        await run_job(session, kind, chat_id, payload, progress)
+        return
+    if progress is not None:
+        payload = {**payload, "status_message_id": progress.message_id, "title": progress.title}
+    await run_with_session(session, enqueue_job, kind, chat_id, payload)
@@ -0,0 +1,67 @@
+# app/maintenance.py
+
+import argparse
+import logging
+from typing import Optional
+from app import database
+from app.config import COLD_STORAGE_AFTER_DAYS
+from app.logging_config import setup_logging
+
+logger = logging.getLogger(__name__)
+
+
+def rebuild_chat_statistics(chat_id: Optional[int] = None) -> int:
+    """
+    Recomputes the per-sender counters from the archive, in one transaction.
+    Use it after editing the archive by hand or if the counters drifted.
+    """
+    database.create_db_and_tables()
+    with database.engine.begin() as connection:
+        return database.rebuild_sender_stats(connection, chat_id)
+
+
+def export_onnx_model(output_dir: str):
+    """
+    Exports the transformer model to ONNX once, so TRANSFORMER_BACKEND=onnx can load
+    it from TRANSFORMER_ONNX_MODEL_DIR instead of exporting it at every startup.
+    """
+    from app import engine_transformer
+    engine_transformer.export_onnx(output_dir)
+
+
+def compact_cold_storage(older_than_days: int, chat_id: Optional[int] = None) -> dict:
+    """
+    Moves old messages from the `message` table into compressed cold segments.
+    Safe to run from cron while the bot is running; each segment is its own transaction.
+    """
+    from app import cold_storage
+    database.create_db_and_tables()
+    return cold_storage.compact(database.engine, older_than_days, chat_id)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.maintenance", description="Archive maintenance tasks.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    rebuild = commands.add_parser("rebuild-stats", help="Recompute /stats counters from the archived messages.")
+    rebuild.add_argument("--chat-id", type=int, default=None, help="Only rebuild this chat.")
+    export = commands.add_parser("export-onnx", help="Export the transformer model for TRANSFORMER_BACKEND=onnx.")
+    export.add_argument("output_dir", help="Directory to write the ONNX model to (use it as TRANSFORMER_ONNX_MODEL_DIR).")
+    compact = commands.add_parser("compact-cold", help="Move old messages into compressed cold storage segments.")
+    compact.add_argument("--older-than-days", type=int, default=COLD_STORAGE_AFTER_DAYS)
+    compact.add_argument("--chat-id", type=int, default=None, help="Only compact this chat.")
+    args = parser.parse_args(argv)
+
+    setup_logging()
+    if args.command == "rebuild-stats":
+        rows = rebuild_chat_statistics(args.chat_id)
+        print(f"Rebuilt {rows} sender counter rows.")
+    elif args.command == "export-onnx":
+        export_onnx_model(args.output_dir)
+        print(f"Exported the ONNX model to {args.output_dir}.")
+    elif args.command == "compact-cold":
+        totals = compact_cold_storage(args.older_than_days, args.chat_id)
+        print(f"Moved {totals['messages']} messages into {totals['segments']} cold segments ({totals['bytes']} bytes).")
+
+
+if __name__ == "__main__":
+    main()
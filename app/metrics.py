@@ -0,0 +1,235 @@
+# app/metrics.py
+#
+# Counters, gauges and histograms, served at /metrics in the Prometheus text format.
+# Recording is a dict lookup, a bisect and an add under a lock, cheap enough to
+# leave on in production. METRICS_ENABLED=false turns recording and the endpoint off.
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from app.config import METRICS_ENABLED
+
+# Seconds. Covers everything from a cached DB read to a slow transformer pass.
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(_Metric):
+    """
+    A value that goes up and down. With `set_function`, it is read from a callback
+    when /metrics is scraped instead, e.g. to export a component's own counters.
+    """
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._function: Optional[Callable[[], Dict[LabelValues, float]]] = None
+
+    def inc(self, amount: float = 1, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def set_function(self, function: Callable[[], object]):
+        """
+        `function` returns a number, or for a labelled gauge a dict of label-value tuples to numbers.
+        """
+        if self.labelnames:
+            self._function = function
+        else:
+            self._function = lambda: {(): function()}
+
+    @contextmanager
+    def track_inprogress(self, **labels) -> Iterator[None]:
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def _samples(self) -> List[str]:
+        if self._function is not None:
+            items = sorted((tuple(str(v) for v in key), value) for key, value in self._function().items())
+        else:
+            with self._lock:
+                items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (last one is +Inf)..., sum]
+        self._series: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return int(sum(series[:-1])) if series else 0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        lines = []
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), series[:-1]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {_format_value(cumulative)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered.")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# --- The bot's metrics ---
+
+# Stages of handling an update: archive_write, range_query, cold_read, stats_query, search_query, preprocess, unit_count, chunking, telegram_send, telegram_edit.
+stage_seconds = registry.register(Histogram(
+    "summarizer_stage_seconds", "Time spent in each stage of handling an update.", ("stage",)))
+chunk_seconds = registry.register(Histogram(
+    "summarizer_chunk_seconds", "Time to summarize one chunk, by engine and reduce-tree level (0 = leaves).", ("engine", "level")))
+update_seconds = registry.register(Histogram(
+    "summarizer_update_seconds", "Time to handle one update, by command.", ("command",)))
+updates_total = registry.register(Counter(
+    "summarizer_updates_total", "Updates handled, by command.", ("command",)))
+errors_total = registry.register(Counter(
+    "summarizer_errors_total", "Errors, by the stage they happened in.", ("stage",)))
+summaries_in_flight = registry.register(Gauge(
+    "summarizer_summaries_in_flight", "Summaries being computed right now."))
+jobs_total = registry.register(Counter(
+    "summarizer_jobs_total", "Database queue jobs run by this worker, by kind and outcome (completed, retried, dead).", ("kind", "outcome")))
+preprocess_removed_units = registry.register(Histogram(
+    "summarizer_preprocess_removed_units", "Units removed from each summary request by preprocessing.", (),
+    (0, 10, 50, 100, 250, 500, 1_000, 2_500, 5_000, 10_000, 50_000)))
+preprocess_dropped_total = registry.register(Counter(
+    "summarizer_preprocess_dropped_total", "Messages removed or merged away by preprocessing, by step.", ("step",)))
+routing_decisions_total = registry.register(Counter(
+    "summarizer_routing_decisions_total", "Engine routing decisions (primary, fallback, shed) and the engine chosen.", ("decision", "engine")))
+single_flight_total = registry.register(Counter(
+    "summarizer_single_flight_total", "Summary requests that computed a summary (executed) or joined an identical one in flight (coalesced).", ("outcome",)))
+
+
+def render() -> str:
+    return registry.render()
@@ -0,0 +1,108 @@
+# app/migrations.py
+
+import logging
+from datetime import datetime, timezone
+from typing import Callable, List, Tuple
+from sqlalchemy import inspect, insert, select, text
+from sqlalchemy.engine import Connection, Engine
+from app.database import SEARCH_VECTOR_SQL, SchemaMigration, rebuild_sender_stats
+
+logger = logging.getLogger(__name__)
+
+# --- Migrations ---
+# `create_all` only creates missing tables; it never changes existing ones.
+# Each step below upgrades an archive created by an older version of the bot.
+# Steps must be idempotent, because a fresh database already has the new schema.
+
+def _message_composite_indexes(connection: Connection):
+    """
+    Replaces the single-column indexes on message_id, chat_id and timestamp with
+    composite (chat_id, message_id) (unique) and (chat_id, timestamp) indexes.
+    """
+    # Older versions could archive the same message twice; keep the first copy.
+    removed = connection.execute(text(
+        "DELETE FROM message WHERE id NOT IN "
+        "(SELECT MIN(id) FROM message GROUP BY chat_id, message_id)"
+    )).rowcount
+    if removed:
+        logger.info(f"Removed {removed} duplicate archived messages.")
+
+    for old_index in ("ix_message_message_id", "ix_message_chat_id", "ix_message_timestamp"):
+        connection.execute(text(f"DROP INDEX IF EXISTS {old_index}"))
+    connection.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS uq_message_chat_message ON message (chat_id, message_id)"))
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_message_chat_timestamp ON message (chat_id, timestamp)"))
+
+def _chat_sender_stats_backfill(connection: Connection):
+    """
+    Fills the per-sender counters (new table, created by `create_all`) from the
+    messages archived before they existed.
+    """
+    rebuild_sender_stats(connection)
+
+def _message_unit_counts(connection: Connection):
+    """
+    Adds the per-message unit count columns. Existing rows keep NULL and are
+    counted when they are summarized.
+    """
+    columns = {column["name"] for column in inspect(connection).get_columns("message")}
+    if "unit_count" not in columns:
+        connection.execute(text("ALTER TABLE message ADD COLUMN unit_count INTEGER"))
+    if "unit_kind" not in columns:
+        connection.execute(text("ALTER TABLE message ADD COLUMN unit_kind VARCHAR"))
+
+def _message_search_index(connection: Connection):
+    """
+    Adds the full-text index over message text. PostgreSQL indexes the tsvector of
+    each row in a GIN expression index, which it keeps up to date by itself. SQLite
+    gets an external-content FTS5 table (no second copy of the text) that triggers
+    keep in step with `message`; rows already archived are indexed once here.
+    """
+    if connection.dialect.name == "postgresql":
+        connection.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_message_text_search ON message USING GIN ({SEARCH_VECTOR_SQL})"
+        ))
+        return
+    connection.execute(text(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS message_fts USING fts5"
+        "(text, content='message', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+    ))
+    connection.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS message_fts_insert AFTER INSERT ON message BEGIN "
+        "INSERT INTO message_fts(rowid, text) VALUES (new.id, new.text); END"
+    ))
+    connection.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS message_fts_delete AFTER DELETE ON message BEGIN "
+        "INSERT INTO message_fts(message_fts, rowid, text) VALUES ('delete', old.id, old.text); END"
+    ))
+    connection.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS message_fts_update AFTER UPDATE OF text ON message BEGIN "
+        "INSERT INTO message_fts(message_fts, rowid, text) VALUES ('delete', old.id, old.text); "
+        "INSERT INTO message_fts(rowid, text) VALUES (new.id, new.text); END"
+    ))
+    connection.execute(text("INSERT INTO message_fts(message_fts) VALUES ('rebuild')"))
+
+MIGRATIONS: List[Tuple[str, Callable[[Connection], None]]] = [
+    ("0001_message_composite_indexes", _message_composite_indexes),
+    ("0002_chat_sender_stats_backfill", _chat_sender_stats_backfill),
+    ("0003_message_unit_counts", _message_unit_counts),
+    ("0004_message_search_index", _message_search_index),
+]
+
+def run_migrations(engine: Engine):
+    """
+    Applies every migration that is not recorded in `schemamigration` yet, in order,
+    each one in its own transaction.
+    """
+    with engine.begin() as connection:
+        applied = set(connection.execute(select(SchemaMigration.version)).scalars())
+
+    for version, migrate in MIGRATIONS:
+        if version in applied:
+            continue
+        logger.info(f"Applying schema migration {version}...")
+        with engine.begin() as connection:
+            migrate(connection)
+            connection.execute(insert(SchemaMigration).values(
+                version=version,
+                applied_at=datetime.now(timezone.utc).replace(tzinfo=None),
+            ))
@@ -0,0 +1,178 @@
+# app/outbound.py
+
+import asyncio
+import logging
+import time
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+from telegram.error import NetworkError, RetryAfter, TimedOut
+from app.config import (
+    TELEGRAM_GLOBAL_RATE, TELEGRAM_CHAT_RATE, TELEGRAM_GROUP_RATE_PER_MIN, TELEGRAM_CHAT_BURST, TELEGRAM_MAX_RETRIES,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Telegram rejects messages longer than this many characters.
+MAX_MESSAGE_LENGTH = 4096
+
+# Characters that open and close a Markdown entity.
+_ENTITY_MARKERS = "*_`"
+
+
+class TokenBucket:
+    """
+    Allows `rate` operations per second on average, with bursts of up to `capacity`.
+    `pause` blocks the bucket completely, e.g. for the `retry_after` of a 429.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self._refill(now)
+            if now < self.paused_until:
+                await asyncio.sleep(self.paused_until - now)
+                continue
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def is_idle(self) -> bool:
+        self._refill(time.monotonic())
+        return self.tokens >= self.capacity and time.monotonic() >= self.paused_until
+
+
+def _retry_seconds(error: RetryAfter) -> float:
+    retry_after = error.retry_after
+    return retry_after.total_seconds() if isinstance(retry_after, timedelta) else float(retry_after)
+
+
+class OutboundSender:
+    """
+    Paces every Bot API call that sends to a chat.
+
+    Each call takes a token from the global bucket and from the chat's bucket
+    (private chats and groups have different limits). A 429 pauses the chat's bucket
+    (or the global one, for a 429 without a chat) for `retry_after` seconds and the
+    call is retried after that, so the chat's other queued messages wait as well.
+    Timeouts and network errors are retried with exponential backoff.
+    """
+
+    def __init__(self, global_rate: float, chat_rate: float, group_rate_per_min: float, chat_burst: float, max_retries: int):
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate_per_min / 60
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self._chat_buckets: Dict[Any, TokenBucket] = {}
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+
+    def _bucket_for(self, chat_id: Any) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) >= 10000:
+                # Forget chats that are idle; a fresh bucket starts full anyway.
+                self._chat_buckets = {key: b for key, b in self._chat_buckets.items() if not b.is_idle()}
+            # Group chat ids are negative.
+            is_group = isinstance(chat_id, int) and chat_id < 0
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self.group_rate if is_group else self.chat_rate, self.chat_burst)
+        return bucket
+
+    async def call(self, chat_id: Any, request: Callable[[], Awaitable[T]]) -> T:
+        """
+        Runs `request` (a Bot API call for `chat_id`) within the rate limits, retrying
+        429s and transient errors. Raises the last error once the retries are used up.
+        """
+        chat_bucket = self._bucket_for(chat_id)
+        for attempt in range(self.max_retries + 1):
+            await chat_bucket.acquire()
+            await self.global_bucket.acquire()
+            try:
+                result = await request()
+                self.sent += 1
+                return result
+            except RetryAfter as e:
+                if attempt == self.max_retries:
+                    self.failed += 1
+                    raise
+                delay = _retry_seconds(e)
+                logger.warning(f"Telegram flood control for chat {chat_id}: retrying in {delay}s.")
+                chat_bucket.pause(delay)
+            except (TimedOut, NetworkError) as e:
+                if attempt == self.max_retries:
+                    self.failed += 1
+                    raise
+                delay = 0.5 * 2 ** attempt
+                logger.warning(f"Sending to chat {chat_id} failed ({e}); retrying in {delay}s.")
+                await asyncio.sleep(delay)
+            self.retried += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {"sent": self.sent, "retried": self.retried, "failed": self.failed, "chats": len(self._chat_buckets)}
+
+
+def _safe_cut(window: str) -> Optional[int]:
+    """
+    Returns the best position to cut `window` at: the last paragraph break, else line
+    break, else space, at which no Markdown entity is open and no escape is pending.
+    """
+    counts = dict.fromkeys(_ENTITY_MARKERS, 0)
+    best = {"\n\n": None, "\n": None, " ": None}
+    escaped = False
+    for position, char in enumerate(window):
+        balanced = not escaped and all(count % 2 == 0 for count in counts.values())
+        if balanced and position > 0:
+            if window.startswith("\n\n", position):
+                best["\n\n"] = position
+            if char == "\n":
+                best["\n"] = position
+            elif char == " ":
+                best[" "] = position
+        if escaped:
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char in counts:
+            counts[char] += 1
+    return next((best[separator] for separator in ("\n\n", "\n", " ") if best[separator] is not None), None)
+
+
+def split_message(text: str, limit: int = MAX_MESSAGE_LENGTH) -> List[str]:
+    """
+    Splits a message into parts Telegram accepts. Cuts at a paragraph break if possible,
+    then at a line break, then at a space, and only where no Markdown entity (bold,
+    italic, code) is left open and no escape is cut off from the character it escapes.
+    """
+    parts = []
+    while len(text) > limit:
+        window = text[:limit]
+        cut = _safe_cut(window)
+        if cut is None:
+            # No safe separator: cut hard, but never right after an escaping backslash.
+            cut = limit - 1 if window.endswith("\\") else limit
+        parts.append(text[:cut].rstrip())
+        text = text[cut:].lstrip()
+    if text:
+        parts.append(text)
+    return parts
+
+
+outbound = OutboundSender(TELEGRAM_GLOBAL_RATE, TELEGRAM_CHAT_RATE, TELEGRAM_GROUP_RATE_PER_MIN, TELEGRAM_CHAT_BURST, TELEGRAM_MAX_RETRIES)
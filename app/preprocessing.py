@@ -0,0 +1,185 @@
+# app/preprocessing.py
+
+import logging
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from app.config import (
+    CHUNK_ID_SPAN, PREPROCESS_STEPS, PREPROCESS_MIN_WORDS, PREPROCESS_DUPLICATE_WINDOW, PREPROCESS_DUPLICATE_SIMILARITY,
+)
+logger = logging.getLogger(__name__)
+
+# --- Noise Filtering ---
+# Runs between the archive query and the engine. Chats are full of lines that cost
+# units but add nothing to a summary ("ok", emoji-only replies, bare links, the same
+# message pasted twice), and every message repeats its sender's name. Each step takes
+# and returns the messages in order; a changed message is replaced by a `CleanedMessage`,
+# so rows loaded from the database are never modified.
+
+# Harakat, superscript alef and Quranic annotation marks, and tatweel.
+_ARABIC_MARKS = re.compile("[\u064B-\u065F\u0670\u06D6-\u06DC\u06DF-\u06E4\u06E7\u06E8\u06EA-\u06ED\u0640]")
+_URL = re.compile(r"(?:https?://|www\.)([^/\s?#]+)\S*", re.IGNORECASE)
+_WORD = re.compile(r"\w+")
+
+
+def _may_have_url(text: str) -> bool:
+    # Far cheaper than the regex, and most messages have no link.
+    return "://" in text or "www." in text or "WWW." in text
+
+
+@dataclass
+class PreprocessReport:
+    messages_in: int
+    messages_out: int = 0
+    units_in: int = 0
+    units_out: int = 0
+    # Messages taken out, by step: removed as noise, or folded into the previous message.
+    dropped: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def units_removed(self) -> int:
+        return self.units_in - self.units_out
+
+
+@dataclass
+class CleanedMessage:
+    """
+    A message whose text was changed by a step. It has the fields of `Message` that
+    summarization reads, but none of the ORM machinery, which makes it much cheaper to build.
+    """
+    message_id: int
+    chat_id: int
+    sender_name: str
+    text: str
+    timestamp: datetime
+    # Unit counts stored at ingest no longer apply to the new text.
+    unit_count: Optional[int] = None
+    unit_kind: Optional[str] = None
+
+
+def _with_text(message: Any, text: str) -> CleanedMessage:
+    return CleanedMessage(message.message_id, message.chat_id, message.sender_name, text, message.timestamp)
+
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(text.casefold())
+
+
+def normalize_arabic(messages: List[Any], dropped: Dict[str, int]) -> List[Any]:
+    """
+    Strips Arabic diacritics and tatweel, which only inflate token counts.
+    """
+    result = []
+    for message in messages:
+        text = _ARABIC_MARKS.sub("", message.text)
+        result.append(message if text == message.text else _with_text(message, text))
+    return result
+
+
+def collapse_urls(messages: List[Any], dropped: Dict[str, int]) -> List[Any]:
+    """
+    Replaces every link with its host name, e.g. "https://github.com/a/b?c=d" with "github.com".
+    """
+    result = []
+    for message in messages:
+        if not _may_have_url(message.text):
+            result.append(message)
+            continue
+        text = _URL.sub(lambda match: match.group(1).lower(), message.text)
+        result.append(message if text == message.text else _with_text(message, text))
+    return result
+
+
+def drop_low_content(messages: List[Any], dropped: Dict[str, int]) -> List[Any]:
+    """
+    Drops messages with fewer than PREPROCESS_MIN_WORDS words: acknowledgements,
+    emoji-only replies, stickers sent as text, and bare links.
+    """
+    result = []
+    for message in messages:
+        # A link on its own says nothing about the conversation.
+        words = _words(_URL.sub(" ", message.text) if _may_have_url(message.text) else message.text)
+        if len(words) < PREPROCESS_MIN_WORDS:
+            dropped["drop_low_content"] = dropped.get("drop_low_content", 0) + 1
+            continue
+        result.append(message)
+    return result
+
+
+def drop_duplicates(messages: List[Any], dropped: Dict[str, int]) -> List[Any]:
+    """
+    Drops a message whose words are (almost) the same as one of the last
+    PREPROCESS_DUPLICATE_WINDOW messages kept, by Jaccard similarity of their word sets.
+    """
+    threshold = PREPROCESS_DUPLICATE_SIMILARITY
+    recent: deque = deque(maxlen=PREPROCESS_DUPLICATE_WINDOW) # (words, len(words))
+    result = []
+    for message in messages:
+        words = frozenset(_words(message.text))
+        size = len(words)
+        if size and any(_similar(words, size, other, other_size, threshold) for other, other_size in recent):
+            dropped["drop_duplicates"] = dropped.get("drop_duplicates", 0) + 1
+            continue
+        recent.append((words, size))
+        result.append(message)
+    return result
+
+
+def _similar(words: frozenset, size: int, other: frozenset, other_size: int, threshold: float) -> bool:
+    # Jaccard similarity is at most the ratio of the set sizes; skip the intersection when that is too low.
+    if size < threshold * other_size or other_size < threshold * size:
+        return False
+    shared = len(words & other)
+    return shared >= threshold * (size + other_size - shared)
+
+
+def merge_senders(messages: List[Any], dropped: Dict[str, int]) -> List[Any]:
+    """
+    Folds consecutive messages from one sender into one message, so the sender's
+    name is counted once. A run never crosses a CHUNK_ID_SPAN block of message ids,
+    so the chunk cache still sees the same chunks.
+    """
+    runs: List[List[Any]] = []
+    for message in messages:
+        previous = runs[-1][-1] if runs else None
+        if (previous is not None and previous.sender_name == message.sender_name
+                and previous.message_id // CHUNK_ID_SPAN == message.message_id // CHUNK_ID_SPAN):
+            runs[-1].append(message)
+        else:
+            runs.append([message])
+    merged = len(messages) - len(runs)
+    if merged:
+        dropped["merge_senders"] = dropped.get("merge_senders", 0) + merged
+    return [run[0] if len(run) == 1 else _with_text(run[0], "\n".join(message.text for message in run)) for run in runs]
+
+
+STEPS: Dict[str, Callable[[List[Any], Dict[str, int]], List[Any]]] = {
+    "normalize_arabic": normalize_arabic,
+    "collapse_urls": collapse_urls,
+    "drop_low_content": drop_low_content,
+    "drop_duplicates": drop_duplicates,
+    "merge_senders": merge_senders,
+}
+
+
+def check_steps(steps: Sequence[str]) -> List[str]:
+    unknown = [step for step in steps if step not in STEPS]
+    if unknown:
+        raise ValueError(f"Unknown preprocessing steps {unknown}; choose from {list(STEPS)}.")
+    return list(steps)
+
+
+def preprocess(messages: List[Any], count_units: Callable[[Any], int],
+               steps: Optional[Sequence[str]] = None) -> tuple[List[Any], PreprocessReport]:
+    """
+    Runs the messages through `steps` (default PREPROCESS_STEPS, in order) and reports
+    what was removed, with units counted by `count_units`.
+    """
+    report = PreprocessReport(messages_in=len(messages), units_in=sum(count_units(m) for m in messages))
+    for step in check_steps(PREPROCESS_STEPS if steps is None else steps):
+        messages = STEPS[step](messages, report.dropped)
+    report.messages_out = len(messages)
+    report.units_out = sum(count_units(m) for m in messages)
+    return messages, report
@@ -0,0 +1,92 @@
+# app/progress.py
+
+import asyncio
+import logging
+import time
+from typing import List, Optional
+from telegram.helpers import escape_markdown
+from app import telegram_service
+from app.config import PROGRESS_EDIT_INTERVAL_S
+
+logger = logging.getLogger(__name__)
+
+# Telegram messages hold at most 4096 characters; leave room for the header.
+MAX_PARTIAL_CHARS = 3500
+
+
+class SummaryProgress:
+    """
+    Streams the progress of one summary into the bot's status message.
+
+    The summarization pipeline reports each finished leaf chunk (`leaf_done`) and the
+    start of the reduce phase (`reducing`). The status message is edited at most once
+    per `min_interval` seconds, in the background, so reporting never waits on Telegram.
+    `finish` replaces the status message with the final summary.
+    """
+
+    def __init__(self, chat_id: int, message_id: int, title: str, min_interval: float = PROGRESS_EDIT_INTERVAL_S):
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.title = title
+        self.min_interval = min_interval
+        self.total = 0
+        self.done = 0
+        self.reducing_count = 0
+        self.partials: List[str] = []
+        self._last_edit = 0.0
+        self._dirty = False
+        self._editor: Optional[asyncio.Task] = None
+
+    def leaves_started(self, total: int):
+        self.total = total
+
+    def leaf_done(self, summary: str):
+        self.done += 1
+        self.partials.append(summary)
+        self._schedule()
+
+    def reducing(self, count: int):
+        self.reducing_count = count
+        self._schedule()
+
+    def render(self) -> str:
+        if self.reducing_count:
+            status = f"⏳ 90% - combining {self.reducing_count} partial summaries..."
+        else:
+            percent = int(90 * self.done / self.total) if self.total else 0
+            status = f"⏳ {percent}% - summarized {self.done}/{self.total} parts"
+
+        partial_text = "\n\n".join(escape_markdown(summary, version=2) for summary in self.partials)
+        if len(partial_text) > MAX_PARTIAL_CHARS:
+            # Keep the most recent parts visible.
+            partial_text = "…" + partial_text[-MAX_PARTIAL_CHARS:]
+        return f"{self.title}\n\n{status}" + (f"\n\n{partial_text}" if partial_text else "")
+
+    def _schedule(self):
+        self._dirty = True
+        if self._editor is None or self._editor.done():
+            self._editor = asyncio.ensure_future(self._edit_loop())
+
+    async def _edit_loop(self):
+        # Coalesces reports: whatever arrived while waiting goes out in one edit.
+        while self._dirty:
+            wait = self._last_edit + self.min_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._dirty = False
+            self._last_edit = time.monotonic()
+            await telegram_service.edit_message(self.chat_id, self.message_id, self.render())
+
+    async def finish(self, text: str) -> bool:
+        """
+        Stops progress edits and puts the final text into the status message.
+        Returns False if the edit failed, so the caller can send it as a new message.
+        """
+        self._dirty = False
+        if self._editor is not None and not self._editor.done():
+            self._editor.cancel()
+            try:
+                await self._editor
+            except asyncio.CancelledError:
+                pass
+        return await telegram_service.edit_message(self.chat_id, self.message_id, text)
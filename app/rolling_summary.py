@@ -0,0 +1,160 @@
+# app/rolling_summary.py
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Set
+from app import summarization_service
+from app.config import (
+    ARCHIVE_BUFFER_ENABLED, ROLLING_SUMMARY_ENABLED, ROLLING_SUMMARY_CHATS, ROLLING_SUMMARY_WINDOW,
+    ROLLING_SUMMARY_EVERY_N, ROLLING_SUMMARY_IDLE_SECONDS, ROLLING_SUMMARY_MAX_DELTA, ROLLING_SUMMARY_CONCURRENCY,
+)
+from app.database import get_last_n_messages, get_messages_in_range, open_session, run_with_session
+from app.ingestion import message_buffer
+from app.job_queue import update_queue
+
+logger = logging.getLogger(__name__)
+
+# Upper bound for "every message after the rolling summary".
+_LAST_POSSIBLE_MESSAGE_ID = 2**63 - 1
+
+
+@dataclass
+class RollingState:
+    summary: Optional[str] = None
+    message_count: int = 0
+    last_message_id: int = 0
+    updated_at: float = 0.0
+    # Messages archived since the last refresh.
+    pending: int = 0
+
+
+class RollingSummaries:
+    """
+    Background-maintained summaries of the last `window` messages of enabled chats.
+
+    Every archived message is counted (`note_message`). A chat is refreshed after
+    `every_n` new messages, or by the idle loop once `idle_seconds` have passed while
+    the update queue is empty. A refresh re-summarizes the window through
+    `summarize_messages`, so with the chunk cache on only the new leaves cost anything.
+    At most `concurrency` refreshes run at once.
+    """
+
+    def __init__(self, enabled: bool, chats: str, window: int, every_n: int, idle_seconds: float, max_delta: int, concurrency: int):
+        self.enabled = enabled
+        self.all_chats = chats.strip() == "*"
+        self.chats: Set[int] = set() if self.all_chats else {int(c) for c in chats.split(",") if c.strip()}
+        self.window = window
+        self.every_n = every_n
+        self.idle_seconds = idle_seconds
+        self.max_delta = max_delta
+        self.concurrency = concurrency
+        self._states: Dict[int, RollingState] = {}
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._idle_task: Optional[asyncio.Task] = None
+        self.refreshes = 0
+        self.served = 0
+
+    def enabled_for(self, chat_id: int) -> bool:
+        return self.enabled and (self.all_chats or chat_id in self.chats)
+
+    def note_message(self, chat_id: int):
+        """
+        Counts a newly archived message; schedules a refresh every `every_n` messages.
+        """
+        if not self.enabled_for(chat_id):
+            return
+        state = self._states.setdefault(chat_id, RollingState())
+        state.pending += 1
+        if state.pending >= self.every_n:
+            self._schedule(chat_id)
+
+    def _schedule(self, chat_id: int) -> asyncio.Task:
+        # One refresh per chat at a time; a request for a running one joins it.
+        task = self._tasks.get(chat_id)
+        if task is None or task.done():
+            task = self._tasks[chat_id] = asyncio.ensure_future(self._refresh(chat_id))
+        return task
+
+    async def _refresh(self, chat_id: int):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        try:
+            async with self._semaphore:
+                if ARCHIVE_BUFFER_ENABLED:
+                    await message_buffer.flush(chat_id)
+                state = self._states[chat_id]
+                pending_before = state.pending
+                async with open_session() as session:
+                    messages = await run_with_session(session, get_last_n_messages, chat_id, limit=self.window)
+                    if not messages:
+                        return
+                    summary = await summarization_service.summarize_messages(session, chat_id, messages)
+                state.summary = summary
+                state.message_count = len(messages)
+                state.last_message_id = messages[-1].message_id
+                state.updated_at = time.monotonic()
+                # Messages noted while we were summarizing still count as new.
+                state.pending -= pending_before
+                self.refreshes += 1
+                logger.info(f"Refreshed the rolling summary of chat {chat_id} ({len(messages)} messages).")
+        except Exception as e:
+            logger.error(f"Rolling summary refresh for chat {chat_id} failed: {e}", exc_info=True)
+
+    async def refresh(self, chat_id: int):
+        """Refreshes one chat now and waits until it is done."""
+        self._states.setdefault(chat_id, RollingState())
+        await self._schedule(chat_id)
+
+    async def answer(self, session: Any, chat_id: int, limit: int) -> Optional[tuple[str, int]]:
+        """
+        Answers `/summarize_last limit` from the rolling summary, folding in the few
+        messages archived since its refresh. Returns `(summary, message_count)`, or None
+        when the request has to be summarized from scratch.
+        """
+        state = self._states.get(chat_id)
+        if not self.enabled_for(chat_id) or limit != self.window or state is None or state.summary is None:
+            return None
+        if state.pending > self.max_delta:
+            return None
+
+        delta = await run_with_session(session, get_messages_in_range, chat_id, state.last_message_id + 1, _LAST_POSSIBLE_MESSAGE_ID)
+        self.served += 1
+        if not delta:
+            return state.summary, state.message_count
+        delta_summary = await summarization_service.summarize_messages(session, chat_id, delta)
+        combined = await summarization_service.combine_summaries([state.summary, delta_summary])
+        return combined, min(self.window, state.message_count + len(delta))
+
+    async def _idle_loop(self):
+        while True:
+            await asyncio.sleep(self.idle_seconds)
+            if update_queue.depth:
+                continue # Not idle; user requests come first.
+            for chat_id, state in list(self._states.items()):
+                if state.pending:
+                    self._schedule(chat_id)
+
+    def start(self):
+        """Starts the idle refresh loop. Called from the FastAPI lifespan."""
+        if self.enabled and self._idle_task is None:
+            self._idle_task = asyncio.ensure_future(self._idle_loop())
+
+    async def stop(self):
+        if self._idle_task is not None:
+            self._idle_task.cancel()
+            self._idle_task = None
+        running = [task for task in self._tasks.values() if not task.done()]
+        if running:
+            await asyncio.wait(running, timeout=10)
+
+    def stats(self) -> Dict[str, int]:
+        return {"chats": len(self._states), "refreshes": self.refreshes, "served": self.served}
+
+
+rolling_summaries = RollingSummaries(
+    ROLLING_SUMMARY_ENABLED, ROLLING_SUMMARY_CHATS, ROLLING_SUMMARY_WINDOW, ROLLING_SUMMARY_EVERY_N,
+    ROLLING_SUMMARY_IDLE_SECONDS, ROLLING_SUMMARY_MAX_DELTA, ROLLING_SUMMARY_CONCURRENCY,
+)
@@ -0,0 +1,113 @@
+# app/routing.py
+
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+from app.config import SUMMARY_WORKERS, ROUTING_DEADLINE_S, ROUTING_EWMA_ALPHA
+from app.metrics import routing_decisions_total
+
+logger = logging.getLogger(__name__)
+
+# Starting guesses of seconds per unit (token or word) of a whole summary, until
+# real summaries have been timed. CPU-only: the transformer is ~100x slower per unit.
+PRIOR_SECONDS_PER_UNIT = {
+    "transformer": 0.02,
+    "traditional": 0.0002,
+    "fastlsa": 0.00005,
+}
+
+
+class OverloadedError(Exception):
+    """Raised when no engine can summarize a request within its deadline."""
+
+
+@dataclass
+class EngineLoad:
+    seconds_per_unit: float
+    in_flight_units: int = 0
+    observations: int = 0
+
+
+@dataclass
+class RouteDecision:
+    decision: str # "primary", "fallback" or "shed"
+    engine: Optional[str]
+    estimates_s: Dict[str, float] = field(default_factory=dict)
+
+
+class EngineRouter:
+    """
+    Picks the engine for each summary from its size and the work already running.
+
+    The expected latency of a request on an engine is the units already in flight on
+    that engine plus its own, times the engine's seconds per unit, spread over the
+    summarization workers. Seconds per unit start from a prior and follow the timings
+    of finished summaries (exponentially weighted). The primary engine is used when it
+    meets the deadline, the fallback when only it does, and otherwise the request is
+    shed rather than left to time out.
+    """
+
+    def __init__(self, primary: str, fallback: Optional[str], workers: int = SUMMARY_WORKERS,
+                 deadline_s: float = ROUTING_DEADLINE_S, alpha: float = ROUTING_EWMA_ALPHA):
+        self.primary = primary
+        self.fallback = fallback if fallback != primary else None
+        self.workers = max(workers, 1)
+        self.deadline_s = deadline_s
+        self.alpha = alpha
+        self.loads = {
+            name: EngineLoad(PRIOR_SECONDS_PER_UNIT.get(name, PRIOR_SECONDS_PER_UNIT["traditional"]))
+            for name in filter(None, (self.primary, self.fallback))
+        }
+
+    def estimate(self, engine: str, units: int) -> float:
+        load = self.loads[engine]
+        return (load.in_flight_units + units) * load.seconds_per_unit / self.workers
+
+    def route(self, primary_units: int, fallback_units: int, deadline_s: Optional[float] = None) -> RouteDecision:
+        deadline_s = self.deadline_s if deadline_s is None else deadline_s
+        estimates = {self.primary: self.estimate(self.primary, primary_units)}
+        if estimates[self.primary] <= deadline_s:
+            decision = RouteDecision("primary", self.primary, estimates)
+        elif self.fallback is not None and self._fallback_estimate(estimates, fallback_units) <= deadline_s:
+            decision = RouteDecision("fallback", self.fallback, estimates)
+        else:
+            decision = RouteDecision("shed", None, estimates)
+            if self.fallback is not None:
+                self._fallback_estimate(estimates, fallback_units)
+
+        routing_decisions_total.inc(decision=decision.decision, engine=decision.engine or "none")
+        if decision.decision != "primary":
+            logger.warning(f"Routing a {primary_units}-unit summary: {decision.decision} (estimates {estimates}, deadline {deadline_s}s).")
+        return decision
+
+    def _fallback_estimate(self, estimates: Dict[str, float], units: int) -> float:
+        estimates[self.fallback] = self.estimate(self.fallback, units)
+        return estimates[self.fallback]
+
+    def started(self, engine: str, units: int) -> int:
+        """
+        Adds a summary's units to the engine's load. Returns the units that were already in flight.
+        """
+        load = self.loads[engine]
+        ahead = load.in_flight_units
+        load.in_flight_units += units
+        return ahead
+
+    def finished(self, engine: str, units: int, ahead: int, seconds: Optional[float]):
+        """
+        Takes the summary's units off the engine's load and, if it succeeded, learns from its timing.
+        """
+        load = self.loads[engine]
+        load.in_flight_units -= units
+        if seconds is None or units <= 0:
+            return
+        # Invert the estimate: the summary shared the workers with the `ahead` units in flight.
+        observed = seconds * self.workers / (ahead + units)
+        load.seconds_per_unit = (1 - self.alpha) * load.seconds_per_unit + self.alpha * observed
+        load.observations += 1
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {
+            name: {"seconds_per_unit": load.seconds_per_unit, "in_flight_units": load.in_flight_units, "observations": load.observations}
+            for name, load in self.loads.items()
+        }
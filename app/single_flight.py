@@ -0,0 +1,61 @@
+# app/single_flight.py
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent computations.
+
+    The first caller for a key starts the computation; callers that arrive with the
+    same key while it is still running await the same result (or exception) instead
+    of computing it again. Once it finishes the key is forgotten, so later callers
+    start afresh. The computation runs as its own task and is shielded, so one
+    caller being cancelled doesn't cancel it for the others.
+    """
+
+    def __init__(self, name: str, on_call: Optional[Callable[[str], None]] = None):
+        self.name = name
+        self.on_call = on_call
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._calls.get(key)
+        if task is not None and task.get_loop() is asyncio.get_running_loop():
+            self.coalesced += 1
+            self._count("coalesced")
+            logger.info(f"Joined an in-flight {self.name} computation for {key}.")
+            return await asyncio.shield(task)
+
+        task = asyncio.ensure_future(fn())
+        self._calls[key] = task
+        task.add_done_callback(lambda done: self._forget(key, done))
+        self.executed += 1
+        self._count("executed")
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Nobody may be left to await it; retrieve the exception so it isn't reported as lost.
+        if not task.cancelled():
+            task.exception()
+
+    def _count(self, outcome: str):
+        if self.on_call is not None:
+            self.on_call(outcome)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._calls),
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+        }
@@ -1,19 +1,47 @@
 # app/summarization_service.py
 
+import asyncio
 import logging
-from app.config import SUMMARIZER_MODE
+import time
+from typing import Any, Optional
+from sqlmodel import Session
+from app.config import (
+    SUMMARIZER_MODE, REDUCE_FAN_IN, REDUCE_MAX_DEPTH, SUMMARY_CACHE_ENABLED, CHUNK_ID_SPAN,
+    TRANSFORMER_BATCH_SIZE, TRANSFORMER_BATCH_WAIT_MS, SINGLE_FLIGHT_ENABLED, ROUTING_ENABLED, ROUTING_FALLBACK_MODE, PREPROCESS_ENABLED,
+)
+from app.executor import run_in_pool
+from app.batching import MicroBatcher
+from app import engine_registry, summary_cache
+from app.database import run_with_session
+from app.metrics import (
+    stage_seconds, chunk_seconds, errors_total, summaries_in_flight, single_flight_total, preprocess_removed_units, preprocess_dropped_total,
+)
+from app.routing import EngineRouter, OverloadedError
+from app.single_flight import SingleFlight
+from app.preprocessing import preprocess
+from app.progress import SummaryProgress
 
 logger = logging.getLogger(__name__)
 
 # --- The Engine Switcher ---
 # Based on the config, we decide which function to use throughout this file.
+# Importing an engine module is cheap; its model is loaded on first use or by
+# `engine_registry.warm_up`.
 if SUMMARIZER_MODE == "transformer":
-    from app.engine_transformer import summarize_chunk, tokenizer
+    from app import engine_transformer
+    from app.engine_transformer import summarize_chunk, summarize_batch, load_tokenizer, ENGINE_NAME, ENGINE_VERSION
     MAX_UNITS_PER_CHUNK = 512 # Tokens
+    UNIT_KIND = f"tokens:{engine_transformer.MODEL_NAME}"
+    # Chunks from all in-flight requests share batched forward passes.
+    batcher = MicroBatcher(summarize_batch, TRANSFORMER_BATCH_SIZE, TRANSFORMER_BATCH_WAIT_MS) if TRANSFORMER_BATCH_SIZE > 1 else None
     logger.info("Summarization service is using the TRANSFORMER engine.")
     def count_units(text: str) -> int:
-        return tokenizer(text, return_tensors="pt").input_ids.shape[1]
+        return load_tokenizer()(text, return_tensors="pt").input_ids.shape[1]
+    def units_available() -> bool:
+        # Don't stall the event loop loading the tokenizer just to count one message.
+        return engine_transformer.tokenizer is not None
     def split_text_into_chunks(text: str) -> list[str]:
+        tokenizer = load_tokenizer()
         tokens = tokenizer.encode(text)
         chunks = []
         for i in range(0, len(tokens), MAX_UNITS_PER_CHUNK):
@@ -21,12 +49,19 @@ if SUMMARIZER_MODE == "transformer":
             chunks.append(tokenizer.decode(chunk_tokens, skip_special_tokens=True))
         return chunks
 
-else: # Default to traditional
-    from app.engine_traditional import summarize_chunk
+else: # Word-based extractive engines; default to traditional
+    if SUMMARIZER_MODE == "fastlsa":
+        from app.engine_fastlsa import summarize_chunk, ENGINE_NAME, ENGINE_VERSION
+    else:
+        from app.engine_traditional import summarize_chunk, ENGINE_NAME, ENGINE_VERSION
     MAX_UNITS_PER_CHUNK = 1500 # Words
-    logger.info("Summarization service is using the TRADITIONAL engine.")
+    UNIT_KIND = "words"
+    batcher = None
+    logger.info(f"Summarization service is using the {ENGINE_NAME.upper()} engine.")
     def count_units(text: str) -> int:
         return len(text.split())
+    def units_available() -> bool:
+        return True
     def split_text_into_chunks(text: str) -> list[str]:
         words = text.split()
         chunks = []
@@ -38,28 +73,368 @@ else: # Default to traditional
 # The rest of the file remains the same, but it will now use the correct
 # `summarize_chunk`, `count_units`, and `split_text_into_chunks` based on the mode.
 
+EMPTY_CONVERSATION_MESSAGE = "المحادثة فارغة، لا يوجد شيء لتلخيصه."
+
+def group_for_reduce(summaries: list[str]) -> list[str]:
+    """
+    Packs consecutive summaries into reduce groups. A group holds at most
+    REDUCE_FAN_IN summaries and stays within MAX_UNITS_PER_CHUNK unless a single
+    summary is already larger; `_fit_to_budget` re-splits those.
+    """
+    groups = []
+    current, current_units = [], 0
+    for summary in summaries:
+        units = count_units(summary)
+        if current and (len(current) >= REDUCE_FAN_IN or current_units + units > MAX_UNITS_PER_CHUNK):
+            groups.append("\n".join(current))
+            current, current_units = [], 0
+        current.append(summary)
+        current_units += units
+    if current:
+        groups.append("\n".join(current))
+    return groups
+
+def _log_level_timing(level: int, chunk_count: int, started: float):
+    logger.info(f"Reduce tree level {level}: summarized {chunk_count} chunks in {time.perf_counter() - started:.2f}s")
+
 def create_summary(messages: list[str]) -> str:
-    logger.info(f"Received {len(messages)} messages to summarize.")
-    full_conversation_text = "\n".join(messages)
+    """
+    Blocking entry point for scripts and other code running outside the event loop.
+    It runs the same tree as `create_summary_async`.
+    """
+    return asyncio.run(create_summary_async(messages))
+
+async def summarize_chunk_async(text: str, level: int = 0) -> str:
+    """
+    Summarizes one chunk in the worker pool, through the micro-batcher when the engine supports it.
+    `level` is the chunk's reduce-tree level (0 for leaves), for the metrics.
+    """
+    with chunk_seconds.time(engine=ENGINE_NAME, level=level):
+        if batcher is not None:
+            return await batcher.submit(text)
+        return await run_in_pool(summarize_chunk, text)
+
+async def _summarize_level_async(chunks: list[str], level: int, progress: Optional[SummaryProgress] = None) -> list[str]:
+    async def summarize(chunk: str) -> str:
+        summary = await summarize_chunk_async(chunk, level)
+        if progress is not None:
+            progress.leaf_done(summary)
+        return summary
+
+    started = time.perf_counter()
+    summaries = await asyncio.gather(*(summarize(chunk) for chunk in chunks))
+    _log_level_timing(level, len(chunks), started)
+    return list(summaries)
+
+def _fit_to_budget(groups: list[str]) -> list[str]:
+    """
+    Re-splits any group that is still larger than MAX_UNITS_PER_CHUNK (e.g. a single
+    oversized summary), so no pass is ever handed more text than the engine takes.
+    """
+    fitted = []
+    for group in groups:
+        fitted.extend(split_text_into_chunks(group) if count_units(group) > MAX_UNITS_PER_CHUNK else [group])
+    return fitted
+
+async def _reduce_async(summaries: list[str], progress: Optional[SummaryProgress] = None) -> str:
+    """
+    Reduces leaf summaries level by level until they fit into one final pass.
+    Raises RuntimeError if the tree is still wider than one chunk after REDUCE_MAX_DEPTH levels.
+    """
+    if progress is not None:
+        progress.reducing(len(summaries))
+    level = 1
+    chunks = _fit_to_budget(group_for_reduce(summaries))
+    while len(chunks) > 1:
+        if level >= REDUCE_MAX_DEPTH:
+            raise RuntimeError(f"Reduce tree did not fit into one chunk after {REDUCE_MAX_DEPTH} levels ({len(chunks)} chunks left).")
+        chunks = _fit_to_budget(group_for_reduce(await _summarize_level_async(chunks, level)))
+        level += 1
+
+    logger.info("Summarizing the combined intermediate summaries to get the final result.")
+    started = time.perf_counter()
+    final_summary = await summarize_chunk_async(chunks[0], level)
+    _log_level_timing(level, 1, started)
+    return final_summary
+
+async def combine_summaries(summaries: list[str]) -> str:
+    """
+    Merges summaries of consecutive parts of a conversation into one summary.
+    """
+    return await _reduce_async(summaries)
+
+async def create_summary_async(messages: list[str]) -> str:
+    """
+    Summarizes plain conversation lines. Each line is counted once and lines are
+    packed whole into chunks. Every `summarize_chunk` call runs in the summarization
+    worker pool, and all chunks of one tree level run concurrently, so long ranges
+    scale with the number of workers.
+    """
+    logger.info(f"Received {len(messages)} messages to summarize asynchronously.")
+
+    if not "\n".join(messages).strip():
+        logger.warning("Attempted to summarize an empty conversation.")
+        return EMPTY_CONVERSATION_MESSAGE
+
+    with stage_seconds.time(stage="unit_count"):
+        entries = [(i, None, count_units(line), line) for i, line in enumerate(messages)]
+    with stage_seconds.time(stage="chunking"):
+        chunks = [text for _, _, text in pack_lines(entries)]
+    return await _summarize_chunks_async(chunks)
+
+async def _summarize_chunks_async(chunks: list[str], progress: Optional[SummaryProgress] = None) -> str:
+    if progress is not None:
+        progress.leaves_started(len(chunks))
+    if len(chunks) == 1:
+        logger.info("Conversation fits in one chunk. Using single-pass summarization.")
+        return await summarize_chunk_async(chunks[0])
+
+    logger.info(f"Conversation spans {len(chunks)} chunks. Using hierarchical summarization.")
+    return await _reduce_async(await _summarize_level_async(chunks, 0, progress), progress)
+
+# --- Message-Aware Summarization ---
+
+# Concurrent requests for the same messages of a chat share one summarization.
+summary_flights = SingleFlight("summary", on_call=lambda outcome: single_flight_total.inc(outcome=outcome))
+
+def format_message(message: Any) -> str:
+    return f"{message.sender_name}: {message.text}"
+
+def count_message_units(message: Any) -> Optional[int]:
+    """
+    Counts the units of one formatted message for storing with its archived row,
+    or returns None when that would mean loading the tokenizer first.
+    """
+    if not units_available():
+        return None
+    return count_units(format_message(message))
+
+def message_units(message: Any) -> int:
+    """
+    Units of an archived message: the count stored at ingest when it was made for
+    this engine's units, otherwise counted now.
+    """
+    if getattr(message, "unit_count", None) is not None and getattr(message, "unit_kind", None) == UNIT_KIND:
+        return message.unit_count
+    return count_units(format_message(message))
+
+def pack_lines(entries: list[tuple[int, Any, int, str]]) -> list[tuple[int, int, str]]:
+    """
+    Packs whole lines `(line_id, block, units, text)` into chunks of
+    `(first_line_id, last_line_id, text)` of at most MAX_UNITS_PER_CHUNK units, by
+    summing the given counts; nothing is tokenized again. A chunk never spans two
+    blocks. Only a line that is larger than a chunk on its own is cut, by
+    `split_text_into_chunks`.
+    """
+    chunks = []
+    current, current_units, current_block = [], 0, None
+
+    def flush():
+        if current:
+            chunks.append((current[0][0], current[-1][0], "\n".join(text for _, text in current)))
+
+    for line_id, block, units, text in entries:
+        if units > MAX_UNITS_PER_CHUNK:
+            flush()
+            current, current_units = [], 0
+            chunks.extend((line_id, line_id, piece) for piece in split_text_into_chunks(text))
+            continue
+        if current and (block != current_block or current_units + units > MAX_UNITS_PER_CHUNK):
+            flush()
+            current, current_units = [], 0
+        current.append((line_id, text))
+        current_units += units
+        current_block = block
+    flush()
+    return chunks
+
+def build_leaf_chunks(message_objects: list, align_to_blocks: bool = True) -> list[tuple[int, int, str]]:
+    """
+    Groups archived messages into leaf chunks of `(first_message_id, last_message_id, text)`.
+    With `align_to_blocks`, a chunk never crosses a CHUNK_ID_SPAN block of message ids,
+    so the same messages produce the same chunks no matter where the requested range
+    starts or ends. Messages are packed whole, using the unit counts stored at ingest.
+    """
+    return pack_lines([
+        (m.message_id, m.message_id // CHUNK_ID_SPAN if align_to_blocks else None, message_units(m), format_message(m))
+        for m in message_objects
+    ])
+
+async def _summarize_leaves_async(session: Optional[Session], chat_id: int, leaves: list[tuple[int, int, str]],
+                                  progress: Optional[SummaryProgress] = None) -> list[str]:
+    """
+    Summarizes leaf chunks concurrently, reusing cached summaries where possible.
+    Cache reads and writes go through `run_with_session`, so they stay off the event loop.
+    """
+    keys = [summary_cache.chunk_key(first_id, last_id, text) for first_id, last_id, text in leaves]
+    cached = await run_with_session(session, summary_cache.get_cached_summaries, chat_id, keys, ENGINE_NAME, ENGINE_VERSION)
+
+    if progress is not None:
+        progress.leaves_started(len(leaves))
+        for summary in cached.values():
+            progress.leaf_done(summary)
+
+    missing = [(key, text) for key, (_, _, text) in zip(keys, leaves) if key not in cached]
+    fresh = dict(zip(
+        [key for key, _ in missing],
+        await _summarize_level_async([text for _, text in missing], 0, progress) if missing else [],
+    ))
+    await run_with_session(session, summary_cache.store_summaries, chat_id, fresh, ENGINE_NAME, ENGINE_VERSION)
+
+    return [cached[key] if key in cached else fresh[key] for key in keys]
+
+async def summarize_messages(session: Optional[Session], chat_id: int, message_objects: list,
+                             progress: Optional[SummaryProgress] = None) -> str:
+    """
+    Summarizes archived `Message` rows. Unlike `create_summary_async`, it knows the
+    message ids, so with the cache enabled the conversation is always cut into
+    block-aligned leaf chunks, even when it would fit in one pass. Leaf summaries are
+    then reused across overlapping requests such as a sliding `/summarize_last` window.
+    If `progress` is given, it is told about every leaf summary as soon as it is ready.
+
+    Identical concurrent requests (same chat, messages and engine) are coalesced:
+    they all get the result of the first one, and only its `progress` is updated.
+    With PREPROCESS_ENABLED, the messages are cleaned up first (see app/preprocessing.py).
+    """
+    if not SINGLE_FLIGHT_ENABLED or not message_objects:
+        return await _summarize_tracked(session, chat_id, message_objects, progress)
+    # The id hash tells apart same-bounded sets with gaps, such as two /summarize_about topics.
+    message_ids = tuple(m.message_id for m in message_objects)
+    key = (chat_id, message_ids[0], message_ids[-1], hash(message_ids), ENGINE_NAME, ENGINE_VERSION)
+    return await summary_flights.do(key, lambda: _summarize_tracked(session, chat_id, message_objects, progress))
+
+async def _summarize_tracked(session: Optional[Session], chat_id: int, message_objects: list,
+                             progress: Optional[SummaryProgress]) -> str:
+    with summaries_in_flight.track_inprogress():
+        try:
+            if PREPROCESS_ENABLED:
+                message_objects = _preprocess(chat_id, message_objects)
+            if router is not None and message_objects:
+                return await _summarize_routed(session, chat_id, message_objects, progress)
+            return await _summarize_archived(session, chat_id, message_objects, progress)
+        except OverloadedError:
+            raise
+        except Exception:
+            errors_total.inc(stage="summarize")
+            raise
+
+def _preprocess(chat_id: int, message_objects: list) -> list:
+    with stage_seconds.time(stage="preprocess"):
+        message_objects, report = preprocess(message_objects, message_units)
+    preprocess_removed_units.observe(report.units_removed)
+    for step, count in report.dropped.items():
+        preprocess_dropped_total.inc(count, step=step)
+    logger.info(
+        f"Preprocessing chat {chat_id}: {report.messages_in} -> {report.messages_out} messages, "
+        f"{report.units_in} -> {report.units_out} units ({report.units_removed} removed, by step {report.dropped})."
+    )
+    return message_objects
+
+async def _summarize_archived(session: Optional[Session], chat_id: int, message_objects: list,
+                              progress: Optional[SummaryProgress]) -> str:
+    logger.info(f"Received {len(message_objects)} archived messages from chat {chat_id} to summarize.")
+    full_conversation_text = "\n".join(format_message(m) for m in message_objects)
 
     if not full_conversation_text.strip():
         logger.warning("Attempted to summarize an empty conversation.")
-        return "المحادثة فارغة، لا يوجد شيء لتلخيصه."
+        return EMPTY_CONVERSATION_MESSAGE
 
-    unit_count = count_units(full_conversation_text)
-    logger.info(f"Total unit count of conversation is: {unit_count} ({'tokens' if SUMMARIZER_MODE == 'transformer' else 'words'})")
+    if not SUMMARY_CACHE_ENABLED or session is None:
+        with stage_seconds.time(stage="chunking"):
+            leaves = build_leaf_chunks(message_objects, align_to_blocks=False)
+        return await _summarize_chunks_async([text for _, _, text in leaves], progress)
 
-    if unit_count <= MAX_UNITS_PER_CHUNK:
-        logger.info("Unit count is within the limit. Using single-pass summarization.")
-        return summarize_chunk(full_conversation_text)
-    else:
-        logger.info("Unit count exceeds the limit. Using hierarchical summarization.")
-        chunks = split_text_into_chunks(full_conversation_text)
-        logger.info(f"Split text into {len(chunks)} chunks for summarization.")
-        
-        intermediate_summaries = [summarize_chunk(chunk) for chunk in chunks]
-        combined_summary_text = "\n".join(intermediate_summaries)
-        
-        logger.info("Summarizing the combined intermediate summaries to get the final result.")
-        final_summary = summarize_chunk(combined_summary_text)
-        return final_summary
\ No newline at end of file
+    with stage_seconds.time(stage="chunking"):
+        leaves = build_leaf_chunks(message_objects)
+    logger.info(f"Split conversation into {len(leaves)} message-aligned chunks for summarization.")
+    summaries = await _summarize_leaves_async(session, chat_id, leaves, progress)
+
+    if len(summaries) == 1:
+        return summaries[0]
+    return await _reduce_async(summaries, progress)
+
+# --- Deadline-Aware Routing ---
+# With ROUTING_ENABLED, every summary is routed by `router`: to this module's engine
+# if it should finish within the deadline, else to the lighter ROUTING_FALLBACK_MODE
+# engine, else it is declined with OverloadedError. Coalesced requests are routed once.
+
+router = EngineRouter(ENGINE_NAME, ROUTING_FALLBACK_MODE) if ROUTING_ENABLED else None
+
+FALLBACK_WORDS_PER_CHUNK = 1500
+
+async def _summarize_routed(session: Optional[Session], chat_id: int, message_objects: list,
+                            progress: Optional[SummaryProgress]) -> str:
+    lines = [format_message(m) for m in message_objects]
+    primary_units = sum(message_units(m) for m in message_objects)
+    fallback_units = sum(len(line.split()) for line in lines)
+    decision = router.route(primary_units, fallback_units)
+    if decision.decision == "shed":
+        raise OverloadedError(f"No engine can summarize {len(message_objects)} messages of chat {chat_id} in time (estimates {decision.estimates_s}).")
+
+    units = primary_units if decision.decision == "primary" else fallback_units
+    ahead = router.started(decision.engine, units)
+    started, seconds = time.perf_counter(), None
+    try:
+        if decision.decision == "primary":
+            summary = await _summarize_archived(session, chat_id, message_objects, progress)
+        else:
+            summary = await summarize_lines_with_fallback(lines, progress)
+        seconds = time.perf_counter() - started
+        return summary
+    finally:
+        router.finished(decision.engine, units, ahead, seconds)
+
+def pack_words(lines: list[str], limit: Optional[int] = None) -> list[str]:
+    """
+    Packs whole lines into chunks of at most `limit` (FALLBACK_WORDS_PER_CHUNK) words; a longer line is cut by words.
+    """
+    limit = limit or FALLBACK_WORDS_PER_CHUNK
+    chunks, current, current_words = [], [], 0
+    for line in lines:
+        words = line.split()
+        if len(words) > limit:
+            if current:
+                chunks.append("\n".join(current))
+                current, current_words = [], 0
+            chunks.extend(" ".join(words[i:i + limit]) for i in range(0, len(words), limit))
+            continue
+        if current and current_words + len(words) > limit:
+            chunks.append("\n".join(current))
+            current, current_words = [], 0
+        current.append(line)
+        current_words += len(words)
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+async def summarize_lines_with_fallback(lines: list[str], progress: Optional[SummaryProgress] = None) -> str:
+    """
+    Summarizes conversation lines with the ROUTING_FALLBACK_MODE engine: word-packed
+    chunks, each level run concurrently in the worker pool, repacked until one chunk
+    is left. It skips the chunk cache, whose entries belong to the primary engine.
+    """
+    if not "\n".join(lines).strip():
+        return EMPTY_CONVERSATION_MESSAGE
+    engine = engine_registry.get_engine(ROUTING_FALLBACK_MODE)
+
+    async def summarize(chunk: str, level: int) -> str:
+        with chunk_seconds.time(engine=engine.ENGINE_NAME, level=level):
+            summary = await run_in_pool(engine.summarize_chunk, chunk)
+        if level == 0 and progress is not None:
+            progress.leaf_done(summary)
+        return summary
+
+    chunks = pack_words(lines)
+    if progress is not None:
+        progress.leaves_started(len(chunks))
+    level = 0
+    while True:
+        summaries = await asyncio.gather(*(summarize(chunk, level) for chunk in chunks))
+        if len(summaries) == 1:
+            return summaries[0]
+        level += 1
+        if level > REDUCE_MAX_DEPTH:
+            raise RuntimeError(f"Fallback reduce did not fit into one chunk after {REDUCE_MAX_DEPTH} levels ({len(summaries)} chunks left).")
+        if level == 1 and progress is not None:
+            progress.reducing(len(summaries))
+        chunks = pack_words(summaries)
@@ -0,0 +1,125 @@
+# app/summary_cache.py
+
+import hashlib
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select, delete, func
+from app.config import SUMMARY_CACHE_TTL_HOURS, SUMMARY_CACHE_MAX_ENTRIES, SUMMARY_CACHE_EVICT_INTERVAL
+from app.database import ChunkSummary
+
+logger = logging.getLogger(__name__)
+
+ChunkKey = Tuple[int, int, str] # (first_message_id, last_message_id, content_hash)
+
+# Process-wide counters, reported by `get_cache_stats`.
+_stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+_last_eviction = 0.0
+
+def _utcnow() -> datetime:
+    # Stored as naive UTC so it compares the same way on SQLite and PostgreSQL.
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def chunk_key(first_message_id: int, last_message_id: int, text: str) -> ChunkKey:
+    return (first_message_id, last_message_id, hashlib.sha1(text.encode("utf-8")).hexdigest())
+
+def get_cached_summaries(session: Session, chat_id: int, keys: List[ChunkKey], engine: str, engine_version: str) -> Dict[ChunkKey, str]:
+    """
+    Returns the cached summaries for the given chunk keys.
+    Hits have their `last_used_at` refreshed so they survive LRU eviction.
+    """
+    if not keys:
+        return {}
+
+    wanted = set(keys)
+    statement = (
+        select(ChunkSummary)
+        .where(ChunkSummary.chat_id == chat_id)
+        .where(ChunkSummary.engine == engine)
+        .where(ChunkSummary.engine_version == engine_version)
+        .where(ChunkSummary.first_message_id.in_([first for first, _, _ in wanted]))
+    )
+    found = {}
+    now = _utcnow()
+    for entry in session.exec(statement).all():
+        key = (entry.first_message_id, entry.last_message_id, entry.content_hash)
+        if key in wanted:
+            entry.last_used_at = now
+            session.add(entry)
+            found[key] = entry.summary
+    if found:
+        session.commit()
+
+    _stats["hits"] += len(found)
+    _stats["misses"] += len(wanted) - len(found)
+    logger.info(f"Chunk cache for chat {chat_id}: {len(found)} hits, {len(wanted) - len(found)} misses.")
+    return found
+
+def store_summaries(session: Session, chat_id: int, summaries: Dict[ChunkKey, str], engine: str, engine_version: str):
+    """
+    Saves freshly computed chunk summaries. Each one is inserted in its own savepoint,
+    so a key that a concurrent request stored first doesn't discard the others.
+    Eviction runs at most once per SUMMARY_CACHE_EVICT_INTERVAL seconds.
+    """
+    if not summaries:
+        return
+
+    now = _utcnow()
+    stored = 0
+    for (first_id, last_id, content_hash), summary in summaries.items():
+        try:
+            with session.begin_nested():
+                session.add(ChunkSummary(
+                    chat_id=chat_id,
+                    first_message_id=first_id,
+                    last_message_id=last_id,
+                    content_hash=content_hash,
+                    engine=engine,
+                    engine_version=engine_version,
+                    summary=summary,
+                    created_at=now,
+                    last_used_at=now,
+                ))
+            stored += 1
+        except IntegrityError:
+            logger.debug(f"Chunk {first_id}-{last_id} of chat {chat_id} was already cached.")
+    session.commit()
+    _stats["stores"] += stored
+
+    global _last_eviction
+    if time.monotonic() - _last_eviction >= SUMMARY_CACHE_EVICT_INTERVAL:
+        _last_eviction = time.monotonic()
+        evict(session)
+
+def evict(session: Session) -> int:
+    """
+    Deletes entries older than the TTL, then the least recently used ones above the size limit.
+    Returns the number of deleted entries.
+    """
+    cutoff = _utcnow() - timedelta(hours=SUMMARY_CACHE_TTL_HOURS)
+    evicted = session.exec(delete(ChunkSummary).where(ChunkSummary.last_used_at < cutoff)).rowcount or 0
+
+    total = session.exec(select(func.count(ChunkSummary.id))).one()
+    overflow = total - SUMMARY_CACHE_MAX_ENTRIES
+    if overflow > 0:
+        oldest_ids = select(ChunkSummary.id).order_by(ChunkSummary.last_used_at).limit(overflow)
+        evicted += session.exec(delete(ChunkSummary).where(ChunkSummary.id.in_(oldest_ids))).rowcount or 0
+
+    session.commit()
+    if evicted:
+        _stats["evictions"] += evicted
+        logger.info(f"Evicted {evicted} chunk summaries from the cache.")
+    return evicted
+
+def get_cache_stats() -> Dict[str, float]:
+    """
+    Returns the hit/miss/store/eviction counters and the hit rate since startup.
+    """
+    lookups = _stats["hits"] + _stats["misses"]
+    return {**_stats, "hit_rate": _stats["hits"] / lookups if lookups else 0.0}
+
+def reset_cache_stats():
+    for name in _stats:
+        _stats[name] = 0
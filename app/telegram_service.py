@@ -2,26 +2,93 @@
 
 import logging
 import asyncio
+from typing import Optional
 from telegram import Bot
-from telegram.error import TelegramError
-from app.config import BOT_TOKEN
+from telegram.error import BadRequest, TelegramError
+from telegram.request import HTTPXRequest
+from app.config import (
+    BOT_TOKEN, TELEGRAM_POOL_SIZE, TELEGRAM_CONNECT_TIMEOUT, TELEGRAM_READ_TIMEOUT, TELEGRAM_POOL_TIMEOUT,
+)
+from app.metrics import stage_seconds, errors_total
+from app.outbound import outbound, split_message
 
 logger = logging.getLogger(__name__)
 
-bot = Bot(token=BOT_TOKEN)
+# One shared HTTP connection pool for all outgoing calls. python-telegram-bot's
+# default pool holds a single connection, which serializes concurrent sends.
+_request = HTTPXRequest(
+    connection_pool_size=TELEGRAM_POOL_SIZE,
+    connect_timeout=TELEGRAM_CONNECT_TIMEOUT,
+    read_timeout=TELEGRAM_READ_TIMEOUT,
+    write_timeout=TELEGRAM_READ_TIMEOUT,
+    pool_timeout=TELEGRAM_POOL_TIMEOUT,
+)
+bot = Bot(token=BOT_TOKEN, request=_request)
+
+async def shutdown():
+    """Closes the connection pool. Called from the FastAPI lifespan on shutdown."""
+    await _request.shutdown()
+
+async def _send(chat_id: int, text: str):
+    # Every outgoing call goes through the rate limiter and its retries.
+    # We use parse_mode='Markdown' to allow bold/italic text
+    with stage_seconds.time(stage="telegram_send"):
+        return await outbound.call(chat_id, lambda: bot.send_message(chat_id=chat_id, text=text, parse_mode='Markdown'))
 
 async def send_message(chat_id: int, text: str) -> bool:
-    """Sends a text message to a specified Telegram chat."""
+    """
+    Sends a text message to a specified Telegram chat. Texts longer than Telegram's
+    limit are sent as several messages.
+    """
     logger.info(f"Attempting to send message to chat_id: {chat_id}")
     try:
-        # We use parse_mode='Markdown' to allow bold/italic text
-        await bot.send_message(chat_id=chat_id, text=text, parse_mode='Markdown')
+        for part in split_message(text):
+            await _send(chat_id, part)
         logger.info("Message sent successfully.")
         return True
     except TelegramError as e:
+        errors_total.inc(stage="telegram_send")
         logger.error(f"Failed to send message to {chat_id}. Error: {e}")
         return False
 
+async def send_status_message(chat_id: int, text: str) -> Optional[int]:
+    """
+    Sends a message that will be edited later (e.g. a progress message).
+    Returns its message id, or None if it could not be sent.
+    """
+    logger.info(f"Attempting to send status message to chat_id: {chat_id}")
+    try:
+        sent = await _send(chat_id, split_message(text)[0])
+        return sent.message_id
+    except TelegramError as e:
+        errors_total.inc(stage="telegram_send")
+        logger.error(f"Failed to send status message to {chat_id}. Error: {e}")
+        return None
+
+async def edit_message(chat_id: int, message_id: int, text: str) -> bool:
+    """
+    Replaces the text of a message the bot sent earlier. If the new text is too long
+    for one message, the rest follows as new messages.
+    """
+    first, *rest = split_message(text)
+    try:
+        with stage_seconds.time(stage="telegram_edit"):
+            await outbound.call(chat_id, lambda: bot.edit_message_text(chat_id=chat_id, message_id=message_id, text=first, parse_mode='Markdown'))
+        for part in rest:
+            await _send(chat_id, part)
+        return True
+    except BadRequest as e:
+        # Telegram rejects an edit that doesn't change anything; the message is already right.
+        if "not modified" in str(e).lower():
+            return True
+        errors_total.inc(stage="telegram_edit")
+        logger.error(f"Failed to edit message {message_id} in {chat_id}. Error: {e}")
+        return False
+    except TelegramError as e:
+        errors_total.inc(stage="telegram_edit")
+        logger.error(f"Failed to edit message {message_id} in {chat_id}. Error: {e}")
+        return False
+
 # --- Standalone Test Block --- (No changes needed here)
 async def main_test():
     logger.info("--- Testing the Telegram Service Standalone ---")
@@ -1,16 +1,52 @@
 # app/webhook_handler.py
 
+import asyncio
 import logging
+import time
 from contextlib import asynccontextmanager 
-from fastapi import FastAPI, Request, Response, Depends
-from sqlmodel import Session
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse
 from telegram import Update
-from app.logic_controller import handle_update
+from app.logic_controller import handle_update, command_of
+from app import telegram_service
 from app.telegram_service import bot
-from app.database import get_session, create_db_and_tables
+from app import database, engine_registry, job_store, metrics, summarization_service, summary_cache
+from app.config import ENGINE_WARMUP_ENABLED, METRICS_ENABLED, JOB_QUEUE_BACKEND, COLD_STORAGE_ENABLED
+from app.database import create_db_and_tables, open_session
+from app.executor import shutdown_executor
+from app.ingestion import message_buffer
+from app.job_queue import update_queue, QueueFullError
+from app.rolling_summary import rolling_summaries
 
 logger = logging.getLogger(__name__)
 
+# Components that keep their own counters are exported as gauges read at scrape time.
+metrics.registry.register(metrics.Gauge(
+    "summarizer_update_queue_depth", "Updates waiting or running in the update queue.")).set_function(lambda: update_queue.depth)
+metrics.registry.register(metrics.Gauge(
+    "summarizer_archive_buffer_pending", "Messages waiting in the write-behind buffer.")).set_function(message_buffer.pending_count)
+metrics.registry.register(metrics.Gauge(
+    "summarizer_chunk_cache_events", "Chunk cache hits, misses, stores and evictions since startup.", ("event",)
+)).set_function(lambda: {(name,): value for name, value in summary_cache.get_cache_stats().items() if name != "hit_rate"})
+if COLD_STORAGE_ENABLED:
+    from app import cold_storage
+    metrics.registry.register(metrics.Gauge(
+        "summarizer_archive_messages", "Archived messages in the hot (message table) and cold (segments) tiers.", ("tier",)
+    )).set_function(lambda: {(tier,): count for tier, count in cold_storage.get_tier_sizes(database.engine).items() if tier != "cold_bytes"})
+    metrics.registry.register(metrics.Gauge(
+        "summarizer_cold_storage_bytes", "Size of the cold tier's segment files.")).set_function(lambda: cold_storage.get_tier_sizes(database.engine)["cold_bytes"])
+if summarization_service.router is not None:
+    metrics.registry.register(metrics.Gauge(
+        "summarizer_routing_seconds_per_unit", "The router's current estimate of each engine's seconds per unit.", ("engine",)
+    )).set_function(lambda: {(name,): load["seconds_per_unit"] for name, load in summarization_service.router.stats().items()})
+    metrics.registry.register(metrics.Gauge(
+        "summarizer_routing_in_flight_units", "Units of the summaries running on each engine.", ("engine",)
+    )).set_function(lambda: {(name,): load["in_flight_units"] for name, load in summarization_service.router.stats().items()})
+if JOB_QUEUE_BACKEND == "database":
+    metrics.registry.register(metrics.Gauge(
+        "summarizer_job_queue_jobs", "Jobs in the database queue, by status.", ("status",)
+    )).set_function(lambda: {(status,): count for status, count in job_store.get_queue_stats(database.engine).items()})
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -19,32 +55,92 @@ async def lifespan(app: FastAPI):
     We use it to create our database tables.
     """
     logger.info("Application startup...")
+    started = time.perf_counter()
     create_db_and_tables()
+    # The engine loads in the background; `/` answers right away, `/ready` once it is loaded.
+    warmup = None
+    if ENGINE_WARMUP_ENABLED:
+        warmup = asyncio.create_task(engine_registry.warm_up())
+    else:
+        engine_registry.skip_warm_up()
+    rolling_summaries.start()
+    engine_registry.check_startup_budget(time.perf_counter() - started)
     yield
-    # Code here would run on shutdown
     logger.info("Application shutdown...")
+    await rolling_summaries.stop()
+    if warmup is not None and not warmup.done():
+        warmup.cancel()
+    await update_queue.join(timeout=30)
+    await message_buffer.drain()
+    shutdown_executor()
+    await telegram_service.shutdown()
+    if database.async_engine is not None:
+        await database.async_engine.dispose()
 
 #
 app = FastAPI(lifespan=lifespan)
 
 
+async def process_update(update: Update):
+    """
+    Background job: handles one update with its own database session.
+    """
+    command = command_of(update)
+    metrics.updates_total.inc(command=command)
+    with metrics.update_seconds.time(command=command):
+        try:
+            async with open_session() as session:
+                await handle_update(update, session)
+        except Exception:
+            metrics.errors_total.inc(stage="update")
+            raise
+
 
 @app.post("/webhook")
-async def webhook(request: Request, session: Session = Depends(get_session)):
+async def webhook(request: Request):
     
     logger.info("Webhook received a request.")
     try:
         data = await request.json()
         update = Update.de_json(data, bot)
         logger.debug(f"Update parsed successfully: {update.update_id}")
-        await handle_update(update, session)
+        chat_id = update.effective_chat.id if update.effective_chat else None
+        # Acknowledge right away; the update is handled in the background, in order per chat.
+        await update_queue.enqueue(chat_id, process_update, update)
+    except QueueFullError as e:
+        # Telegram redelivers updates that were not acknowledged, once we have room again.
+        logger.warning(f"Rejecting update: {e}")
+        return Response(status_code=503)
     except Exception as e:
         logger.error(f"Error processing webhook request: {e}", exc_info=True)
-    finally:
-        return Response(status_code=200)
+    return Response(status_code=200)
 
 @app.get("/")
 def health_check():
 
     logger.info("Health check endpoint was accessed.")
-    return {"status": "ok", "message": "Bot server is running"}
\ No newline at end of file
+    return {"status": "ok", "message": "Bot server is running"}
+
+@app.get("/ready")
+def readiness_check():
+    """
+    Readiness probe: 503 until the summarization engine has been warmed up.
+    The body is the startup profile (phase timings and per-module import times).
+    """
+    return JSONResponse(engine_registry.startup_report(), status_code=200 if engine_registry.is_ready() else 503)
+
+@app.get("/metrics")
+def metrics_endpoint():
+    """
+    Prometheus scrape endpoint: per-stage latency histograms, counters and gauges.
+    """
+    if not METRICS_ENABLED:
+        return Response(status_code=404)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/queue")
+def queue_status():
+    """
+    Reports the depth of the update queue and recent job latencies.
+    """
+    return update_queue.stats()
@@ -0,0 +1,177 @@
+# app/worker.py
+
+import asyncio
+import logging
+import os
+import signal
+import socket
+import traceback
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+from sqlalchemy.engine import Engine
+from app import database, job_store
+from app.config import JOB_LEASE_SECONDS, JOB_POLL_INTERVAL_S, JOB_RETRY_BACKOFF_S, JOB_WORKER_CONCURRENCY
+from app.database import open_session
+from app.job_store import ClaimedJob
+from app.metrics import jobs_total
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[Any, ClaimedJob], Awaitable[None]] # (session, job)
+
+
+async def run_command_job(session: Any, job: ClaimedJob):
+    """
+    Runs a job queued by the webhook (see `logic_controller.run_or_enqueue`). Its
+    status message, if there was one, becomes the job's progress message again.
+    """
+    from app.logic_controller import run_job
+    from app.progress import SummaryProgress
+
+    payload = dict(job.payload)
+    status_message_id, title = payload.pop("status_message_id", None), payload.pop("title", None)
+    progress = SummaryProgress(job.chat_id, status_message_id, title) if status_message_id is not None else None
+    await run_job(session, job.kind, job.chat_id, payload, progress)
+
+
+class JobWorker:
+    """
+    Claims jobs from the database queue and runs them, `concurrency` at a time.
+
+    While a job runs, its lease is renewed every third of `lease_seconds`; if the
+    worker dies, the lease runs out and another worker picks the job up. A failed
+    job is retried after a backoff until it has used its attempts, then dead-lettered.
+    `handler` runs every job; the default dispatches to the bot's command handlers.
+    """
+
+    def __init__(self, handler: Handler = run_command_job, engine: Optional[Engine] = None,
+                 concurrency: int = JOB_WORKER_CONCURRENCY, lease_seconds: float = JOB_LEASE_SECONDS,
+                 poll_interval: float = JOB_POLL_INTERVAL_S, retry_backoff: float = JOB_RETRY_BACKOFF_S,
+                 worker_id: Optional[str] = None):
+        self.handler = handler
+        self.engine = engine or database.engine
+        self.concurrency = concurrency
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.retry_backoff = retry_backoff
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._running: Set[asyncio.Task] = set()
+        self._wake = asyncio.Event()
+        self.completed = 0
+        self.retried = 0
+        self.dead = 0
+
+    async def run(self, stop: asyncio.Event):
+        """
+        Runs jobs until `stop` is set, then waits for the jobs already running.
+        """
+        logger.info(f"Job worker {self.worker_id} started (concurrency {self.concurrency}).")
+        while not stop.is_set():
+            claimed = await self._claim()
+            if not claimed:
+                # Wait for the next poll, a free slot, or the stop signal.
+                self._wake.clear()
+                stopping = asyncio.ensure_future(stop.wait())
+                waking = asyncio.ensure_future(self._wake.wait())
+                await asyncio.wait({stopping, waking}, timeout=self.poll_interval, return_when=asyncio.FIRST_COMPLETED)
+                stopping.cancel()
+                waking.cancel()
+        if self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
+        logger.info(f"Job worker {self.worker_id} stopped.")
+
+    async def run_until_empty(self):
+        """
+        Runs jobs until none are due and none are running (for scripts and tests).
+        """
+        while True:
+            claimed = await self._claim()
+            if not claimed and not self._running:
+                return
+            if not claimed:
+                await asyncio.wait(self._running, return_when=asyncio.FIRST_COMPLETED)
+
+    async def _claim(self) -> int:
+        free = self.concurrency - len(self._running)
+        if free <= 0:
+            return 0
+        jobs = await asyncio.to_thread(job_store.claim_jobs, self.engine, self.worker_id, free, self.lease_seconds)
+        for job in jobs:
+            task = asyncio.ensure_future(self._run_job(job))
+            self._running.add(task)
+            task.add_done_callback(self._job_finished)
+        return len(jobs)
+
+    def _job_finished(self, task: asyncio.Task):
+        self._running.discard(task)
+        self._wake.set()
+
+    async def _run_job(self, job: ClaimedJob):
+        if job.attempts > job.max_attempts:
+            # Its lease ran out on its last attempt, so the worker running it most likely died.
+            await self._fail(job, "Lease expired on the last attempt.")
+            return
+
+        heartbeat = asyncio.ensure_future(self._heartbeat(job))
+        try:
+            async with open_session() as session:
+                await self.handler(session, job)
+        except Exception:
+            await self._fail(job, traceback.format_exc())
+        else:
+            await asyncio.to_thread(job_store.complete_job, self.engine, job.id, self.worker_id)
+            self.completed += 1
+            jobs_total.inc(kind=job.kind, outcome="completed")
+        finally:
+            heartbeat.cancel()
+
+    async def _fail(self, job: ClaimedJob, error: str):
+        status = await asyncio.to_thread(job_store.fail_job, self.engine, job, self.worker_id, error, self.retry_backoff)
+        if status == "dead":
+            self.dead += 1
+            logger.error(f"Job {job.id} ({job.kind}, chat {job.chat_id}) failed {job.attempts} times and was dead-lettered:\n{error}")
+        else:
+            self.retried += 1
+            logger.warning(f"Job {job.id} ({job.kind}, chat {job.chat_id}) failed on attempt {job.attempts}, will retry:\n{error}")
+        jobs_total.inc(kind=job.kind, outcome="dead" if status == "dead" else "retried")
+
+    async def _heartbeat(self, job: ClaimedJob):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            if not await asyncio.to_thread(job_store.extend_lease, self.engine, job.id, self.worker_id, self.lease_seconds):
+                logger.warning(f"Lost the lease of job {job.id}; another worker may run it again.")
+                return
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "worker_id": self.worker_id,
+            "running": len(self._running),
+            "completed": self.completed,
+            "retried": self.retried,
+            "dead": self.dead,
+        }
+
+
+async def main():
+    """
+    Entry point of a summarizer node (`python worker.py`). Runs until SIGINT/SIGTERM,
+    then finishes the jobs it is running.
+    """
+    from app import engine_registry, telegram_service
+    from app.executor import shutdown_executor
+
+    database.create_db_and_tables()
+    await engine_registry.warm_up()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+
+    try:
+        await JobWorker().run(stop)
+    finally:
+        shutdown_executor()
+        await telegram_service.shutdown()
+        if database.async_engine is not None:
+            await database.async_engine.dispose()
@@ -0,0 +1,103 @@
+# benchmarks/bench_fastlsa_engine.py
+#
+# Compares the fastlsa engine with the sumy-based traditional engine on the same
+# chunks: per-chunk latency, and how many of the picked sentences both engines agree
+# on (a quality check, since both are extractive). Requires the NLTK data from
+# download_nltk.py. Run from the repo root:
+#
+#     python -m benchmarks.bench_fastlsa_engine --chunks 100 --words-per-chunk 1500
+
+import argparse
+import json
+import os
+import random
+import statistics
+import time
+
+# app.config insists on these; the benchmark never talks to Telegram or the database.
+os.environ.setdefault("BOT_TOKEN", "benchmark")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app.engine_fastlsa import FastLsaEngine
+from app.engine_traditional import TraditionalEngine
+
+SAMPLE_LINES = [
+    "سارة: راجعت التغييرات، المنطق سليم لكن نحتاج تعليقات إضافية على جزء الجلسات.",
+    "أحمد: سأضيف مهمة جديدة لاستعادة كلمة المرور وأرسلها قبل نهاية اليوم.",
+    "مريم: هل يمكن أن نؤجل الاجتماع إلى الغد؟ لدي عرض للعميل في الصباح.",
+    "خالد: لا مشكلة، سنلتقي غداً بعد الظهر ونراجع خطة الإصدار القادم.",
+    "سارة: تذكير بأن نسخة الاختبار يجب أن تكون جاهزة قبل يوم الخميس.",
+    "أحمد: الخادم توقف مرتين هذا الأسبوع، أعتقد أن المشكلة في قاعدة البيانات.",
+    "مريم: أرسلت تقرير المبيعات الشهري، الأرقام أفضل من الشهر الماضي.",
+    "خالد: من سيتولى الرد على أسئلة العملاء خلال العطلة؟",
+]
+
+
+def make_chunks(count: int, words_per_chunk: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    chunks = []
+    for _ in range(count):
+        lines, words = [], 0
+        while words < words_per_chunk:
+            line = rng.choice(SAMPLE_LINES)
+            lines.append(line)
+            words += len(line.split())
+        chunks.append("\n".join(lines))
+    return chunks
+
+
+def run(summarize, chunks: list[str]) -> tuple[list[str], list[float]]:
+    summaries, latencies = [], []
+    for chunk in chunks:
+        started = time.perf_counter()
+        summaries.append(summarize(chunk))
+        latencies.append(time.perf_counter() - started)
+    return summaries, latencies
+
+
+def describe(latencies: list[float]) -> dict:
+    ordered = sorted(latencies)
+    return {
+        "mean_ms": statistics.mean(ordered) * 1000,
+        "p50_ms": ordered[len(ordered) // 2] * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+    }
+
+
+def sentence_overlap(reference: str, candidate: str) -> float:
+    # Both engines return the picked sentences verbatim, so compare them as sets of lines.
+    reference_lines = {line.strip() for line in reference.split("\n") if line.strip()}
+    candidate_lines = {line.strip() for line in candidate.split("\n") if line.strip()}
+    union = reference_lines | candidate_lines
+    return len(reference_lines & candidate_lines) / len(union) if union else 1.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="fastlsa vs traditional engine benchmark")
+    parser.add_argument("--chunks", type=int, default=100)
+    parser.add_argument("--words-per-chunk", type=int, default=1500)
+    args = parser.parse_args()
+
+    chunks = make_chunks(args.chunks, args.words_per_chunk)
+    traditional, fast = TraditionalEngine(), FastLsaEngine()
+    # Warm-up, so imports and corpus loading are not timed.
+    traditional.summarize(chunks[0])
+    fast.summarize(chunks[0])
+
+    traditional_summaries, traditional_latencies = run(traditional.summarize, chunks)
+    fast_summaries, fast_latencies = run(fast.summarize, chunks)
+    overlaps = [sentence_overlap(a, b) for a, b in zip(traditional_summaries, fast_summaries)]
+
+    print(json.dumps({
+        "chunks": args.chunks,
+        "words_per_chunk": args.words_per_chunk,
+        "traditional": describe(traditional_latencies),
+        "fastlsa": describe(fast_latencies),
+        "speedup": statistics.mean(traditional_latencies) / statistics.mean(fast_latencies),
+        "sentence_overlap_mean": statistics.mean(overlaps),
+        "sentence_overlap_min": min(overlaps),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
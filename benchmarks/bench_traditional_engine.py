@@ -0,0 +1,92 @@
+# benchmarks/bench_traditional_engine.py
+#
+# Compares per-chunk latency of the traditional engine when everything is rebuilt
+# for every chunk (the previous behaviour) against the shared engine instance with
+# its memoized stemmer. Requires the NLTK data from download_nltk.py. Run from the repo root:
+#
+#     python -m benchmarks.bench_traditional_engine --chunks 200
+
+import argparse
+import json
+import os
+import statistics
+import time
+
+# app.config insists on these; the benchmark never talks to Telegram or the database.
+os.environ.setdefault("BOT_TOKEN", "benchmark")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from nltk.corpus import stopwords
+from nltk.stem.isri import ISRIStemmer
+from sumy.nlp.tokenizers import Tokenizer
+from sumy.parsers.plaintext import PlaintextParser
+from sumy.summarizers.lsa import LsaSummarizer
+from app.engine_traditional import LANGUAGE, SENTENCES_COUNT, TraditionalEngine
+
+SAMPLE_LINES = [
+    "سارة: راجعت التغييرات، المنطق سليم لكن نحتاج تعليقات إضافية على جزء الجلسات.",
+    "أحمد: سأضيف مهمة جديدة لاستعادة كلمة المرور وأرسلها قبل نهاية اليوم.",
+    "مريم: هل يمكن أن نؤجل الاجتماع إلى الغد؟ لدي عرض للعميل في الصباح.",
+    "خالد: لا مشكلة، سنلتقي غداً بعد الظهر ونراجع خطة الإصدار القادم.",
+    "سارة: تذكير بأن نسخة الاختبار يجب أن تكون جاهزة قبل يوم الخميس.",
+]
+
+
+def make_chunks(count: int, lines_per_chunk: int) -> list[str]:
+    return [
+        "\n".join(SAMPLE_LINES[(i + j) % len(SAMPLE_LINES)] for j in range(lines_per_chunk))
+        for i in range(count)
+    ]
+
+
+def summarize_rebuilding_everything(text: str) -> str:
+    parser = PlaintextParser.from_string(text, Tokenizer(LANGUAGE))
+    summarizer = LsaSummarizer(ISRIStemmer().stem)
+    summarizer.stop_words = stopwords.words(LANGUAGE)
+    return " ".join(str(sentence) for sentence in summarizer(parser.document, SENTENCES_COUNT))
+
+
+def per_chunk_latencies(summarize, chunks: list[str]) -> list[float]:
+    latencies = []
+    for chunk in chunks:
+        started = time.perf_counter()
+        summarize(chunk)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def describe(latencies: list[float]) -> dict:
+    ordered = sorted(latencies)
+    return {
+        "mean_ms": statistics.mean(ordered) * 1000,
+        "p50_ms": ordered[len(ordered) // 2] * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Traditional engine per-chunk latency benchmark")
+    parser.add_argument("--chunks", type=int, default=200)
+    parser.add_argument("--lines-per-chunk", type=int, default=40)
+    args = parser.parse_args()
+
+    chunks = make_chunks(args.chunks, args.lines_per_chunk)
+    engine = TraditionalEngine()
+    # Warm-up, so imports and corpus loading are not timed.
+    summarize_rebuilding_everything(chunks[0])
+    engine.summarize(chunks[0])
+
+    before = describe(per_chunk_latencies(summarize_rebuilding_everything, chunks))
+    after = describe(per_chunk_latencies(engine.summarize, chunks))
+
+    print(json.dumps({
+        "chunks": args.chunks,
+        "before": before,
+        "after": after,
+        "speedup": before["mean_ms"] / after["mean_ms"],
+        "engine": engine.stats(),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# benchmarks/bench_transformer_backends.py
+#
+# Compares the transformer CPU backends (TRANSFORMER_BACKEND): latency per chunk,
+# peak RSS, and how closely each backend's summaries agree with the full-precision
+# PyTorch model. Each backend runs in its own process, so peak RSS is its own.
+# Requires the full requirements.txt; the onnx backend also needs optimum[onnxruntime].
+# Run from the repo root:
+#
+#     python -m benchmarks.bench_transformer_backends --chunks 8 --threads 4
+#     python -m benchmarks.bench_transformer_backends --backends pytorch onnx --onnx-model-dir ./onnx-model
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from difflib import SequenceMatcher
+
+# app.config insists on these; the benchmark never talks to Telegram or the database.
+os.environ.setdefault("BOT_TOKEN", "benchmark")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+BACKENDS = ("pytorch", "quantized", "onnx")
+
+
+def run_backend(chunks: list[str]) -> dict:
+    """Runs inside the child process, with TRANSFORMER_BACKEND already set."""
+    from app import engine_transformer
+
+    started = time.perf_counter()
+    engine_transformer.load_model()
+    load_s = time.perf_counter() - started
+
+    engine_transformer.summarize_chunk(chunks[0]) # Warm-up
+    timings, summaries = [], []
+    for chunk in chunks:
+        started = time.perf_counter()
+        summaries.append(engine_transformer.summarize_chunk(chunk))
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return {
+        "load_s": load_s,
+        "p50_ms": timings[len(timings) // 2] * 1000,
+        "mean_ms": sum(timings) / len(timings) * 1000,
+        # ru_maxrss is in kilobytes on Linux.
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "summaries": summaries,
+    }
+
+
+def token_f1(a: str, b: str) -> float:
+    tokens_a, tokens_b = a.split(), b.split()
+    if not tokens_a or not tokens_b:
+        return float(tokens_a == tokens_b)
+    common = sum(min(tokens_a.count(t), tokens_b.count(t)) for t in set(tokens_a))
+    if not common:
+        return 0.0
+    precision, recall = common / len(tokens_a), common / len(tokens_b)
+    return 2 * precision * recall / (precision + recall)
+
+
+def agreement(baseline: list[str], other: list[str]) -> dict:
+    return {
+        "exact_match": sum(a == b for a, b in zip(baseline, other)) / len(baseline),
+        "token_f1": sum(token_f1(a, b) for a, b in zip(baseline, other)) / len(baseline),
+        "char_similarity": sum(SequenceMatcher(None, a, b).ratio() for a, b in zip(baseline, other)) / len(baseline),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transformer CPU backend benchmark")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--chunks", type=int, default=8)
+    parser.add_argument("--threads", type=int, default=0, help="Intra-op threads (0 = library default)")
+    parser.add_argument("--onnx-model-dir", default="")
+    parser.add_argument("--worker", choices=BACKENDS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    from benchmarks.corpora import make_corpus, as_lines
+    lines = as_lines(make_corpus("arabic", args.chunks * 12)) + as_lines(make_corpus("english", args.chunks * 12))
+    chunks = ["\n".join(lines[i:i + 12]) for i in range(0, len(lines), 12)][:args.chunks]
+
+    if args.worker:
+        print(json.dumps(run_backend(chunks), ensure_ascii=False))
+        return
+
+    results = {}
+    for backend in args.backends:
+        env = dict(os.environ, TRANSFORMER_BACKEND=backend, TRANSFORMER_INTRA_OP_THREADS=str(args.threads),
+                   TRANSFORMER_ONNX_MODEL_DIR=args.onnx_model_dir)
+        child = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_transformer_backends", "--worker", backend, "--chunks", str(args.chunks)],
+            env=env, capture_output=True, text=True,
+        )
+        if child.returncode != 0:
+            results[backend] = {"skipped": child.stderr.strip().splitlines()[-1] if child.stderr.strip() else "failed"}
+            continue
+        results[backend] = json.loads(child.stdout.strip().splitlines()[-1])
+
+    baseline = results.get("pytorch", {}).get("summaries")
+    for backend, result in results.items():
+        if baseline and "summaries" in result:
+            result["agreement_with_pytorch"] = agreement(baseline, result["summaries"])
+        result.pop("summaries", None)
+    print(json.dumps({"chunks": args.chunks, "threads": args.threads, "backends": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
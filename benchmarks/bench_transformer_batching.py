@@ -0,0 +1,94 @@
+# benchmarks/bench_transformer_batching.py
+#
+# Compares transformer throughput with and without cross-request micro-batching.
+# Requires the full requirements.txt (transformers + torch). Run from the repo root:
+#
+#     python -m benchmarks.bench_transformer_batching --chunks 32 --batch-size 8
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# app.config insists on these; the benchmark never talks to Telegram or the database.
+os.environ.setdefault("BOT_TOKEN", "benchmark")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app.engine_transformer import summarize_chunk, summarize_batch
+from app.batching import MicroBatcher
+from app.executor import set_executor, shutdown_executor
+
+SAMPLE_LINES = [
+    "Alex: Hey team, I've pushed the latest changes for the login feature. Can someone review it?",
+    "Sarah: On it. I'll check it out in the next hour.",
+    "Mike: Looks good at a glance, but we're not handling the 'Forgot Password' case.",
+    "سارة: راجعت التغييرات، المنطق سليم لكن نحتاج تعليقات إضافية على جزء الجلسات.",
+    "أحمد: سأضيف مهمة جديدة لاستعادة كلمة المرور وأرسلها قبل نهاية اليوم.",
+]
+
+
+def make_chunks(count: int, lines_per_chunk: int) -> list[str]:
+    return [
+        "\n".join(SAMPLE_LINES[(i + j) % len(SAMPLE_LINES)] for j in range(lines_per_chunk))
+        for i in range(count)
+    ]
+
+
+def bench_unbatched(chunks: list[str]) -> float:
+    started = time.perf_counter()
+    for chunk in chunks:
+        summarize_chunk(chunk)
+    return time.perf_counter() - started
+
+
+def bench_batched(chunks: list[str], batch_size: int) -> float:
+    started = time.perf_counter()
+    for i in range(0, len(chunks), batch_size):
+        summarize_batch(chunks[i:i + batch_size])
+    return time.perf_counter() - started
+
+
+async def bench_scheduler(chunks: list[str], batch_size: int, wait_ms: float) -> tuple[float, dict]:
+    # Every chunk is submitted as if it came from a different in-flight request.
+    batcher = MicroBatcher(summarize_batch, batch_size, wait_ms)
+    started = time.perf_counter()
+    await asyncio.gather(*(batcher.submit(chunk) for chunk in chunks))
+    return time.perf_counter() - started, batcher.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transformer micro-batching benchmark")
+    parser.add_argument("--chunks", type=int, default=32)
+    parser.add_argument("--lines-per-chunk", type=int, default=12)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--wait-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    chunks = make_chunks(args.chunks, args.lines_per_chunk)
+    summarize_chunk(chunks[0]) # Warm-up, so model initialization is not timed
+
+    # Pin the scheduler to one in-process worker sharing the already-loaded model,
+    # so all three numbers measure the same pipeline on the same threads.
+    set_executor(ThreadPoolExecutor(max_workers=1))
+    asyncio.run(bench_scheduler(chunks[:1], args.batch_size, args.wait_ms))
+
+    unbatched = bench_unbatched(chunks)
+    batched = bench_batched(chunks, args.batch_size)
+    scheduled, scheduler_stats = asyncio.run(bench_scheduler(chunks, args.batch_size, args.wait_ms))
+    shutdown_executor()
+
+    print(json.dumps({
+        "chunks": args.chunks,
+        "batch_size": args.batch_size,
+        "unbatched_chunks_per_s": args.chunks / unbatched,
+        "batched_chunks_per_s": args.chunks / batched,
+        "scheduler_chunks_per_s": args.chunks / scheduled,
+        "scheduler": scheduler_stats,
+        "speedup": unbatched / batched,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# benchmarks/compare.py
+#
+# Compares two JSON reports of benchmarks/run_suite.py and flags regressions:
+#
+#     python -m benchmarks.compare base.json new.json --threshold 1.2
+#
+# Exits with status 1 if any benchmark's p50 got slower than `threshold` times the base.
+
+import argparse
+import json
+import sys
+
+
+def key(entry: dict) -> str:
+    return entry["name"] + " " + json.dumps(entry["params"], sort_keys=True, ensure_ascii=False)
+
+
+def compare(base: dict, new: dict, threshold: float) -> list:
+    base_by_key = {key(e): e for e in base["results"] if "skipped" not in e}
+    rows = []
+    for entry in new["results"]:
+        before = base_by_key.get(key(entry))
+        if before is None or "skipped" in entry:
+            continue
+        ratio = entry["p50_ms"] / before["p50_ms"] if before["p50_ms"] else float("inf")
+        rows.append((key(entry), before["p50_ms"], entry["p50_ms"], ratio, ratio > threshold))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark reports")
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=1.2)
+    args = parser.parse_args(argv)
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+
+    rows = compare(base, new, args.threshold)
+    for name, before, after, ratio, regressed in rows:
+        print(f"{'REGRESSION ' if regressed else ''}{name}: {before:.2f} -> {after:.2f} ms ({ratio:.2f}x)")
+    sys.exit(1 if any(regressed for *_, regressed in rows) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# benchmarks/corpora.py
+#
+# Synthetic chat corpora for the benchmarks. Generation is seeded, so every run
+# (and every machine) benchmarks exactly the same messages.
+
+import random
+from datetime import datetime, timedelta
+from typing import List
+
+SIZES = (50, 200, 2_000, 20_000)
+
+ARABIC_SENDERS = ["سارة", "أحمد", "مريم", "خالد", "ليلى", "عمر"]
+ARABIC_PHRASES = [
+    "راجعت التغييرات والمنطق سليم",
+    "نحتاج تعليقات إضافية على جزء الجلسات",
+    "سأضيف مهمة جديدة لاستعادة كلمة المرور",
+    "هل يمكن أن نؤجل الاجتماع إلى الغد",
+    "لدي عرض للعميل في الصباح",
+    "سنلتقي بعد الظهر ونراجع خطة الإصدار",
+    "نسخة الاختبار يجب أن تكون جاهزة قبل الخميس",
+    "الخادم توقف مرتين هذا الأسبوع",
+    "أعتقد أن المشكلة في قاعدة البيانات",
+    "أرسلت تقرير المبيعات الشهري",
+    "الأرقام أفضل من الشهر الماضي",
+    "من سيتولى الرد على أسئلة العملاء",
+]
+
+ENGLISH_SENDERS = ["Alex", "Sarah", "Mike", "Dana", "Omar", "Lena"]
+ENGLISH_PHRASES = [
+    "I pushed the latest changes for the login feature",
+    "can someone review it before lunch",
+    "we are not handling the forgot password case",
+    "please add more comments to the session handling",
+    "the staging server went down twice this week",
+    "I think the database connection pool is too small",
+    "the monthly sales report is in the shared folder",
+    "numbers look better than last month",
+    "who is covering support during the holiday",
+    "let's move the planning meeting to tomorrow",
+    "the test build must be ready before Thursday",
+    "I will open a ticket for the flaky test",
+]
+
+LANGUAGES = {
+    "arabic": (ARABIC_SENDERS, ARABIC_PHRASES),
+    "english": (ENGLISH_SENDERS, ENGLISH_PHRASES),
+}
+
+
+def make_corpus(language: str, size: int, seed: int = 0) -> List[dict]:
+    """
+    Returns `size` chat messages as dicts with the `Message` fields, with consecutive
+    message ids starting at 1 and one message per minute. Messages are 1-3 phrases long.
+    """
+    senders, phrases = LANGUAGES[language]
+    rng = random.Random(f"{language}-{size}-{seed}")
+    start = datetime(2024, 1, 1)
+    return [
+        {
+            "message_id": i,
+            "sender_name": rng.choice(senders),
+            "text": "، ".join(rng.sample(phrases, rng.randint(1, 3))) if language == "arabic"
+                    else ", ".join(rng.sample(phrases, rng.randint(1, 3))).capitalize() + ".",
+            "timestamp": start + timedelta(minutes=i),
+        }
+        for i in range(1, size + 1)
+    ]
+
+
+def as_lines(corpus: List[dict]) -> List[str]:
+    return [f"{message['sender_name']}: {message['text']}" for message in corpus]
+
+
+NOISE = {
+    "arabic": ["تمام", "👍", "ههههه", "شكراً", "https://example.com/meeting/notes?id=42"],
+    "english": ["ok", "👍", "lol", "thanks!", "https://example.com/meeting/notes?id=42"],
+}
+
+
+def add_noise(corpus: List[dict], seed: int = 0) -> List[dict]:
+    """
+    Returns a copy of the corpus with chat noise mixed in: roughly one in three
+    messages is followed by an acknowledgement, emoji or bare link, a repost of an
+    earlier message, or a follow-up from the same sender. Arabic messages also get
+    diacritics and tatweel. Message ids are renumbered, still consecutive from 1.
+    """
+    language = "arabic" if any("؀" <= char <= "ۿ" for char in corpus[0]["text"]) else "english"
+    rng = random.Random(f"noise-{len(corpus)}-{seed}")
+    noisy = []
+    for message in corpus:
+        text = message["text"]
+        if language == "arabic" and rng.random() < 0.3:
+            text = text.replace("ا", "ـا", 1).replace("ل", "لَ", 1)
+        noisy.append({**message, "text": text})
+        roll = rng.random()
+        if roll < 0.15:
+            noisy.append({**message, "sender_name": rng.choice(LANGUAGES[language][0]), "text": rng.choice(NOISE[language])})
+        elif roll < 0.22 and len(noisy) > 3:
+            noisy.append({**rng.choice(noisy[-4:-1]), "timestamp": message["timestamp"]})
+        elif roll < 0.32:
+            noisy.append({**message, "text": rng.choice(LANGUAGES[language][1])})
+    start = corpus[0]["timestamp"]
+    return [{**message, "message_id": i, "timestamp": start + timedelta(seconds=30 * i)} for i, message in enumerate(noisy, 1)]
@@ -0,0 +1,303 @@
+# benchmarks/run_suite.py
+#
+# Performance regression suite. Measures engines, the summarization service, the
+# archive queries and end-to-end webhook latency on the synthetic corpora in
+# benchmarks/corpora.py, and writes the results as JSON. Run from the repo root:
+#
+#     python -m benchmarks.run_suite --output bench.json
+#     python -m benchmarks.run_suite --sizes 50 200 --groups db service --output quick.json
+#
+# Compare two runs with benchmarks/compare.py. Engines whose dependencies or data are
+# missing (e.g. torch, or NLTK's corpora) are reported as skipped, not as failures.
+# `--service-engine stub` replaces `summarize_chunk` with a trivial function so the
+# service numbers measure our own overhead (chunking, tree, cache) rather than the engine.
+# The preprocess group summarizes noisy corpora end to end with and without
+# app/preprocessing.py; run it with `--service-engine configured` to see the engine's share.
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+# app.config insists on these. The webhook benchmark needs a real database file,
+# created before the app's engine is.
+_db_dir = tempfile.mkdtemp(prefix="bench-")
+os.environ.setdefault("BOT_TOKEN", "123:benchmark")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/webhook.db")
+
+from benchmarks.corpora import SIZES, LANGUAGES, add_noise, make_corpus, as_lines
+
+GROUPS = ("engines", "service", "preprocess", "db", "webhook")
+ENGINE_MODES = ("traditional", "fastlsa", "transformer")
+
+
+def stub_summarize_chunk(text: str) -> str:
+    return " ".join(text.split()[:30])
+
+
+def measure(fn: Callable[[], object], repeat: int, warmup: int = 1) -> Dict[str, float]:
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return summarize_timings(timings)
+
+
+def summarize_timings(timings: List[float]) -> Dict[str, float]:
+    ordered = sorted(timings)
+    return {
+        "n": len(ordered),
+        "mean_ms": statistics.mean(ordered) * 1000,
+        "p50_ms": ordered[len(ordered) // 2] * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+        "min_ms": ordered[0] * 1000,
+    }
+
+
+class Suite:
+    def __init__(self, sizes: List[int], languages: List[str], repeat: int):
+        self.sizes = sizes
+        self.languages = languages
+        self.repeat = repeat
+        self.results: List[dict] = []
+
+    def record(self, name: str, params: dict, stats: Optional[dict] = None, skipped: Optional[str] = None):
+        entry = {"name": name, "params": params}
+        if skipped is not None:
+            entry["skipped"] = skipped
+            print(f"  {name} {params}: skipped ({skipped})", file=sys.stderr)
+        else:
+            entry.update(stats)
+            print(f"  {name} {params}: p50 {stats['p50_ms']:.2f} ms", file=sys.stderr)
+        self.results.append(entry)
+
+    # --- Engines ---
+
+    def bench_engines(self):
+        from app import engine_registry
+        for mode in ENGINE_MODES:
+            try:
+                engine = engine_registry.get_engine(mode)
+                engine.load_model()
+            except Exception as e:
+                self.record("engine.summarize_chunk", {"engine": mode}, skipped=f"{type(e).__name__}: {e}")
+                continue
+            for language in self.languages:
+                # One chunk's worth of conversation: ~1500 words, or fewer lines for the transformer.
+                lines = as_lines(make_corpus(language, 40 if mode == "transformer" else 150))
+                chunk = "\n".join(lines)
+                stats = measure(lambda: engine.summarize_chunk(chunk), self.repeat)
+                self.record("engine.summarize_chunk", {"engine": mode, "language": language, "words": len(chunk.split())}, stats)
+
+    # --- Summarization service ---
+
+    def bench_service(self, service_engine: str):
+        from app import summarization_service
+        original = summarization_service.summarize_chunk
+        if service_engine == "stub":
+            summarization_service.summarize_chunk = stub_summarize_chunk
+        try:
+            self._bench_service(summarization_service, service_engine)
+        finally:
+            summarization_service.summarize_chunk = original
+
+    def _bench_service(self, summarization_service, service_engine: str):
+        for language in self.languages:
+            for size in self.sizes:
+                lines = as_lines(make_corpus(language, size))
+                fits = summarization_service.count_units("\n".join(lines)) <= summarization_service.MAX_UNITS_PER_CHUNK
+                params = {"engine": service_engine, "language": language, "messages": size,
+                          "path": "single-pass" if fits else "hierarchical"}
+                try:
+                    stats = measure(lambda: summarization_service.create_summary(lines), max(1, self.repeat // 5) if size >= 2_000 else self.repeat)
+                except Exception as e:
+                    self.record("service.create_summary", params, skipped=f"{type(e).__name__}: {e}")
+                    continue
+                self.record("service.create_summary", params, stats)
+
+    # --- Preprocessing ---
+
+    def bench_preprocess(self, service_engine: str):
+        from app import summarization_service
+        original = summarization_service.summarize_chunk, summarization_service.PREPROCESS_ENABLED
+        if service_engine == "stub":
+            summarization_service.summarize_chunk = stub_summarize_chunk
+        try:
+            self._bench_preprocess(summarization_service, service_engine)
+        finally:
+            summarization_service.summarize_chunk, summarization_service.PREPROCESS_ENABLED = original
+
+    def _bench_preprocess(self, summarization_service, service_engine: str):
+        from app import engine_registry
+        from app.database import Message
+        from app.preprocessing import preprocess
+        if service_engine != "stub":
+            # Load it up front: the first summary's chunks would otherwise all import it at once.
+            try:
+                engine_registry.get_engine().load_model()
+            except Exception as e:
+                self.record("service.summarize_messages", {"engine": service_engine}, skipped=f"{type(e).__name__}: {e}")
+                return
+        for language in self.languages:
+            for size in self.sizes:
+                messages = [Message(chat_id=-1, **message) for message in add_noise(make_corpus(language, size))]
+                _, report = preprocess(messages, summarization_service.message_units)
+                for enabled in (False, True):
+                    summarization_service.PREPROCESS_ENABLED = enabled
+                    params = {"engine": service_engine, "language": language, "messages": len(messages), "preprocess": enabled,
+                              "units": report.units_out if enabled else report.units_in}
+                    run = lambda: asyncio.run(summarization_service.summarize_messages(None, -1, messages))
+                    try:
+                        stats = measure(run, max(1, self.repeat // 5) if size >= 2_000 else self.repeat)
+                    except Exception as e:
+                        self.record("service.summarize_messages", params, skipped=f"{type(e).__name__}: {e}")
+                        continue
+                    self.record("service.summarize_messages", params, stats)
+
+    # --- Archive queries ---
+
+    def bench_db(self):
+        from sqlmodel import SQLModel, Session, create_engine
+        from app import database
+        from app.database import Message
+        from app.migrations import run_migrations
+
+        for size in self.sizes:
+            engine = create_engine(f"sqlite:///{_db_dir}/archive-{size}.db")
+            SQLModel.metadata.drop_all(engine)
+            SQLModel.metadata.create_all(engine)
+            run_migrations(engine)
+            # The measured chat plus two neighbours of the same size, so indexes have to discriminate.
+            with Session(engine) as session:
+                for chat_id in (-100, -200, -300):
+                    session.add_all(Message(chat_id=chat_id, **row) for row in make_corpus(self.languages[0], size))
+                session.commit()
+                with engine.begin() as connection:
+                    database.rebuild_sender_stats(connection)
+
+                params = {"messages": size}
+                self.record("db.get_messages_in_range", params,
+                            measure(lambda: database.get_messages_in_range(session, -100, 1, size), self.repeat))
+                for limit in (50, 200):
+                    self.record("db.get_last_n_messages", {**params, "limit": limit},
+                                measure(lambda: database.get_last_n_messages(session, -100, limit=limit), self.repeat))
+                self.record("db.get_chat_statistics", params,
+                            measure(lambda: database.get_chat_statistics(session, -100), self.repeat))
+            engine.dispose()
+
+    # --- End to end ---
+
+    def bench_webhook(self):
+        asyncio.run(self._bench_webhook())
+
+    async def _bench_webhook(self):
+        from httpx import AsyncClient, ASGITransport
+        from app import summarization_service, telegram_service
+        from app.database import create_db_and_tables
+        from app.ingestion import message_buffer
+        from app.job_queue import update_queue
+        from app.webhook_handler import app
+
+        async def no_send(*args, **kwargs):
+            return 1
+        # Telegram itself is out of scope; summaries use the stub engine so the numbers show our overhead.
+        telegram_service.send_message = telegram_service.send_status_message = telegram_service.edit_message = no_send
+        summarization_service.summarize_chunk = stub_summarize_chunk
+        create_db_and_tables()
+
+        def update(update_id: int, text: str) -> dict:
+            return {"update_id": update_id, "message": {
+                "message_id": update_id, "date": 1704067200 + update_id,
+                "chat": {"id": -100, "type": "group", "title": "Bench"},
+                "from": {"id": 1, "is_bot": False, "first_name": "Bench"},
+                "text": text,
+            }}
+
+        corpus = make_corpus(self.languages[0], max(self.sizes))
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+            ack, handled = [], []
+            for row in corpus[:min(len(corpus), 500)]:
+                started = time.perf_counter()
+                await client.post("/webhook", json=update(row["message_id"], row["text"]))
+                ack.append(time.perf_counter() - started)
+                await update_queue.join(timeout=30)
+                handled.append(time.perf_counter() - started)
+            self.record("webhook.ack", {"kind": "message"}, summarize_timings(ack))
+            self.record("webhook.handled", {"kind": "message"}, summarize_timings(handled))
+
+            await message_buffer.flush()
+            for limit in (50, 200):
+                timings = []
+                for i in range(self.repeat):
+                    started = time.perf_counter()
+                    await client.post("/webhook", json=update(10_000_000 + limit * 1000 + i, f"/summarize_last {limit}"))
+                    await update_queue.join(timeout=60)
+                    timings.append(time.perf_counter() - started)
+                self.record("webhook.handled", {"kind": "summarize_last", "limit": limit}, summarize_timings(timings))
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark suite")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--languages", nargs="+", default=list(LANGUAGES), choices=list(LANGUAGES))
+    parser.add_argument("--groups", nargs="+", default=list(GROUPS), choices=GROUPS)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--service-engine", default="stub", choices=["stub", "configured"])
+    parser.add_argument("--output", default="-", help="JSON file to write, or - for stdout")
+    args = parser.parse_args(argv)
+
+    from app.config import SUMMARIZER_MODE
+    suite = Suite(args.sizes, args.languages, args.repeat)
+    for group in args.groups:
+        print(f"Running {group} benchmarks...", file=sys.stderr)
+        if group == "engines":
+            suite.bench_engines()
+        elif group == "service":
+            suite.bench_service(args.service_engine if args.service_engine == "stub" else SUMMARIZER_MODE)
+        elif group == "preprocess":
+            suite.bench_preprocess(args.service_engine if args.service_engine == "stub" else SUMMARIZER_MODE)
+        elif group == "db":
+            suite.bench_db()
+        elif group == "webhook":
+            suite.bench_webhook()
+
+    report = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "summarizer_mode": SUMMARIZER_MODE,
+            "repeat": args.repeat,
+        },
+        "results": suite.results,
+    }
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output == "-":
+        print(output)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# tests/fake_bot_api.py
+
+from collections import defaultdict
+from typing import Dict, List
+from urllib.parse import parse_qsl
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from httpx import ASGITransport
+from telegram import Bot
+from telegram.request import HTTPXRequest
+
+
+class FakeBotApi:
+    """
+    A local stand-in for the Telegram Bot API. A real `Bot` talks to it over
+    python-telegram-bot's own HTTP stack, so parsing and error mapping (e.g. 429 ->
+    RetryAfter) are the real ones. `flood(method, times, retry_after)` makes the next
+    calls of `method` fail with 429.
+    """
+
+    def __init__(self):
+        self.calls: List[Dict] = []
+        self._floods: Dict[str, List[int]] = defaultdict(list)
+        self._next_message_id = 1
+        self.app = FastAPI()
+        self.app.post("/bot{token}/{method}")(self._handle)
+
+    def flood(self, method: str, times: int, retry_after: int = 1):
+        self._floods[method].extend([retry_after] * times)
+
+    def bot(self) -> Bot:
+        return Bot(token="123:fake", request=HTTPXRequest(httpx_kwargs={"transport": ASGITransport(app=self.app)}))
+
+    def sent(self, method: str = "sendMessage") -> List[Dict]:
+        return [call for call in self.calls if call["method"] == method and call["status"] == 200]
+
+    async def _handle(self, token: str, method: str, request: Request):
+        # python-telegram-bot posts the parameters url-encoded.
+        params = dict(parse_qsl((await request.body()).decode()))
+        if self._floods[method]:
+            retry_after = self._floods[method].pop(0)
+            self.calls.append({"method": method, "status": 429, **params})
+            return JSONResponse(status_code=429, content={
+                "ok": False, "error_code": 429,
+                "description": f"Too Many Requests: retry after {retry_after}",
+                "parameters": {"retry_after": retry_after},
+            })
+
+        self.calls.append({"method": method, "status": 200, **params})
+        message_id = int(params.get("message_id") or self._next_message_id)
+        self._next_message_id += 1
+        return {"ok": True, "result": {
+            "message_id": message_id,
+            "date": 1704067200,
+            "chat": {"id": int(params["chat_id"]), "type": "group"},
+            "text": params.get("text", ""),
+        }}
@@ -0,0 +1,59 @@
+# tests/test_batching.py
+
+import asyncio
+import pytest
+from app.batching import MicroBatcher
+
+pytestmark = pytest.mark.asyncio
+
+batches_seen = []
+
+def fake_summarize_batch(texts):
+    batches_seen.append(list(texts))
+    return [text.upper() for text in texts]
+
+
+async def test_concurrent_submissions_share_one_batch():
+    batches_seen.clear()
+    batcher = MicroBatcher(fake_summarize_batch, max_batch_size=4, max_wait_ms=50)
+
+    results = await asyncio.gather(*(batcher.submit(f"chunk {i}") for i in range(4)))
+
+    assert results == [f"CHUNK {i}" for i in range(4)]
+    assert batches_seen == [[f"chunk {i}" for i in range(4)]]
+
+
+async def test_partial_batch_is_flushed_after_wait():
+    batches_seen.clear()
+    batcher = MicroBatcher(fake_summarize_batch, max_batch_size=8, max_wait_ms=10)
+
+    results = await asyncio.gather(*(batcher.submit(f"chunk {i}") for i in range(3)))
+
+    assert results == ["CHUNK 0", "CHUNK 1", "CHUNK 2"]
+    assert len(batches_seen) == 1
+    assert batcher.stats()["average_batch_size"] == 3
+
+
+async def test_overflow_is_split_into_several_batches():
+    batches_seen.clear()
+    batcher = MicroBatcher(fake_summarize_batch, max_batch_size=2, max_wait_ms=10)
+
+    results = await asyncio.gather(*(batcher.submit(f"chunk {i}") for i in range(5)))
+
+    assert results == [f"CHUNK {i}" for i in range(5)]
+    assert sorted(len(batch) for batch in batches_seen) == [1, 2, 2]
+
+
+def short_summarize_batch(texts):
+    return [text.upper() for text in texts[:-1]]
+
+
+async def test_short_result_list_fails_every_caller():
+    batcher = MicroBatcher(short_summarize_batch, max_batch_size=3, max_wait_ms=10)
+
+    results = await asyncio.wait_for(
+        asyncio.gather(*(batcher.submit(f"chunk {i}") for i in range(3)), return_exceptions=True),
+        timeout=5,
+    )
+
+    assert all(isinstance(result, RuntimeError) for result in results)
@@ -0,0 +1,23 @@
+# tests/test_benchmark_suite.py
+
+from benchmarks import compare
+from benchmarks.corpora import make_corpus
+from benchmarks.run_suite import main
+
+
+def test_corpora_are_deterministic():
+    assert make_corpus("arabic", 50) == make_corpus("arabic", 50)
+    assert [m["message_id"] for m in make_corpus("english", 20)] == list(range(1, 21))
+
+
+def test_suite_writes_a_report_and_compare_flags_regressions(tmp_path):
+    output = tmp_path / "bench.json"
+    report = main(["--sizes", "50", "--languages", "english", "--groups", "service", "db", "--repeat", "2", "--output", str(output)])
+
+    names = {entry["name"] for entry in report["results"]}
+    assert {"service.create_summary", "db.get_last_n_messages", "db.get_chat_statistics"} <= names
+    assert output.exists()
+
+    slower = {"results": [{**entry, "p50_ms": entry["p50_ms"] * 3} for entry in report["results"]]}
+    rows = compare.compare(report, slower, threshold=1.2)
+    assert rows and all(regressed for *_, regressed in rows)
@@ -0,0 +1,88 @@
+# tests/test_chat_statistics.py
+
+from datetime import datetime, timedelta
+import pytest
+from sqlmodel import SQLModel, Session, create_engine
+from sqlalchemy.pool import StaticPool
+from app import database
+from app.database import Message
+from app.ingestion import MessageBuffer
+from app.migrations import run_migrations
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    monkeypatch.setattr(database, "engine", engine)
+    monkeypatch.setattr(database, "async_engine", None)
+    return engine
+
+
+def make_message(message_id, sender, minutes=0, chat_id=-100):
+    return Message(message_id=message_id, chat_id=chat_id, sender_name=sender, text=f"message {message_id}",
+                   timestamp=datetime(2024, 1, 1) + timedelta(minutes=minutes))
+
+
+def stats_for(engine, chat_id=-100):
+    with Session(engine) as session:
+        return database.get_chat_statistics(session, chat_id)
+
+
+def test_save_message_updates_counters(engine):
+    with Session(engine) as session:
+        database.save_message(session, make_message(1, "Alice", minutes=0))
+        database.save_message(session, make_message(2, "Bob", minutes=10))
+        database.save_message(session, make_message(3, "Alice", minutes=5))
+
+    stats = stats_for(engine)
+    assert stats["total_messages"] == 3
+    assert stats["most_active_user"] == "Alice"
+    assert stats["top_senders"] == [("Alice", 2), ("Bob", 1)]
+    assert stats["first_message_at"] == datetime(2024, 1, 1)
+    assert stats["last_message_at"] == datetime(2024, 1, 1, 0, 10)
+
+
+@pytest.mark.asyncio
+async def test_buffered_duplicates_are_not_counted_twice(engine):
+    buffer = MessageBuffer(max_batch_size=100, flush_interval_ms=60_000)
+    buffer.add(make_message(1, "Alice"))
+    buffer.add(make_message(2, "Alice"))
+    await buffer.flush()
+
+    # A redelivered update: message 2 is skipped by the insert and must not be counted.
+    buffer.add(make_message(2, "Alice"))
+    buffer.add(make_message(3, "Bob"))
+    await buffer.flush()
+
+    assert stats_for(engine)["top_senders"] == [("Alice", 2), ("Bob", 1)]
+
+
+def test_rebuild_matches_the_archive(engine):
+    with Session(engine) as session:
+        for i in range(1, 8):
+            session.add(make_message(i, "Alice" if i % 2 else "Bob", minutes=i))
+        session.add(make_message(1, "Carol", chat_id=-200))
+        session.commit()
+
+    assert stats_for(engine)["total_messages"] == 0 # Added behind the counters' back
+
+    with engine.begin() as connection:
+        database.rebuild_sender_stats(connection)
+
+    stats = stats_for(engine)
+    assert stats["top_senders"] == [("Alice", 4), ("Bob", 3)]
+    assert stats_for(engine, -200)["total_messages"] == 1
+
+
+def test_migration_backfills_existing_archive():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(make_message(1, "Alice"))
+        session.add(make_message(2, "Alice"))
+        session.commit()
+
+    run_migrations(engine)
+
+    assert stats_for(engine)["top_senders"] == [("Alice", 2)]
@@ -0,0 +1,116 @@
+# tests/test_cold_storage.py
+
+from datetime import datetime, timedelta
+import pytest
+from sqlmodel import SQLModel, Session, create_engine, select, func
+from sqlalchemy.pool import StaticPool
+from app import database
+from app.database import ColdSegment, Message
+
+pytest.importorskip("pyarrow")
+from app import cold_storage
+
+
+@pytest.fixture
+def engine(monkeypatch, tmp_path):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    monkeypatch.setattr(database, "COLD_STORAGE_ENABLED", True)
+    monkeypatch.setattr(cold_storage, "COLD_STORAGE_DIR", str(tmp_path / "cold"))
+    return engine
+
+
+def archive(engine, count, newest_at, chat_id=-100):
+    """Archives messages 1..count, one per hour, the last one at `newest_at`."""
+    with Session(engine) as session:
+        for i in range(1, count + 1):
+            database.save_message(session, Message(
+                message_id=i, chat_id=chat_id, sender_name="User", text=f"message {i}",
+                timestamp=newest_at - timedelta(hours=count - i), unit_count=3, unit_kind="words",
+            ))
+
+
+def hot_count(engine):
+    with Session(engine) as session:
+        return session.exec(select(func.count(Message.id))).one()
+
+
+def test_compaction_moves_old_messages_into_segments(engine):
+    archive(engine, 100, newest_at=datetime.utcnow())
+    before = [(m.message_id, m.text, m.timestamp) for m in Session(engine).exec(select(Message).order_by(Message.message_id)).all()]
+
+    totals = cold_storage.compact(engine, older_than_days=1, max_rows=30)
+
+    # Everything older than a day (76 of the hourly messages) is cold now, in 30-row segments.
+    assert totals["messages"] == 76 and totals["segments"] == 3
+    assert hot_count(engine) == 24
+    with Session(engine) as session:
+        segments = session.exec(select(ColdSegment).order_by(ColdSegment.first_message_id)).all()
+        assert [(s.first_message_id, s.last_message_id, s.row_count) for s in segments] == [(1, 30, 30), (31, 60, 30), (61, 76, 16)]
+        # Range queries transparently read both tiers.
+        after = database.get_messages_in_range(session, -100, 1, 100)
+    assert [(m.message_id, m.text, m.timestamp) for m in after] == before
+    assert after[0].unit_count == 3 and after[0].unit_kind == "words"
+
+
+def test_range_query_reads_only_overlapping_segments(engine):
+    archive(engine, 100, newest_at=datetime.utcnow())
+    cold_storage.compact(engine, older_than_days=1, max_rows=30)
+
+    with Session(engine) as session:
+        messages = database.get_messages_in_range(session, -100, 40, 80)
+    assert [m.message_id for m in messages] == list(range(40, 81))
+
+
+def test_last_n_fills_from_the_cold_tier(engine):
+    archive(engine, 100, newest_at=datetime.utcnow())
+    cold_storage.compact(engine, older_than_days=1, max_rows=30)
+
+    with Session(engine) as session:
+        messages = database.get_last_n_messages(session, -100, limit=50)
+    assert [m.message_id for m in messages] == list(range(51, 101))
+
+
+def test_redelivered_cold_message_is_not_duplicated(engine):
+    archive(engine, 10, newest_at=datetime.utcnow() - timedelta(days=5))
+    cold_storage.compact(engine, older_than_days=1)
+    assert hot_count(engine) == 0
+
+    with Session(engine) as session:
+        session.add(Message(message_id=5, chat_id=-100, sender_name="User", text="message 5", timestamp=datetime.utcnow()))
+        session.commit()
+        messages = database.get_messages_in_range(session, -100, 1, 10)
+    assert [m.message_id for m in messages] == list(range(1, 11))
+
+
+def test_tier_sizes_and_stats_count_the_whole_archive(engine):
+    archive(engine, 100, newest_at=datetime.utcnow())
+    cold_storage.compact(engine, older_than_days=1)
+
+    sizes = cold_storage.get_tier_sizes(engine)
+    assert (sizes["hot"], sizes["cold"]) == (24, 76)
+    assert sizes["cold_bytes"] > 0
+    with Session(engine) as session:
+        assert database.get_chat_statistics(session, -100)["total_messages"] == 100
+
+
+@pytest.mark.asyncio
+async def test_async_queries_read_both_tiers(monkeypatch, tmp_path):
+    from sqlmodel.ext.asyncio.session import AsyncSession
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    monkeypatch.setattr(database, "COLD_STORAGE_ENABLED", True)
+    monkeypatch.setattr(cold_storage, "COLD_STORAGE_DIR", str(tmp_path / "cold"))
+    sync_engine = create_engine(f"sqlite:///{tmp_path / 'archive.db'}")
+    SQLModel.metadata.create_all(sync_engine)
+    archive(sync_engine, 100, newest_at=datetime.utcnow())
+    cold_storage.compact(sync_engine, older_than_days=1, max_rows=30)
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'archive.db'}")
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        in_range = await database.get_messages_in_range_async(session, -100, 20, 90)
+        last = await database.get_last_n_messages_async(session, -100, limit=40)
+    await async_engine.dispose()
+
+    assert [m.message_id for m in in_range] == list(range(20, 91))
+    assert [m.message_id for m in last] == list(range(61, 101))
@@ -0,0 +1,97 @@
+# tests/test_database_async.py
+
+from datetime import datetime, timedelta
+import pytest
+import pytest_asyncio
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
+from app import database
+from app.database import Message
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest_asyncio.fixture
+async def async_session():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        base = datetime(2024, 1, 1)
+        for i in range(1, 11):
+            sender = "Alice" if i % 3 else "Bob"
+            session.add(Message(message_id=i, chat_id=-100, sender_name=sender, text=f"message {i}", timestamp=base + timedelta(minutes=i)))
+        session.add(Message(message_id=1, chat_id=-200, sender_name="Carol", text="other chat", timestamp=base))
+        await session.commit()
+        await session.run_sync(database.rebuild_sender_stats)
+        await session.commit()
+        yield session
+
+    await engine.dispose()
+
+
+async def test_get_messages_in_range_async(async_session):
+    messages = await database.get_messages_in_range_async(async_session, -100, 3, 6)
+    assert [m.message_id for m in messages] == [3, 4, 5, 6]
+
+
+async def test_get_last_n_messages_async(async_session):
+    messages = await database.get_last_n_messages_async(async_session, -100, limit=3)
+    assert [m.message_id for m in messages] == [8, 9, 10]
+
+
+async def test_get_chat_statistics_async(async_session):
+    stats = await database.get_chat_statistics_async(async_session, -100)
+    assert stats["total_messages"] == 10
+    assert stats["most_active_user"] == "Alice"
+    assert stats["top_senders"] == [("Alice", 7), ("Bob", 3)]
+
+
+async def test_run_with_session_saves_through_async_session(async_session):
+    message = Message(message_id=11, chat_id=-100, sender_name="Bob", text="new", timestamp=datetime(2024, 1, 2))
+    await database.run_with_session(async_session, database.save_message, message)
+
+    messages = await database.get_last_n_messages_async(async_session, -100, limit=1)
+    assert messages[0].message_id == 11
+
+
+async def test_async_url_uses_async_drivers():
+    assert database._async_url("postgresql://u:p@host/db").startswith("postgresql+asyncpg://u:p@host/db?")
+    assert database._async_url("sqlite:///local.db") == "sqlite+aiosqlite:///local.db"
+
+
+async def test_handle_update_with_async_session(async_session, monkeypatch):
+    """Runs a /summarize_last command end to end on an AsyncSession, including the chunk cache."""
+    from telegram import Update
+    from app import logic_controller, summarization_service
+
+    sent_messages = []
+    async def mock_send_message(chat_id, text):
+        sent_messages.append(text)
+        return True
+
+    monkeypatch.setattr("app.telegram_service.send_message", mock_send_message)
+    monkeypatch.setattr(summarization_service, "summarize_chunk", lambda text: f"summary of {len(text.splitlines())} lines")
+    monkeypatch.setattr(summarization_service, "SUMMARY_CACHE_ENABLED", True)
+    # Archive through the session itself rather than the write-behind buffer.
+    monkeypatch.setattr(logic_controller, "ARCHIVE_BUFFER_ENABLED", False)
+    monkeypatch.setattr(logic_controller, "PROGRESSIVE_SUMMARY_ENABLED", False)
+
+    update = Update.de_json({
+        "update_id": 1,
+        "message": {
+            "message_id": 12, "date": 1704153600,
+            "chat": {"id": -100, "type": "group", "title": "Test Group"},
+            "from": {"id": 1, "is_bot": False, "first_name": "Alice"},
+            "text": "/summarize_last 5",
+        },
+    }, None)
+
+    await logic_controller.handle_update(update, async_session)
+
+    assert len(sent_messages) == 2
+    assert "summary of" in sent_messages[1]
+    stored = await database.get_last_n_messages_async(async_session, -100, limit=1)
+    assert stored[0].text == "/summarize_last 5"
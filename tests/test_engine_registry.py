@@ -0,0 +1,80 @@
+# tests/test_engine_registry.py
+
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from httpx import AsyncClient, ASGITransport
+from app import engine_registry, engine_traditional, executor
+from app.webhook_handler import app
+
+pytestmark = pytest.mark.asyncio
+
+HEAVY_MODULES = ("torch", "transformers", "sumy", "nltk", "scipy")
+
+
+@pytest.fixture(autouse=True)
+def thread_pool():
+    engine_registry.reset()
+    executor.set_executor(ThreadPoolExecutor(max_workers=1))
+    yield
+    executor.shutdown_executor()
+    engine_registry.reset()
+
+
+@pytest.mark.parametrize("mode", ["traditional", "fastlsa", "transformer"])
+async def test_importing_the_app_does_not_load_engines(mode):
+    # A fresh interpreter, so modules imported by other tests don't count.
+    env = {**os.environ, "SUMMARIZER_MODE": mode, "BOT_TOKEN": "123:abc", "DATABASE_URL": "sqlite://"}
+    code = f"import sys, app.webhook_handler; print([m for m in {HEAVY_MODULES!r} if m in sys.modules])"
+    result = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    assert result.stdout.strip().splitlines()[-1] == "[]"
+
+
+async def test_ready_reports_503_until_warm_up_finished(monkeypatch):
+    loads = []
+    monkeypatch.setattr(engine_registry, "SUMMARIZER_MODE", "traditional")
+    monkeypatch.setattr(engine_traditional, "load_model", lambda: loads.append("model"))
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        assert (await ac.get("/ready")).status_code == 503
+        await engine_registry.warm_up()
+        response = await ac.get("/ready")
+
+    assert response.status_code == 200
+    assert loads == ["model"]
+    report = response.json()
+    assert report["status"] == "ready"
+    assert {"model_load_s", "warmup_s"} <= set(report["timings_s"])
+
+
+async def test_failed_warm_up_keeps_app_not_ready(monkeypatch):
+    def broken_load():
+        raise LookupError("stopwords not downloaded")
+
+    monkeypatch.setattr(engine_registry, "SUMMARIZER_MODE", "traditional")
+    monkeypatch.setattr(engine_traditional, "load_model", broken_load)
+
+    await engine_registry.warm_up()
+
+    report = engine_registry.startup_report()
+    assert not engine_registry.is_ready()
+    assert report["status"] == "failed"
+    assert "stopwords" in report["error"]
+
+
+async def test_transformer_backends_have_their_own_cache_versions():
+    from app import engine_transformer
+
+    versions = {engine_transformer.engine_version(backend) for backend in engine_transformer.BACKENDS}
+    assert len(versions) == len(engine_transformer.BACKENDS)
+    assert engine_transformer.engine_version("pytorch") == f"{engine_transformer.MODEL_NAME}:30-256"
+
+
+async def test_unknown_transformer_backend_fails_before_loading_anything():
+    from app import engine_transformer
+
+    with pytest.raises(ValueError, match="TRANSFORMER_BACKEND"):
+        engine_transformer.load_model(backend="tensorrt")
+    assert engine_transformer.summarizer is None
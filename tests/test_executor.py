@@ -0,0 +1,53 @@
+# tests/test_executor.py
+
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import pytest
+from app import executor
+
+
+@pytest.fixture(autouse=True)
+def fresh_executor():
+    executor.shutdown_executor()
+    yield
+    executor.shutdown_executor()
+
+
+@pytest.mark.parametrize("kind, mode, expected", [
+    ("auto", "traditional", ThreadPoolExecutor),
+    ("auto", "transformer", ProcessPoolExecutor),
+    ("thread", "transformer", ThreadPoolExecutor),
+    ("process", "traditional", ProcessPoolExecutor),
+])
+def test_create_executor_selects_pool_kind(monkeypatch, kind, mode, expected):
+    monkeypatch.setattr(executor, "SUMMARY_EXECUTOR", kind)
+    monkeypatch.setattr(executor, "SUMMARIZER_MODE", mode)
+
+    pool = executor._create_executor()
+    try:
+        assert isinstance(pool, expected)
+    finally:
+        pool.shutdown(wait=False)
+
+
+def test_get_executor_is_shared_until_shutdown():
+    first = executor.get_executor()
+    assert executor.get_executor() is first
+
+    executor.shutdown_executor()
+    assert executor.get_executor() is not first
+
+
+def test_set_executor_replaces_and_shuts_down_previous():
+    previous = executor.get_executor()
+    custom = ThreadPoolExecutor(max_workers=1)
+
+    executor.set_executor(custom)
+
+    assert executor.get_executor() is custom
+    with pytest.raises(RuntimeError):
+        previous.submit(print)
+
+
+@pytest.mark.asyncio
+async def test_run_in_pool_returns_result():
+    assert await executor.run_in_pool(sum, [1, 2, 3]) == 6
@@ -0,0 +1,46 @@
+# tests/test_fastlsa_engine.py
+
+import numpy as np
+from app.engine_fastlsa import rank_sentences
+
+
+def dense_lsa_ranks(sentence_terms, components):
+    # Reference implementation: dense matrix and a full SVD, keeping the top components.
+    vocabulary = sorted({term for terms in sentence_terms for term in terms})
+    matrix = np.zeros((len(vocabulary), len(sentence_terms)))
+    for col, terms in enumerate(sentence_terms):
+        for term in terms:
+            matrix[vocabulary.index(term), col] += 1
+    column_max = matrix.max(axis=0)
+    nonzero = matrix > 0
+    matrix[nonzero] = 0.4 + 0.6 * (matrix / column_max)[nonzero]
+    _, sigma, vt = np.linalg.svd(matrix, full_matrices=False)
+    sigma, vt = sigma[:components], vt[:components]
+    return np.sqrt(((sigma[:, None] ** 2) * (vt ** 2)).sum(axis=0))
+
+
+SENTENCES = [
+    ["اجتماع", "غدا", "خطة", "اصدار"],
+    ["خطة", "اصدار", "اختبار", "اصدار"],
+    ["قهوة", "صباح"],
+    ["اختبار", "نسخة", "خميس", "اصدار"],
+    ["اجتماع", "عميل", "عرض"],
+    ["كلمة", "مرور", "مهمة"],
+    ["مرور", "اختبار", "نسخة"],
+]
+
+
+def test_truncated_ranks_match_dense_svd():
+    ranks = rank_sentences(SENTENCES, components=3)
+    assert np.allclose(ranks, dense_lsa_ranks(SENTENCES, 3))
+
+
+def test_central_sentences_rank_above_off_topic_ones():
+    ranks = rank_sentences(SENTENCES, components=2)
+    assert ranks[1] > ranks[2]
+    assert ranks[3] > ranks[2]
+
+
+def test_degenerate_inputs():
+    assert not rank_sentences([[], []]).any()
+    assert rank_sentences([["كلمة"]]).shape == (1,)
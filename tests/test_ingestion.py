@@ -0,0 +1,80 @@
+# tests/test_ingestion.py
+
+from datetime import datetime
+import pytest
+from sqlmodel import SQLModel, Session, create_engine, select
+from sqlalchemy.pool import StaticPool
+from app import database
+from app.database import Message
+from app.ingestion import MessageBuffer
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    monkeypatch.setattr(database, "engine", engine)
+    monkeypatch.setattr(database, "async_engine", None)
+    return engine
+
+
+def make_message(message_id, chat_id=-100):
+    return Message(message_id=message_id, chat_id=chat_id, sender_name="User", text=f"message {message_id}", timestamp=datetime(2024, 1, 1))
+
+
+def archived_ids(engine, chat_id=-100):
+    with Session(engine) as session:
+        return sorted(m.message_id for m in session.exec(select(Message).where(Message.chat_id == chat_id)).all())
+
+
+async def test_buffer_flushes_one_batch_at_size_threshold(engine):
+    buffer = MessageBuffer(max_batch_size=3, flush_interval_ms=60_000)
+
+    for i in range(3):
+        buffer.add(make_message(i))
+    await buffer.flush()
+
+    assert archived_ids(engine) == [0, 1, 2]
+    assert buffer.flushes == 1
+
+
+async def test_flush_for_one_chat_leaves_other_chats_pending(engine):
+    buffer = MessageBuffer(max_batch_size=100, flush_interval_ms=60_000)
+    buffer.add(make_message(1, chat_id=-100))
+    buffer.add(make_message(2, chat_id=-200))
+
+    await buffer.flush(-100)
+
+    assert archived_ids(engine, -100) == [1]
+    assert archived_ids(engine, -200) == []
+    assert buffer.pending_count() == 1
+
+    await buffer.drain()
+    assert archived_ids(engine, -200) == [2]
+
+
+async def test_failed_batch_falls_back_to_row_inserts(engine):
+    buffer = MessageBuffer(max_batch_size=100, flush_interval_ms=60_000)
+    buffer.add(make_message(1))
+    bad = make_message(2)
+    bad.text = None
+    buffer.add(bad)
+    buffer.add(make_message(3))
+
+    await buffer.drain()
+
+    assert archived_ids(engine) == [1, 3]
+
+
+async def test_redelivered_message_is_skipped(engine):
+    buffer = MessageBuffer(max_batch_size=100, flush_interval_ms=60_000)
+    buffer.add(make_message(1))
+    await buffer.flush()
+
+    buffer.add(make_message(1))
+    buffer.add(make_message(2))
+    await buffer.flush()
+
+    assert archived_ids(engine) == [1, 2]
@@ -0,0 +1,78 @@
+# tests/test_job_queue.py
+
+import asyncio
+import pytest
+from app.job_queue import ChatJobQueue, QueueFullError
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_jobs_of_one_chat_run_in_order():
+    queue = ChatJobQueue(max_workers=4, max_depth=100, enqueue_timeout=1)
+    seen = []
+
+    async def job(value, delay):
+        await asyncio.sleep(delay)
+        seen.append(value)
+
+    # Later jobs are faster, so they would overtake earlier ones without per-chat ordering.
+    for i in range(5):
+        await queue.enqueue("chat", job, i, 0.01 * (5 - i))
+    await queue.join(timeout=5)
+
+    assert seen == [0, 1, 2, 3, 4]
+    assert queue.stats()["completed"] == 5
+
+
+async def test_global_concurrency_is_bounded():
+    queue = ChatJobQueue(max_workers=2, max_depth=100, enqueue_timeout=1)
+    running, peak = 0, 0
+
+    async def job():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.02)
+        running -= 1
+
+    for chat in range(6):
+        await queue.enqueue(chat, job)
+    await queue.join(timeout=5)
+
+    assert peak == 2
+
+
+async def test_full_queue_pushes_back():
+    queue = ChatJobQueue(max_workers=1, max_depth=2, enqueue_timeout=0.05)
+    release = asyncio.Event()
+
+    async def job():
+        await release.wait()
+
+    await queue.enqueue(1, job)
+    await queue.enqueue(2, job)
+    with pytest.raises(QueueFullError):
+        await queue.enqueue(3, job)
+
+    release.set()
+    await queue.join(timeout=5)
+    assert queue.stats()["rejected"] == 1
+    assert queue.depth == 0
+
+
+async def test_failing_job_does_not_block_the_chat():
+    queue = ChatJobQueue(max_workers=1, max_depth=10, enqueue_timeout=1)
+    seen = []
+
+    async def failing():
+        raise ValueError("boom")
+
+    async def ok():
+        seen.append("ok")
+
+    await queue.enqueue("chat", failing)
+    await queue.enqueue("chat", ok)
+    await queue.join(timeout=5)
+
+    assert seen == ["ok"]
+    assert queue.stats()["failed"] == 1
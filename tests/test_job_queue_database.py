@@ -0,0 +1,126 @@
+# tests/test_job_queue_database.py
+
+import asyncio
+import time
+import pytest
+from sqlmodel import SQLModel, Session, create_engine, select
+from app import job_store
+from app.database import Job
+from app.worker import JobWorker
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def engine(tmp_path):
+    # A file database, so workers really use separate connections.
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+    SQLModel.metadata.create_all(engine, tables=[Job.__table__])
+    yield engine
+    engine.dispose()
+
+
+def enqueue(engine, count, kind="test", max_attempts=3):
+    with Session(engine) as session:
+        return [job_store.enqueue_job(session, kind, -100, {"n": i}, max_attempts=max_attempts) for i in range(count)]
+
+
+async def test_workers_claim_disjoint_jobs(engine):
+    enqueue(engine, 10)
+    first = job_store.claim_jobs(engine, "a", 4, lease_seconds=60)
+    second = job_store.claim_jobs(engine, "b", 10, lease_seconds=60)
+
+    assert len(first) == 4 and len(second) == 6
+    assert not {job.id for job in first} & {job.id for job in second}
+    assert job_store.claim_jobs(engine, "c", 10, lease_seconds=60) == []
+    assert [job.payload["n"] for job in first] == [0, 1, 2, 3]
+
+
+async def test_expired_lease_is_claimed_again(engine):
+    enqueue(engine, 1)
+    [job] = job_store.claim_jobs(engine, "dead-worker", 1, lease_seconds=-1)
+
+    [reclaimed] = job_store.claim_jobs(engine, "b", 1, lease_seconds=60)
+    assert reclaimed.id == job.id and reclaimed.attempts == 2
+    # The first worker lost the job: it can neither renew nor finish it.
+    assert not job_store.extend_lease(engine, job.id, "dead-worker", 60)
+    job_store.complete_job(engine, job.id, "dead-worker")
+    assert job_store.get_queue_stats(engine)["running"] == 1
+
+
+async def test_failing_job_is_retried_then_dead_lettered(engine):
+    enqueue(engine, 1, max_attempts=2)
+    attempts = []
+
+    async def failing(session, job):
+        attempts.append(job.attempts)
+        raise RuntimeError("engine down")
+
+    worker = JobWorker(failing, engine=engine, concurrency=1, poll_interval=0.01, retry_backoff=0)
+    await worker.run_until_empty()
+
+    assert attempts == [1, 2]
+    assert (worker.retried, worker.dead) == (1, 1)
+    with Session(engine) as session:
+        job = session.exec(select(Job)).one()
+    assert job.status == "dead" and "engine down" in job.last_error
+
+
+async def test_completed_jobs_are_removed(engine):
+    enqueue(engine, 3)
+    seen = []
+
+    async def record(session, job):
+        seen.append(job.payload["n"])
+
+    await JobWorker(record, engine=engine, concurrency=2, poll_interval=0.01).run_until_empty()
+
+    assert sorted(seen) == [0, 1, 2]
+    assert job_store.get_queue_stats(engine) == {"queued": 0, "running": 0, "dead": 0}
+
+
+async def test_throughput_rises_with_worker_count(engine):
+    async def summarize(session, job):
+        await asyncio.sleep(0.05) # Stands in for a summary running on a summarizer node
+
+    async def drain(worker_count):
+        enqueue(engine, 12)
+        workers = [JobWorker(summarize, engine=engine, concurrency=1, poll_interval=0.01, worker_id=f"w{i}") for i in range(worker_count)]
+        started = time.perf_counter()
+        await asyncio.gather(*(worker.run_until_empty() for worker in workers))
+        elapsed = time.perf_counter() - started
+        assert sum(worker.completed for worker in workers) == 12
+        return 12 / elapsed
+
+    one, four = await drain(1), await drain(4)
+    assert four > 2 * one
+
+
+async def test_webhook_queues_commands_instead_of_running_them(monkeypatch):
+    from app import logic_controller
+
+    queued = []
+
+    def mock_enqueue_job(session, kind, chat_id, payload):
+        queued.append((kind, chat_id, payload))
+
+    async def must_not_run(*args, **kwargs):
+        raise AssertionError("the job should have been queued")
+
+    async def mock_send_status_message(chat_id, text):
+        return 555
+
+    monkeypatch.setattr(logic_controller, "JOB_QUEUE_BACKEND", "database")
+    monkeypatch.setattr(logic_controller, "PROGRESSIVE_SUMMARY_ENABLED", True)
+    monkeypatch.setattr(logic_controller, "enqueue_job", mock_enqueue_job)
+    monkeypatch.setattr(logic_controller, "run_job", must_not_run)
+    monkeypatch.setattr("app.telegram_service.send_status_message", mock_send_status_message)
+
+    await logic_controller.run_or_enqueue(None, "stats", -100, {})
+    progress = await logic_controller.send_summary_status(-100, "Working...", "Summary")
+    await logic_controller.run_or_enqueue(None, "summarize_last", -100, {"limit": 20}, progress)
+
+    assert queued == [
+        ("stats", -100, {}),
+        ("summarize_last", -100, {"limit": 20, "status_message_id": 555, "title": "Summary"}),
+    ]
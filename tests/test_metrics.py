@@ -0,0 +1,77 @@
+# tests/test_metrics.py
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from app import metrics, summarization_service
+from app.database import Message
+from app.job_queue import update_queue
+from app.webhook_handler import app
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = metrics.Histogram("test_seconds", "Test.", ("stage",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, stage="a")
+    histogram.observe(0.1, stage="a")
+    histogram.observe(5, stage="a")
+
+    lines = histogram.render()
+    assert 'test_seconds_bucket{stage="a",le="0.1"} 2' in lines
+    assert 'test_seconds_bucket{stage="a",le="1"} 2' in lines
+    assert 'test_seconds_bucket{stage="a",le="+Inf"} 3' in lines
+    assert 'test_seconds_count{stage="a"} 3' in lines
+    assert histogram.count(stage="a") == 3
+
+
+def test_labels_must_match():
+    counter = metrics.Counter("test_total", "Test.", ("stage",))
+    with pytest.raises(ValueError):
+        counter.inc(engine="x")
+
+
+def test_gauge_tracks_in_progress_and_reads_callbacks():
+    gauge = metrics.Gauge("test_in_flight", "Test.")
+    with gauge.track_inprogress():
+        assert gauge.value() == 1
+    assert gauge.value() == 0
+
+    gauge.set_function(lambda: 7)
+    assert "test_in_flight 7" in gauge.render()
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_reports_stages_of_a_summary(monkeypatch):
+    async def mock_send_message(chat_id, text):
+        return True
+
+    def mock_get_last_n(session, chat_id, limit):
+        return [Message(message_id=i, chat_id=chat_id, sender_name="A", text=f"hello {i}") for i in range(1, 4)]
+
+    monkeypatch.setattr("app.telegram_service.send_message", mock_send_message)
+    monkeypatch.setattr("app.logic_controller.PROGRESSIVE_SUMMARY_ENABLED", False)
+    monkeypatch.setattr("app.logic_controller.get_last_n_messages", mock_get_last_n)
+    monkeypatch.setattr(summarization_service, "SUMMARY_CACHE_ENABLED", False)
+    monkeypatch.setattr(summarization_service, "summarize_chunk", lambda text: "summary")
+    leaves_before = metrics.chunk_seconds.count(engine=summarization_service.ENGINE_NAME, level=0)
+
+    update = {
+        "update_id": 777001,
+        "message": {
+            "message_id": 777001, "date": 1678886400,
+            "chat": {"id": -100777, "type": "group", "title": "Test Group"},
+            "from": {"id": 1, "is_bot": False, "first_name": "TestUser"},
+            "text": "/summarize_last 3",
+        },
+    }
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        await client.post("/webhook", json=update)
+        await update_queue.join(timeout=5)
+        response = await client.get("/metrics")
+
+    assert response.status_code == 200
+    body = response.text
+    assert 'summarizer_stage_seconds_count{stage="range_query"}' in body
+    assert 'summarizer_stage_seconds_count{stage="chunking"}' in body
+    assert 'summarizer_updates_total{command="summarize_last"}' in body
+    assert "summarizer_summaries_in_flight 0" in body
+    assert "summarizer_update_queue_depth" in body
+    assert metrics.chunk_seconds.count(engine=summarization_service.ENGINE_NAME, level=0) == leaves_before + 1
@@ -0,0 +1,79 @@
+# tests/test_outbound.py
+
+import time
+import pytest
+from app import telegram_service
+from app.outbound import OutboundSender, TokenBucket, split_message
+from tests.fake_bot_api import FakeBotApi
+
+@pytest.fixture
+def api(monkeypatch):
+    api = FakeBotApi()
+    monkeypatch.setattr(telegram_service, "bot", api.bot())
+    monkeypatch.setattr(telegram_service, "outbound", OutboundSender(
+        global_rate=1000, chat_rate=1000, group_rate_per_min=60_000, chat_burst=100, max_retries=2,
+    ))
+    return api
+
+
+@pytest.mark.asyncio
+async def test_long_message_is_sent_in_parts(api):
+    text = "\n\n".join(f"*Paragraph {i}* " + "word " * 200 for i in range(10))
+
+    assert await telegram_service.send_message(-100, text)
+
+    parts = [call["text"] for call in api.sent()]
+    assert len(parts) > 1
+    assert all(len(part) <= 4096 for part in parts)
+    assert "\n\n".join(parts).split() == text.split()
+
+
+@pytest.mark.asyncio
+async def test_429_is_retried_after_retry_after(api):
+    api.flood("sendMessage", times=1, retry_after=1)
+
+    started = time.monotonic()
+    assert await telegram_service.send_message(-100, "hello")
+
+    assert time.monotonic() - started >= 1
+    assert [call["status"] for call in api.calls] == [429, 200]
+    assert telegram_service.outbound.retried == 1
+
+
+@pytest.mark.asyncio
+async def test_gives_up_after_max_retries(api):
+    api.flood("sendMessage", times=5, retry_after=0)
+
+    assert not await telegram_service.send_message(-100, "hello")
+    assert len(api.calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_long_edit_sends_the_rest_as_new_messages(api):
+    message_id = await telegram_service.send_status_message(-100, "Summarizing... ⏳")
+
+    assert await telegram_service.edit_message(-100, message_id, "line\n" * 1500)
+
+    assert len(api.sent("editMessageText")) == 1
+    assert len(api.sent()) == 2 # The status message and the overflow
+
+
+@pytest.mark.asyncio
+async def test_chat_bucket_paces_sends():
+    bucket = TokenBucket(rate=20, capacity=1)
+    started = time.monotonic()
+    for _ in range(5):
+        await bucket.acquire()
+    assert time.monotonic() - started >= 0.19
+
+
+def test_split_never_cuts_inside_an_entity():
+    text = "a " * 10 + "*bold " + "b " * 10 + "end*"
+    parts = split_message(text, limit=30)
+    assert parts[0] == ("a " * 10).strip()
+    assert all(part.count("*") % 2 == 0 for part in parts)
+
+
+def test_split_keeps_escapes_with_their_character():
+    parts = split_message("x" * 9 + "\\_y", limit=10)
+    assert parts[0] == "x" * 9
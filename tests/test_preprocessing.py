@@ -0,0 +1,120 @@
+# tests/test_preprocessing.py
+
+from datetime import datetime, timedelta
+import pytest
+from app import preprocessing, summarization_service
+from app.database import Message
+from app.metrics import preprocess_dropped_total
+
+
+def make_messages(*lines, start_id=1):
+    base = datetime(2024, 1, 1)
+    messages = []
+    for offset, line in enumerate(lines):
+        sender, text = line.split(": ", 1)
+        messages.append(Message(message_id=start_id + offset, chat_id=-100, sender_name=sender, text=text,
+                                timestamp=base + timedelta(minutes=offset), unit_count=99, unit_kind="words"))
+    return messages
+
+
+def word_units(message):
+    return len(summarization_service.format_message(message).split())
+
+
+def run(messages, *steps):
+    return preprocessing.preprocess(messages, word_units, steps)
+
+
+def texts(messages):
+    return [f"{m.sender_name}: {m.text}" for m in messages]
+
+
+def test_normalizes_arabic_without_touching_the_loaded_rows():
+    originals = make_messages("سارة: هَلْ حُدِّدَ مـــوعد الإطلاق ٣؟", "أحمد: لا شيء هنا")
+    result, _ = run(originals, "normalize_arabic")
+
+    assert texts(result) == ["سارة: هل حدد موعد الإطلاق ٣؟", "أحمد: لا شيء هنا"]
+    assert originals[0].text == "هَلْ حُدِّدَ مـــوعد الإطلاق ٣؟"
+    # A changed message is counted again; an unchanged one keeps its row.
+    assert result[0].unit_count is None
+    assert result[1] is originals[1]
+
+
+def test_collapses_urls_to_their_host():
+    result, _ = run(make_messages("Dana: docs at https://Docs.Example.com/a/b?c=d#e and www.test.org/x"), "collapse_urls")
+    assert texts(result) == ["Dana: docs at docs.example.com and test.org"]
+
+
+def test_drops_low_content_messages():
+    result, report = run(make_messages(
+        "Alex: ok", "Sarah: 👍👍", "Mike: https://example.com/page", "Dana: see this https://example.com/page", "Omar: the build is green",
+    ), "drop_low_content")
+
+    assert texts(result) == ["Dana: see this https://example.com/page", "Omar: the build is green"]
+    assert report.dropped == {"drop_low_content": 3}
+
+
+def test_drops_near_duplicates_within_the_window(monkeypatch):
+    monkeypatch.setattr(preprocessing, "PREPROCESS_DUPLICATE_WINDOW", 2)
+    result, report = run(make_messages(
+        "Alex: the staging server is down again",
+        "Sarah: The staging server is DOWN again!",
+        "Mike: who is on call today",
+        "Dana: anyone free for lunch",
+        "Omar: the staging server is down again",
+    ), "drop_duplicates")
+
+    # The last one is a repeat too, but the first copy has left the window.
+    assert [m.message_id for m in result] == [1, 3, 4, 5]
+    assert report.dropped == {"drop_duplicates": 1}
+
+
+def test_merges_runs_of_one_sender_within_a_block(monkeypatch):
+    monkeypatch.setattr(preprocessing, "CHUNK_ID_SPAN", 5)
+    result, report = run(make_messages(
+        "Alex: first", "Alex: second", "Sarah: reply", "Alex: third", "Alex: fourth", "Alex: fifth", start_id=1,
+    ), "merge_senders")
+
+    # Ids 4 and 5 fall in different blocks of 5, so Alex's last run is cut there.
+    assert texts(result) == ["Alex: first\nsecond", "Sarah: reply", "Alex: third", "Alex: fourth\nfifth"]
+    assert [m.message_id for m in result] == [1, 3, 4, 5]
+    assert report.dropped == {"merge_senders": 2}
+
+
+def test_reports_units_removed_by_the_whole_pipeline():
+    messages = make_messages(
+        "Alex: I pushed the login fix",
+        "Alex: ok",
+        "Sarah: can someone review https://git.example.com/pr/42",
+        "Sarah: can someone review https://git.example.com/pr/42",
+        "Sarah: before lunch please",
+    )
+    result, report = preprocessing.preprocess(messages, word_units)
+
+    assert texts(result) == ["Alex: I pushed the login fix", "Sarah: can someone review git.example.com\nbefore lunch please"]
+    assert (report.messages_in, report.messages_out) == (5, 2)
+    assert report.units_in == 22 and report.units_out == 14 and report.units_removed == 8
+
+
+def test_unknown_step_is_rejected():
+    with pytest.raises(ValueError):
+        run(make_messages("Alex: hi there"), "stem_everything")
+
+
+@pytest.mark.asyncio
+async def test_summaries_use_the_cleaned_messages(monkeypatch):
+    summarized = []
+
+    def fake_summarize_chunk(text):
+        summarized.append(text)
+        return "summary"
+
+    monkeypatch.setattr(summarization_service, "summarize_chunk", fake_summarize_chunk)
+    monkeypatch.setattr(summarization_service, "SUMMARY_CACHE_ENABLED", False)
+    monkeypatch.setattr(summarization_service, "PREPROCESS_ENABLED", True)
+    before = preprocess_dropped_total.value(step="drop_low_content")
+
+    await summarization_service.summarize_messages(None, -100, make_messages("Alex: ok", "Sarah: the release is on Friday"))
+
+    assert summarized == ["Sarah: the release is on Friday"]
+    assert preprocess_dropped_total.value(step="drop_low_content") == before + 1
@@ -0,0 +1,50 @@
+# tests/test_progress.py
+
+import asyncio
+import pytest
+from app import summarization_service, telegram_service
+from app.progress import SummaryProgress
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def edits(monkeypatch):
+    edits = []
+
+    async def mock_edit_message(chat_id, message_id, text):
+        edits.append(text)
+        return True
+
+    monkeypatch.setattr(telegram_service, "edit_message", mock_edit_message)
+    return edits
+
+
+async def test_partial_summaries_stream_into_the_status_message(edits, monkeypatch):
+    monkeypatch.setattr(summarization_service, "summarize_chunk", lambda text: f"part {text.split()[0]}")
+    monkeypatch.setattr(summarization_service, "count_units", lambda text: len(text.split()))
+    monkeypatch.setattr(summarization_service, "MAX_UNITS_PER_CHUNK", 4)
+    progress = SummaryProgress(-100, 7, "Summary", min_interval=0)
+
+    summary = await summarization_service._summarize_chunks_async(["a x", "b x", "c x"], progress)
+    await asyncio.sleep(0) # Let the background editor catch up
+    assert await progress.finish(f"Summary\n\n{summary}")
+
+    assert progress.done == 3
+    assert any("summarized" in text and "part a" in text for text in edits)
+    assert edits[-1] == f"Summary\n\n{summary}"
+
+
+async def test_edits_are_throttled_and_coalesced(edits):
+    progress = SummaryProgress(-100, 7, "Summary", min_interval=60)
+    progress.leaves_started(10)
+
+    for i in range(10):
+        progress.leaf_done(f"part {i}")
+        await asyncio.sleep(0)
+    await progress.finish("final")
+
+    # One immediate progress edit; the rest waited for the interval and were replaced by the final text.
+    assert len(edits) == 2
+    assert "summarized 1/10 parts" in edits[0]
+    assert edits[-1] == "final"
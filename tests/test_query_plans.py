@@ -0,0 +1,72 @@
+# tests/test_query_plans.py
+
+import pytest
+from sqlmodel import SQLModel, create_engine
+from sqlalchemy import text
+from app import database
+from app.migrations import run_migrations
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    run_migrations(engine)
+    return engine
+
+
+def query_plan(engine, statement) -> str:
+    sql = str(statement.compile(engine, compile_kwargs={"literal_binds": True}))
+    with engine.connect() as connection:
+        rows = connection.execute(text(f"EXPLAIN QUERY PLAN {sql}")).all()
+    return "\n".join(row[-1] for row in rows)
+
+
+def assert_index_walk(plan: str, index_name: str):
+    assert f"INDEX {index_name}" in plan, plan
+    # A regression to a full scan or an extra sort step shows up in the plan.
+    assert "SCAN message\n" not in plan + "\n", plan
+    assert "TEMP B-TREE" not in plan, plan
+
+
+def test_range_query_walks_chat_message_index(engine):
+    plan = query_plan(engine, database._messages_in_range_statement(-100, 10, 500, 1000))
+    assert_index_walk(plan, "uq_message_chat_message")
+
+
+def test_last_n_query_walks_chat_timestamp_index(engine):
+    plan = query_plan(engine, database._last_n_messages_statement(-100, 50))
+    assert_index_walk(plan, "ix_message_chat_timestamp")
+
+
+def test_migration_upgrades_old_schema():
+    engine = create_engine("sqlite://")
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE message (id INTEGER PRIMARY KEY, message_id BIGINT, chat_id BIGINT, "
+            "sender_name VARCHAR, text VARCHAR, timestamp DATETIME)"
+        ))
+        connection.execute(text("CREATE INDEX ix_message_chat_id ON message (chat_id)"))
+        connection.execute(text(
+            "INSERT INTO message (message_id, chat_id, sender_name, text, timestamp) VALUES "
+            "(1, -100, 'a', 'x', '2024-01-01'), (1, -100, 'a', 'x', '2024-01-01'), (2, -100, 'a', 'y', '2024-01-01')"
+        ))
+    SQLModel.metadata.create_all(engine)
+
+    run_migrations(engine)
+    run_migrations(engine) # Already applied: must be a no-op
+
+    with engine.connect() as connection:
+        indexes = {row[1] for row in connection.execute(text("PRAGMA index_list('message')"))}
+        columns = {row[1] for row in connection.execute(text("PRAGMA table_info('message')"))}
+        count = connection.execute(text("SELECT COUNT(*) FROM message")).scalar()
+    assert {"uq_message_chat_message", "ix_message_chat_timestamp"} <= indexes
+    assert "ix_message_chat_id" not in indexes
+    assert count == 2
+    assert {"unit_count", "unit_kind"} <= columns
+
+
+def test_search_query_goes_through_the_fts_index(engine):
+    plan = query_plan(engine, database._search_statement("sqlite", -100, "release", 10))
+    assert "VIRTUAL TABLE INDEX" in plan, plan
+    assert "SCAN message\n" not in plan + "\n", plan
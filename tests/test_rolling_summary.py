@@ -0,0 +1,97 @@
+# tests/test_rolling_summary.py
+
+from datetime import datetime, timedelta
+import pytest
+from sqlmodel import SQLModel, Session, create_engine
+from sqlalchemy.pool import StaticPool
+from app import database, rolling_summary, summarization_service
+from app.database import Message
+from app.rolling_summary import RollingSummaries
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    monkeypatch.setattr(database, "engine", engine)
+    monkeypatch.setattr(database, "async_engine", None)
+    monkeypatch.setattr(rolling_summary, "ARCHIVE_BUFFER_ENABLED", False)
+    return engine
+
+
+@pytest.fixture
+def summarized(monkeypatch):
+    calls = []
+
+    def fake_summarize_chunk(text):
+        calls.append(text)
+        return f"summary of {len(text.splitlines())} lines"
+
+    monkeypatch.setattr(summarization_service, "summarize_chunk", fake_summarize_chunk)
+    monkeypatch.setattr(summarization_service, "count_units", lambda text: len(text.split()))
+    monkeypatch.setattr(summarization_service, "SUMMARY_CACHE_ENABLED", False)
+    return calls
+
+
+def archive(engine, rolling, start_id, end_id, chat_id=-100):
+    with Session(engine) as session:
+        for i in range(start_id, end_id + 1):
+            database.save_message(session, Message(
+                message_id=i, chat_id=chat_id, sender_name="User", text=f"message {i}",
+                timestamp=datetime(2024, 1, 1) + timedelta(minutes=i),
+            ))
+            rolling.note_message(chat_id)
+
+
+def make_rolling(**overrides):
+    options = dict(enabled=True, chats="*", window=10, every_n=5, idle_seconds=3600, max_delta=3, concurrency=1)
+    options.update(overrides)
+    return RollingSummaries(**options)
+
+
+async def test_refresh_every_n_messages_and_answer_instantly(engine, summarized):
+    rolling = make_rolling()
+    archive(engine, rolling, 1, 10)
+    await rolling.refresh(-100)
+    summarized.clear()
+
+    with Session(engine) as session:
+        answer = await rolling.answer(session, -100, 10)
+
+    assert answer == ("summary of 10 lines", 10)
+    assert summarized == [] # Served from the precomputed state
+
+
+async def test_small_delta_is_folded_in(engine, summarized):
+    rolling = make_rolling()
+    archive(engine, rolling, 1, 10)
+    await rolling.refresh(-100)
+    archive(engine, rolling, 11, 12)
+    summarized.clear()
+
+    with Session(engine) as session:
+        summary, count = await rolling.answer(session, -100, 10)
+
+    # One pass over the two new messages, one to combine it with the rolling summary.
+    assert summarized[0] == "User: message 11\nUser: message 12"
+    assert len(summarized) == 2
+    assert count == 10
+
+
+async def test_falls_back_when_not_applicable(engine, summarized):
+    rolling = make_rolling(chats="-200")
+    archive(engine, rolling, 1, 10)
+
+    with Session(engine) as session:
+        assert await rolling.answer(session, -100, 10) is None # Chat not enabled
+
+    rolling = make_rolling()
+    archive(engine, rolling, 11, 20)
+    await rolling.refresh(-100)
+    archive(engine, rolling, 21, 24) # More than max_delta new messages
+
+    with Session(engine) as session:
+        assert await rolling.answer(session, -100, 25) is None # Other window size
+        assert await rolling.answer(session, -100, 10) is None
@@ -0,0 +1,137 @@
+# tests/test_routing.py
+
+import types
+from datetime import datetime, timedelta
+import pytest
+from app import logic_controller, summarization_service
+from app.database import Message
+from app.metrics import routing_decisions_total
+from app.routing import EngineRouter, OverloadedError
+
+
+def make_messages(count, words=10):
+    base = datetime(2024, 1, 1)
+    return [
+        Message(message_id=i, chat_id=-100, sender_name="User", text=" ".join(["word"] * words), timestamp=base + timedelta(minutes=i))
+        for i in range(1, count + 1)
+    ]
+
+
+def make_router():
+    router = EngineRouter("transformer", "fastlsa", workers=2, deadline_s=10, alpha=0.5)
+    router.loads["transformer"].seconds_per_unit = 0.01
+    router.loads["fastlsa"].seconds_per_unit = 0.0001
+    return router
+
+
+def test_routes_to_primary_fallback_or_sheds_by_expected_latency():
+    router = make_router()
+
+    # 1000 units * 0.01s / 2 workers = 5s
+    assert router.route(1000, 800).decision == "primary"
+
+    router.started("transformer", 2000)
+    decision = router.route(1000, 800)
+    assert decision.decision == "fallback"
+    assert decision.engine == "fastlsa"
+    assert decision.estimates_s["transformer"] == pytest.approx(15)
+
+    assert router.route(1000, 10**6).decision == "shed"
+    assert routing_decisions_total.value(decision="shed", engine="none") >= 1
+
+
+def test_learns_seconds_per_unit_from_finished_summaries():
+    router = make_router()
+
+    ahead = router.started("transformer", 1000)
+    assert router.stats()["transformer"]["in_flight_units"] == 1000
+    # Took 20s on 2 workers for 1000 units: 0.04s per unit, halfway there with alpha 0.5.
+    router.finished("transformer", 1000, ahead, 20.0)
+    assert router.stats()["transformer"] == {"seconds_per_unit": pytest.approx(0.025), "in_flight_units": 0, "observations": 1}
+
+    # A failed summary frees its units but teaches nothing.
+    router.finished("transformer", 0, router.started("transformer", 0), None)
+    assert router.stats()["transformer"]["observations"] == 1
+
+
+def test_fallback_equal_to_primary_is_ignored():
+    router = EngineRouter("fastlsa", "fastlsa", workers=1, deadline_s=0)
+    assert router.fallback is None
+    assert router.route(10, 10).decision == "shed"
+
+
+@pytest.fixture
+def routed(monkeypatch):
+    calls = {"primary": 0, "fallback": []}
+
+    def primary_summarize_chunk(text):
+        calls["primary"] += 1
+        return "primary summary"
+
+    def fallback_summarize_chunk(text):
+        calls["fallback"].append(text)
+        return "fallback summary"
+
+    fallback = types.SimpleNamespace(ENGINE_NAME="fastlsa", summarize_chunk=fallback_summarize_chunk)
+    monkeypatch.setattr(summarization_service, "summarize_chunk", primary_summarize_chunk)
+    monkeypatch.setattr(summarization_service.engine_registry, "get_engine", lambda mode=None: fallback)
+    monkeypatch.setattr(summarization_service, "SUMMARY_CACHE_ENABLED", False)
+    monkeypatch.setattr(summarization_service, "SINGLE_FLIGHT_ENABLED", False)
+    router = EngineRouter(summarization_service.ENGINE_NAME, "fastlsa", workers=1, deadline_s=10, alpha=0.5)
+    monkeypatch.setattr(summarization_service, "router", router)
+    return router, calls
+
+
+@pytest.mark.asyncio
+async def test_overloaded_primary_falls_back_to_the_fast_engine(routed, monkeypatch):
+    router, calls = routed
+    monkeypatch.setattr(summarization_service, "FALLBACK_WORDS_PER_CHUNK", 100)
+    router.loads[router.primary].seconds_per_unit = 1.0
+
+    summary = await summarization_service.summarize_messages(None, -100, make_messages(30))
+
+    assert summary == "fallback summary"
+    assert calls["primary"] == 0
+    # 30 lines of 11 words, at most 100 words a chunk: 4 leaves, then one reduce pass.
+    assert len(calls["fallback"]) == 5
+    assert router.stats()["fastlsa"]["observations"] == 1
+    assert router.stats()["fastlsa"]["in_flight_units"] == 0
+
+
+@pytest.mark.asyncio
+async def test_idle_primary_is_used(routed):
+    router, calls = routed
+
+    assert await summarization_service.summarize_messages(None, -100, make_messages(5)) == "primary summary"
+    assert calls["fallback"] == []
+    assert router.stats()[router.primary]["observations"] == 1
+
+
+@pytest.mark.asyncio
+async def test_shed_request_gets_a_busy_message(routed, monkeypatch):
+    router, calls = routed
+    router.deadline_s = 0
+    sent = []
+
+    async def mock_send_message(chat_id, text):
+        sent.append(text)
+
+    monkeypatch.setattr("app.telegram_service.send_message", mock_send_message)
+    monkeypatch.setattr(logic_controller, "get_last_n_messages", lambda session, chat_id, limit: make_messages(5))
+    monkeypatch.setattr(logic_controller.rolling_summaries, "answer", _no_rolling_answer)
+
+    with pytest.raises(OverloadedError):
+        await summarization_service.summarize_messages(None, -100, make_messages(5))
+
+    await logic_controller.reply_with_last_summary(None, -100, 5)
+    assert sent == [logic_controller.BUSY_MESSAGE]
+    assert calls["primary"] == 0 and calls["fallback"] == []
+
+
+async def _no_rolling_answer(session, chat_id, limit):
+    return None
+
+
+def test_pack_words_keeps_lines_whole_and_cuts_long_ones():
+    chunks = summarization_service.pack_words(["a b c", "d e", "f " * 7], limit=5)
+    assert chunks == ["a b c\nd e", "f f f f f", "f f"]
@@ -0,0 +1,145 @@
+# tests/test_search.py
+
+from datetime import datetime, timedelta
+import pytest
+from sqlmodel import SQLModel, Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import delete, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import StaticPool
+from app import database, logic_controller, summarization_service
+from app.database import Message
+from app.ingestion import MessageBuffer
+from app.migrations import _message_search_index, run_migrations
+
+TEXTS = {
+    1: "Did anyone book the venue for the release party?",
+    2: "Not yet",
+    3: "I think Sam is on it",
+    4: "The release date moved to Friday",
+    5: "ok",
+    6: "lunch?",
+    7: "/search release",
+    8: "هل حُدِّدَ موعد الإطلاق؟",
+    9: "Release notes are in the wiki",
+}
+
+
+def make_message(message_id, text, chat_id=-100):
+    return Message(message_id=message_id, chat_id=chat_id, sender_name="User", text=text,
+                   timestamp=datetime(2024, 1, 1) + timedelta(minutes=message_id))
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    run_migrations(engine)
+    monkeypatch.setattr(database, "engine", engine)
+    monkeypatch.setattr(database, "async_engine", None)
+    with Session(engine) as session:
+        for message_id, body in TEXTS.items():
+            database.save_message(session, make_message(message_id, body))
+        database.save_message(session, make_message(1, "release elsewhere", chat_id=-200))
+    return engine
+
+
+def search(engine, terms, limit=10, chat_id=-100):
+    with Session(engine) as session:
+        return [m.message_id for m in database.search_messages(session, chat_id, terms, limit)]
+
+
+def test_search_finds_all_terms_newest_first_in_one_chat(engine):
+    assert search(engine, "release") == [9, 4, 1]
+    assert search(engine, "RELEASE date") == [4]
+    assert search(engine, "release", limit=2) == [9, 4]
+    assert search(engine, "release", chat_id=-200) == [1]
+    assert search(engine, "   ") == []
+
+
+def test_search_handles_arabic_and_fts_syntax(engine):
+    assert search(engine, "موعد") == [8]
+    assert search(engine, 'release" OR "lunch') == []
+    assert search(engine, "NOT AND (") == []
+
+
+def test_index_follows_deletes(engine):
+    # e.g. rows moved to the cold tier
+    with Session(engine) as session:
+        session.exec(delete(Message).where(Message.message_id == 9))
+        session.commit()
+    assert search(engine, "release") == [4, 1]
+
+
+@pytest.mark.asyncio
+async def test_buffered_messages_are_indexed(engine):
+    buffer = MessageBuffer(max_batch_size=100, flush_interval_ms=60_000)
+    buffer.add(make_message(20, "release checklist"))
+    buffer.add(make_message(9, "duplicate, skipped by the insert"))
+    await buffer.flush()
+    assert search(engine, "release") == [20, 9, 4, 1]
+    assert search(engine, "duplicate") == []
+
+
+def test_migration_indexes_messages_archived_before_it():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO message (message_id, chat_id, sender_name, text, timestamp) VALUES (1, -100, 'a', 'old release', '2024-01-01')"
+        ))
+    run_migrations(engine)
+    assert search(engine, "release") == [1]
+
+
+def test_context_windows_merge_neighbours(engine):
+    assert database._context_windows([10, 12, 30], 2) == [(8, 14), (28, 32)]
+    with Session(engine) as session:
+        around = database.get_messages_around(session, -100, [4, 9], 1)
+    assert [m.message_id for m in around] == [3, 4, 5, 8, 9]
+
+
+def test_postgres_query_uses_the_indexed_expression():
+    sql = str(database._search_statement("postgresql", -100, "release", 10).compile(dialect=postgresql.dialect()))
+    assert f"{database.SEARCH_VECTOR_SQL} @@ plainto_tsquery('simple'::regconfig" in sql
+
+
+@pytest.mark.asyncio
+async def test_async_search():
+    async_engine = create_async_engine("sqlite+aiosqlite://")
+    async with async_engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+        await connection.run_sync(_message_search_index)
+
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        for message_id, body in TEXTS.items():
+            session.add(make_message(message_id, body))
+        await session.commit()
+        assert [m.message_id for m in await database.search_messages_async(session, -100, "release", 10)] == [9, 4, 1]
+        around = await database.get_messages_around_async(session, -100, [4], 1)
+        assert [m.message_id for m in around] == [3, 4, 5]
+    await async_engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_summarize_about_reads_only_matches_and_context(engine, monkeypatch):
+    summarized, sent = [], []
+
+    def fake_summarize_chunk(text):
+        summarized.append(text)
+        return "summary"
+
+    async def mock_send_message(chat_id, text):
+        sent.append(text)
+
+    monkeypatch.setattr(summarization_service, "summarize_chunk", fake_summarize_chunk)
+    monkeypatch.setattr(summarization_service, "SUMMARY_CACHE_ENABLED", False)
+    monkeypatch.setattr(logic_controller, "SEARCH_CONTEXT_MESSAGES", 1)
+    monkeypatch.setattr("app.telegram_service.send_message", mock_send_message)
+
+    with Session(engine) as session:
+        await logic_controller.reply_with_topic_summary(session, -100, "release date", 20)
+
+    assert summarized == ["User: I think Sam is on it\nUser: The release date moved to Friday\nUser: ok"]
+    assert sent[0].startswith("**Summary of 1 messages about release date:**")
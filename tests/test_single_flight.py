@@ -0,0 +1,92 @@
+# tests/test_single_flight.py
+
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta
+import pytest
+from app import summarization_service
+from app.database import Message
+from app.single_flight import SingleFlight
+
+pytestmark = pytest.mark.asyncio
+
+
+def make_messages(start_id, end_id):
+    base = datetime(2024, 1, 1)
+    return [
+        Message(message_id=i, chat_id=-100, sender_name="User", text=f"message {i}", timestamp=base + timedelta(minutes=i))
+        for i in range(start_id, end_id + 1)
+    ]
+
+
+@pytest.fixture
+def slow_engine(monkeypatch):
+    calls = []
+    lock = threading.Lock()
+
+    def slow_summarize_chunk(text):
+        with lock:
+            calls.append(text)
+        time.sleep(0.05)
+        return f"summary of {len(text.splitlines())} lines"
+
+    monkeypatch.setattr(summarization_service, "summarize_chunk", slow_summarize_chunk)
+    monkeypatch.setattr(summarization_service, "SUMMARY_CACHE_ENABLED", False)
+    monkeypatch.setattr(summarization_service, "SINGLE_FLIGHT_ENABLED", True)
+    monkeypatch.setattr(summarization_service, "summary_flights", SingleFlight("summary"))
+    return calls
+
+
+async def test_identical_concurrent_requests_share_one_computation(slow_engine):
+    messages = make_messages(1, 20)
+    results = await asyncio.gather(*(summarization_service.summarize_messages(None, -100, messages) for _ in range(5)))
+
+    assert len(set(results)) == 1
+    assert len(slow_engine) == 1
+    assert summarization_service.summary_flights.stats() == {"in_flight": 0, "executed": 1, "coalesced": 4}
+
+
+async def test_different_ranges_and_later_requests_are_computed_separately(slow_engine):
+    await asyncio.gather(
+        summarization_service.summarize_messages(None, -100, make_messages(1, 20)),
+        summarization_service.summarize_messages(None, -100, make_messages(2, 21)),
+    )
+    await summarization_service.summarize_messages(None, -100, make_messages(1, 20))
+
+    assert len(slow_engine) == 3
+    assert summarization_service.summary_flights.coalesced == 0
+
+
+async def test_failure_reaches_every_waiter_and_is_not_cached():
+    flights = SingleFlight("test")
+    attempts = []
+
+    async def failing():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("engine down")
+
+    results = await asyncio.gather(*(flights.do("key", failing) for _ in range(3)), return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert len(attempts) == 1
+
+    with pytest.raises(RuntimeError):
+        await flights.do("key", failing)
+    assert len(attempts) == 2
+
+
+async def test_cancelling_the_first_caller_does_not_cancel_the_others():
+    flights = SingleFlight("test")
+
+    async def compute():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    first = asyncio.ensure_future(flights.do("key", compute))
+    await asyncio.sleep(0)
+    second = asyncio.ensure_future(flights.do("key", compute))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await second == "done"
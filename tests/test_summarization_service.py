@@ -0,0 +1,107 @@
+# tests/test_summarization_service.py
+
+from datetime import datetime
+import pytest
+from app import summarization_service
+from app.database import Message
+
+
+def fake_summarize_chunk(text: str) -> str:
+    """Keeps only the first word of every line, so each pass shrinks the text."""
+    return " ".join(line.split()[0] for line in text.splitlines() if line.split())
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    calls = []
+
+    def recording_summarize_chunk(text):
+        calls.append(text)
+        return fake_summarize_chunk(text)
+
+    monkeypatch.setattr(summarization_service, "summarize_chunk", recording_summarize_chunk)
+    monkeypatch.setattr(summarization_service, "count_units", lambda text: len(text.split()))
+    monkeypatch.setattr(
+        summarization_service,
+        "split_text_into_chunks",
+        lambda text: [" ".join(text.split()[i:i + 10]) for i in range(0, len(text.split()), 10)],
+    )
+    monkeypatch.setattr(summarization_service, "MAX_UNITS_PER_CHUNK", 10)
+    monkeypatch.setattr(summarization_service, "REDUCE_FAN_IN", 2)
+    return calls
+
+
+def test_group_for_reduce_respects_fan_in(small_chunks):
+    groups = summarization_service.group_for_reduce(["a", "b", "c", "d", "e"])
+    assert groups == ["a\nb", "c\nd", "e"]
+
+
+def test_group_for_reduce_respects_unit_budget(small_chunks):
+    groups = summarization_service.group_for_reduce(["one two three four five six", "seven eight nine ten eleven"])
+    assert groups == ["one two three four five six", "seven eight nine ten eleven"]
+
+
+def test_create_summary_builds_multi_level_tree(small_chunks):
+    messages = [f"word{i} filler text goes here" for i in range(16)]
+
+    summary = summarization_service.create_summary(messages)
+
+    # 80 words -> 8 leaves of two whole messages -> 4 -> 2 -> 1 final pass.
+    assert len(small_chunks) == 8 + 4 + 2 + 1
+    assert summary
+
+
+@pytest.mark.asyncio
+async def test_create_summary_async_builds_same_tree(small_chunks):
+    messages = [f"word{i} filler text goes here" for i in range(16)]
+
+    summary = await summarization_service.create_summary_async(messages)
+
+    assert summary
+    assert len(small_chunks) == 8 + 4 + 2 + 1
+
+
+def test_oversized_group_is_resplit_before_final_pass(small_chunks, monkeypatch):
+    # A summarizer that does not shrink its input would overload the final pass.
+    monkeypatch.setattr(summarization_service, "summarize_chunk", lambda text: (small_chunks.append(text) or text))
+    monkeypatch.setattr(summarization_service, "REDUCE_MAX_DEPTH", 3)
+
+    with pytest.raises(RuntimeError, match="did not fit"):
+        summarization_service.create_summary(["one two three four five six seven eight nine ten eleven twelve"])
+
+    assert all(len(text.split()) <= 10 for text in small_chunks)
+
+
+def test_create_summary_empty_conversation():
+    assert summarization_service.create_summary(["", " "]) == summarization_service.EMPTY_CONVERSATION_MESSAGE
+
+
+def test_messages_are_packed_whole_using_stored_counts(small_chunks, monkeypatch):
+    def fail_count(text):
+        raise AssertionError(f"re-counted {text!r}")
+
+    messages = [
+        Message(message_id=i, chat_id=-100, sender_name="User", text="a b c", timestamp=datetime(2024, 1, 1),
+                unit_count=4, unit_kind=summarization_service.UNIT_KIND)
+        for i in range(1, 6)
+    ]
+    monkeypatch.setattr(summarization_service, "count_units", fail_count)
+
+    leaves = summarization_service.build_leaf_chunks(messages, align_to_blocks=False)
+
+    assert [(first, last) for first, last, _ in leaves] == [(1, 2), (3, 4), (5, 5)]
+    assert leaves[0][2] == "User: a b c\nUser: a b c"
+
+
+def test_single_oversized_line_is_the_only_one_cut(small_chunks):
+    chunks = summarization_service.pack_lines([
+        (1, None, 2, "short one"),
+        (2, None, 12, "one two three four five six seven eight nine ten eleven twelve"),
+        (3, None, 2, "short two"),
+    ])
+    assert [text for _, _, text in chunks] == [
+        "short one",
+        "one two three four five six seven eight nine ten",
+        "eleven twelve",
+        "short two",
+    ]
@@ -0,0 +1,104 @@
+# tests/test_summary_cache.py
+
+from datetime import datetime, timedelta
+import pytest
+from sqlmodel import SQLModel, Session, create_engine, select
+from sqlalchemy.pool import StaticPool
+from app import summarization_service, summary_cache
+from app.database import Message, ChunkSummary
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+@pytest.fixture
+def summarized_chunks(monkeypatch):
+    calls = []
+
+    def fake_summarize_chunk(text):
+        calls.append(text)
+        return f"summary of {text.splitlines()[0]}"
+
+    monkeypatch.setattr(summarization_service, "summarize_chunk", fake_summarize_chunk)
+    monkeypatch.setattr(summarization_service, "count_units", lambda text: len(text.split()))
+    monkeypatch.setattr(summarization_service, "MAX_UNITS_PER_CHUNK", 30)
+    monkeypatch.setattr(summarization_service, "CHUNK_ID_SPAN", 10)
+    monkeypatch.setattr(summarization_service, "SUMMARY_CACHE_ENABLED", True)
+    summary_cache.reset_cache_stats()
+    return calls
+
+
+def make_messages(start_id, end_id):
+    base = datetime(2024, 1, 1)
+    return [
+        Message(message_id=i, chat_id=-100, sender_name="User", text=f"message {i}", timestamp=base + timedelta(minutes=i))
+        for i in range(start_id, end_id + 1)
+    ]
+
+
+def leaf_calls(calls):
+    # Leaf chunks start with an archived message line; reduce passes start with a summary.
+    return [text for text in calls if text.startswith("User: ")]
+
+
+async def test_leaf_chunks_are_aligned_to_message_id_blocks(summarized_chunks):
+    leaves = summarization_service.build_leaf_chunks(make_messages(5, 34))
+    assert [(first, last) for first, last, _ in leaves] == [(5, 9), (10, 19), (20, 29), (30, 34)]
+
+
+async def test_overlapping_requests_reuse_cached_leaves(session, summarized_chunks):
+    await summarization_service.summarize_messages(session, -100, make_messages(1, 40))
+    first_run_leaves = len(leaf_calls(summarized_chunks))
+    summarized_chunks.clear()
+
+    # The window moves forward by a few messages: only the new tail is summarized.
+    await summarization_service.summarize_messages(session, -100, make_messages(1, 45))
+
+    assert first_run_leaves == 5
+    assert leaf_calls(summarized_chunks) == ["User: message 40\nUser: message 41\nUser: message 42\nUser: message 43\nUser: message 44\nUser: message 45"]
+    stats = summary_cache.get_cache_stats()
+    assert (stats["hits"], stats["misses"]) == (4, 5 + 1)
+
+
+async def test_sliding_window_reuses_leaves_when_range_fits_in_one_pass(session, summarized_chunks, monkeypatch):
+    monkeypatch.setattr(summarization_service, "MAX_UNITS_PER_CHUNK", 1000)
+    await summarization_service.summarize_messages(session, -100, make_messages(1, 40))
+    before = summary_cache.get_cache_stats()
+
+    # Like /summarize_last over a moving window: both ends move, the middle blocks are reused.
+    await summarization_service.summarize_messages(session, -100, make_messages(5, 45))
+
+    after = summary_cache.get_cache_stats()
+    assert after["hits"] - before["hits"] == 3
+    assert after["misses"] - before["misses"] == 2
+
+
+async def test_message_archived_late_inside_a_span_invalidates_it(session, summarized_chunks):
+    messages = make_messages(10, 19)
+    await summarization_service.summarize_messages(session, -100, [m for m in messages if m.message_id != 15])
+    summarized_chunks.clear()
+
+    await summarization_service.summarize_messages(session, -100, messages)
+
+    assert leaf_calls(summarized_chunks) == ["\n".join(f"User: message {i}" for i in range(10, 20))]
+
+
+async def test_eviction_removes_expired_and_excess_entries(session, monkeypatch):
+    old = datetime(2000, 1, 1)
+    for i in range(5):
+        session.add(ChunkSummary(chat_id=1, first_message_id=i, last_message_id=i, content_hash="h", engine="e", engine_version="v",
+                                 summary="s", created_at=old, last_used_at=old + timedelta(days=365 * 30 * (i % 2))))
+    session.commit()
+    monkeypatch.setattr(summary_cache, "SUMMARY_CACHE_MAX_ENTRIES", 1)
+
+    summary_cache.evict(session)
+
+    remaining = session.exec(select(ChunkSummary)).all()
+    assert len(remaining) == 1
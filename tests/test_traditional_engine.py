@@ -47,4 +47,17 @@ def test_summarize_chunk_empty_input():
     summary = summarize_chunk("")
     
     # Assert that for an empty input, we get an empty output
-    assert summary == ""
\ No newline at end of file
+    assert summary == ""
+def test_cached_stemmer_matches_stemmer_and_counts_hits():
+    """
+    Tests that the memoized stemmer returns the same stems and serves repeats from its cache.
+    """
+    from nltk.stem.isri import ISRIStemmer
+    from app.engine_traditional import make_cached_stemmer
+
+    words = ["المحادثة", "يكتبون", "المحادثة", "والمكتبة", "يكتبون"]
+    stem = make_cached_stemmer(cache_size=16)
+
+    assert [stem(word) for word in words] == [ISRIStemmer().stem(word) for word in words]
+    info = stem.cache_info()
+    assert (info.hits, info.misses) == (2, 3)
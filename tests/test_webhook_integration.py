@@ -3,6 +3,7 @@
 import pytest
 from httpx import AsyncClient, ASGITransport
 from app.webhook_handler import app
+from app.job_queue import update_queue
 from telegram.helpers import escape_markdown
 # We mark all tests in this file as asyncio tests
 pytestmark = pytest.mark.asyncio
@@ -32,6 +33,8 @@ async def test_webhook_with_start_command(monkeypatch):
 
     async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
         response = await client.post("/webhook", json=test_update)
+        # The webhook acknowledges first and handles the update in the background.
+        await update_queue.join(timeout=5)
 
     assert response.status_code == 200
     assert len(sent_messages) == 1
@@ -64,6 +67,8 @@ async def test_webhook_with_help_command(monkeypatch):
     
     async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
         response = await client.post("/webhook", json=test_update)
+        # The webhook acknowledges first and handles the update in the background.
+        await update_queue.join(timeout=5)
 
     assert response.status_code == 200
     assert len(sent_messages) == 1
@@ -101,6 +106,8 @@ async def test_webhook_with_stats_command(monkeypatch):
     # 4. Perform the request
     async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
         response = await client.post("/webhook", json=test_update)
+        # The webhook acknowledges first and handles the update in the background.
+        await update_queue.join(timeout=5)
 
     # 5. Assert the results
     assert response.status_code == 200
@@ -125,10 +132,10 @@ async def test_webhook_with_summarize_last_command(monkeypatch):
     monkeypatch.setattr("app.logic_controller.get_last_n_messages", mock_get_last_n)
 
     # 2. Mock the summarization service
-    def mock_create_summary(messages):
-        return f"This is a summary of {len(messages)} messages."
+    async def mock_summarize_messages(session, chat_id, message_objects, progress=None):
+        return f"This is a summary of {len(message_objects)} messages."
     
-    monkeypatch.setattr("app.logic_controller.summarization_service.create_summary", mock_create_summary)
+    monkeypatch.setattr("app.logic_controller.summarization_service.summarize_messages", mock_summarize_messages)
     
     # 3. Mock the send_message function
     sent_messages_to_user = []
@@ -138,6 +145,19 @@ async def test_webhook_with_summarize_last_command(monkeypatch):
     
     monkeypatch.setattr("app.telegram_service.send_message", mock_send_message)
 
+    # The "Summarizing..." status message is edited into the final summary.
+    async def mock_send_status_message(chat_id, text):
+        sent_messages_to_user.append(text)
+        return 555
+
+    async def mock_edit_message(chat_id, message_id, text):
+        assert message_id == 555
+        sent_messages_to_user.append(text)
+        return True
+
+    monkeypatch.setattr("app.telegram_service.send_status_message", mock_send_status_message)
+    monkeypatch.setattr("app.telegram_service.edit_message", mock_edit_message)
+
     # 4. Prepare and perform the request
     test_update = {
         "update_id": 12348,
@@ -150,6 +170,7 @@ async def test_webhook_with_summarize_last_command(monkeypatch):
     
     async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
         await client.post("/webhook", json=test_update)
+        await update_queue.join(timeout=5)
 
     # 5. Assert the results
     assert len(sent_messages_to_user) == 2
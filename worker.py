@@ -0,0 +1,18 @@
+# worker.py
+
+import asyncio
+import logging
+from app.logging_config import setup_logging
+
+# Set up logging before anything else
+setup_logging()
+
+from app.worker import main
+
+logger = logging.getLogger(__name__)
+
+if __name__ == "__main__":
+    # A summarizer node: runs the summarize/stats jobs that webhook nodes queue
+    # in the database (JOB_QUEUE_BACKEND=database). Start as many as the load needs.
+    logger.info("Starting a job worker...")
+    asyncio.run(main())